@@ -310,7 +310,8 @@ def adicionar_pessoas_neo4j(clientes_map: Dict[str, int]):
                 CREATE (p:Pessoa {
                     id: $id,
                     cpf: $cpf,
-                    nome: $nome
+                    nome: $nome,
+                    atualizado_em: timestamp()
                 })
             """, id=cliente_id, cpf=cpf, nome=fake.name())
         
@@ -336,8 +337,10 @@ def adicionar_pessoas_neo4j(clientes_map: Dict[str, int]):
                     session.run("""
                         MATCH (p1:Pessoa {id: $id1})
                         MATCH (p2:Pessoa {id: $id2})
-                        MERGE (p1)-[:AMIGO_DE]->(p2)
-                        MERGE (p2)-[:AMIGO_DE]->(p1)
+                        MERGE (p1)-[r1:AMIGO_DE]->(p2)
+                        ON CREATE SET r1.atualizado_em = timestamp()
+                        MERGE (p2)-[r2:AMIGO_DE]->(p1)
+                        ON CREATE SET r2.atualizado_em = timestamp()
                     """, id1=cliente_id, id2=amigo_id)
                     num_amizades += 2
         
@@ -18,22 +18,49 @@ if sys.platform == 'win32':
     if hasattr(sys.stderr, 'reconfigure'):
         sys.stderr.reconfigure(encoding='utf-8')
 
-from fastapi import FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-import psycopg2
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Callable, Tuple
+from psycopg2.pool import ThreadedConnectionPool
 from pymongo import MongoClient
 from neo4j import GraphDatabase
 import redis
+import base64
+import gc
+import hashlib
+import uuid
 import json
-from datetime import datetime
+import mimetypes
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta
 
-app = FastAPI(title="Sistema de Recomendação - API de Integração")
+from recomendacao import gerar_recomendacoes, calcular_recomendacoes
+from repositorios import (
+    FontesDados, ArmazemRedis, RepositorioClientesPostgres, RepositorioInteressesMongoDB, RepositorioAmizadesNeo4j,
+    CursorPostgresContado, OuvinteComandosMongoDB, ArmazenamentoMemoria
+)
+import metricas
+from perfilador import PerfilRequisicaoMiddleware, amostrar, perfilar_iterador, perfilar_rotas, token_valido
+from codec import codificar, decodificar, ativar_dicionario, configurar_busca_dicionarios
+from compressao_http import CompressaoMiddleware, CODIFICACOES, escolher_codificacao, comprimir
 
-# Montar arquivos estáticos
-app.mount("/static", StaticFiles(directory="static"), name="static")
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    """Cria e aquece os pools de conexão e o cache dos arquivos estáticos na subida da API."""
+    iniciar_pools()
+    obter_ativos_estaticos()
+    yield
+    encerrar_pools()
+
+
+app = FastAPI(title="Sistema de Recomendação - API de Integração", lifespan=ciclo_de_vida)
 
 # Configurações de conexão
 POSTGRES_CONFIG = {
@@ -61,9 +88,94 @@ NEO4J_CONFIG = {
 REDIS_CONFIG = {
     'host': 'localhost',
     'port': 6379,
-    'decode_responses': True
+    # Os valores são bytes: documentos e catálogos passam pelo codec (codec.py)
+    'decode_responses': False
+}
+
+# Tamanho dos pools de conexão compartilhados por todas as rotas
+POOL_CONFIG = {
+    'postgres_min': int(os.getenv('POSTGRES_POOL_MIN', '1')),
+    'postgres_max': int(os.getenv('POSTGRES_POOL_MAX', '10')),
+    'mongodb_max': int(os.getenv('MONGODB_POOL_MAX', '20')),
+    'neo4j_max': int(os.getenv('NEO4J_POOL_MAX', '20')),
+    'redis_max': int(os.getenv('REDIS_POOL_MAX', '50'))
 }
 
+# Parâmetros de desempenho do ETL (ajustáveis por variável de ambiente;
+# os de leitura de cada banco ficam em repositorios.py)
+# Folga (segundos) aplicada às marcas d'água para não perder transações que
+# começaram antes da leitura anterior mas só foram confirmadas depois dela
+SYNC_MARGEM_WATERMARK_S = int(os.getenv('SYNC_MARGEM_WATERMARK_S', '5'))
+# Comandos acumulados em cada pipeline antes de enviar ao Redis na carga
+REDIS_LOTE_ESCRITA = int(os.getenv('REDIS_LOTE_ESCRITA', '1000'))
+# Chaves buscadas por MGET nas rotas de leitura
+REDIS_LOTE_LEITURA = int(os.getenv('REDIS_LOTE_LEITURA', '500'))
+# Clientes por bloco no modo streaming da sincronização (limita a memória da carga)
+SYNC_TAMANHO_BLOCO = int(os.getenv('SYNC_TAMANHO_BLOCO', '5000'))
+# Processos que consolidam e gravam os clientes na sincronização completa
+# (1: consolidação no próprio processo da API)
+SYNC_PROCESSOS = max(1, int(os.getenv('SYNC_PROCESSOS', '1')))
+# Maior página aceita pelo parâmetro `limit` das rotas de listagem
+LIMITE_MAXIMO_PAGINA = int(os.getenv('LIMITE_MAXIMO_PAGINA', '1000'))
+# Layout dos clientes no Redis: `documento` (um valor com o documento inteiro)
+# ou `hash` (um campo por parte do documento; cada rota lê só as partes que usa)
+REDIS_LAYOUT = os.getenv('REDIS_LAYOUT', 'documento')
+if REDIS_LAYOUT not in ('documento', 'hash'):
+    print(f"Aviso: REDIS_LAYOUT '{REDIS_LAYOUT}' desconhecido, usando 'documento'")
+    REDIS_LAYOUT = 'documento'
+
+# Atraso (segundos) antes de apagar gerações antigas, para que leituras que
+# ainda usam a geração anterior terminem antes da coleta
+SYNC_GC_ATRASO_S = int(os.getenv('SYNC_GC_ATRASO_S', '60'))
+
+# Tempo (segundos) que a resposta de GET /api/clientes/{id} e de
+# GET /api/recomendacoes/{id} fica guardada no Redis
+CACHE_CLIENTE_TTL_S = int(os.getenv('CACHE_CLIENTE_TTL_S', '300'))
+
+# Cache HTTP das rotas de consulta: Cache-Control enviado junto com o ETag
+# (`no-cache` faz o navegador revalidar a cada uso e receber 304 se nada mudou)
+HTTP_CACHE_CONTROL = os.getenv('HTTP_CACHE_CONTROL', 'no-cache')
+# Rotas cujas respostas dependem só dos dados publicados (recebem ETag)
+ROTAS_COM_ETAG = ('/api/clientes', '/api/recomendacoes')
+# Respostas a partir deste tamanho (bytes) são comprimidas (gzip ou brotli)
+HTTP_COMPRESSAO_MIN_BYTES = int(os.getenv('HTTP_COMPRESSAO_MIN_BYTES', '1024'))
+# Pasta dos arquivos do front-end (servidos pré-comprimidos, a partir de um cache em memória)
+PASTA_ESTATICOS = Path('static')
+
+# Perfis de desempenho sob demanda (/debug/profile e ?profile=1): só ficam
+# ativos com um token, exigido no cabeçalho X-Debug-Token
+DEBUG_PROFILE_TOKEN = os.getenv('DEBUG_PROFILE_TOKEN', '')
+# Janela máxima (segundos) de uma amostragem e intervalo (ms) entre as amostras
+DEBUG_PROFILE_MAX_S = float(os.getenv('DEBUG_PROFILE_MAX_S', '60'))
+DEBUG_PROFILE_INTERVALO_MS = float(os.getenv('DEBUG_PROFILE_INTERVALO_MS', '10'))
+
+# Jobs de sincronização: tempo (segundos) que o registro de um job fica
+# disponível para consulta e prazo da trava do job ativo, renovado por uma
+# thread a cada terço do prazo enquanto o job roda (evita trava presa se o
+# processo morrer)
+SYNC_JOB_TTL_S = int(os.getenv('SYNC_JOB_TTL_S', '86400'))
+SYNC_JOB_TRAVA_S = int(os.getenv('SYNC_JOB_TRAVA_S', '600'))
+# Intervalo mínimo (segundos) entre gravações do progresso de um job no Redis
+SYNC_JOB_INTERVALO_PROGRESSO_S = float(os.getenv('SYNC_JOB_INTERVALO_PROGRESSO_S', '0.5'))
+
+# Chave (hash) com as marcas d'água da última sincronização de cada fonte
+CHAVE_WATERMARKS = 'sync:watermarks'
+# Cada sincronização completa grava em um namespace próprio (g{n}:cliente:{id})
+# e só no final troca, de forma atômica, o ponteiro da geração publicada
+CHAVE_GERACAO_ATUAL = 'sync:geracao_atual'
+CHAVE_SEQ_GERACAO = 'sync:geracao_seq'
+CHAVE_GERACOES = 'sync:geracoes'
+# Contador incrementado a cada alteração publicada (completa ou incremental);
+# usado para não gravar no cache uma listagem renderizada com dados antigos
+CHAVE_REVISAO = 'sync:revisao'
+# Id do job de sincronização em execução (disparos iguais a ele são agrupados nele)
+CHAVE_JOB_ATIVO = 'sync:job_ativo'
+# Fila (lista) dos ids dos jobs que esperam o job ativo terminar
+CHAVE_JOBS_PENDENTES = 'sync:jobs_pendentes'
+# Dicionários zstd treinados (hash id -> bytes) e id do usado nas novas gravações
+CHAVE_DICIONARIOS = 'codec:dicionarios'
+CHAVE_DICIONARIO_ATIVO = 'codec:dicionario_ativo'
+
 # Modelos Pydantic
 class ClienteResumo(BaseModel):
     id: int
@@ -91,388 +203,2370 @@ class RecomendacaoInfo(BaseModel):
 
 
 # Funções auxiliares de conexão
-def get_postgres_connection():
-    """Retorna conexão com PostgreSQL."""
-    config = POSTGRES_CONFIG.copy()
-    config['client_encoding'] = 'UTF8'
-    return psycopg2.connect(**config)
+# Os pools são criados uma única vez (na subida da API ou no primeiro uso) e
+# compartilhados por todas as rotas; as funções abaixo nunca abrem conexões novas
+_pools = {}
+_pools_lock = threading.Lock()
+# Fontes e armazém em processo (repositorios.ArmazenamentoMemoria) usados no
+# lugar dos bancos configurados, em testes e benchmarks (None: bancos reais)
+_armazenamento = None
+# Arquivo com fontes em memória (ArmazenamentoMemoria.salvar) lidas pelos
+# processos de consolidação no lugar dos bancos (None: bancos reais)
+_fontes_processos = None
+
+
+def _obter_pool(nome: str, criar):
+    """Retorna o pool `nome`, criando-o na primeira chamada."""
+    pool = _pools.get(nome)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(nome)
+            if pool is None:
+                pool = _pools[nome] = criar()
+    return pool
+
+
+def get_postgres_pool() -> ThreadedConnectionPool:
+    """Retorna o pool de conexões do PostgreSQL."""
+    def criar():
+        config = POSTGRES_CONFIG.copy()
+        config['client_encoding'] = 'UTF8'
+        config['cursor_factory'] = CursorPostgresContado
+        return ThreadedConnectionPool(POOL_CONFIG['postgres_min'], POOL_CONFIG['postgres_max'], **config)
+    return _obter_pool('postgres', criar)
+
+
+@contextmanager
+def postgres_conexao():
+    """Empresta uma conexão do pool do PostgreSQL e a devolve (sem transação aberta) ao final."""
+    pool = get_postgres_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        if not conn.closed:
+            conn.rollback()
+        pool.putconn(conn, close=bool(conn.closed))
 
 def get_mongodb_client():
-    """Retorna cliente MongoDB."""
-    return MongoClient(
+    """Retorna o cliente MongoDB compartilhado (que mantém seu próprio pool)."""
+    return _obter_pool('mongodb', lambda: MongoClient(
         f"mongodb://{MONGODB_CONFIG['username']}:{MONGODB_CONFIG['password']}@"
         f"{MONGODB_CONFIG['host']}:{MONGODB_CONFIG['port']}/"
-        f"?authSource={MONGODB_CONFIG['authSource']}"
-    )
+        f"?authSource={MONGODB_CONFIG['authSource']}",
+        maxPoolSize=POOL_CONFIG['mongodb_max'],
+        event_listeners=[OuvinteComandosMongoDB()]
+    ))
 
 def get_neo4j_driver():
-    """Retorna driver Neo4j."""
-    return GraphDatabase.driver(
+    """Retorna o driver Neo4j compartilhado (que mantém seu próprio pool)."""
+    return _obter_pool('neo4j', lambda: GraphDatabase.driver(
         NEO4J_CONFIG['uri'],
-        auth=(NEO4J_CONFIG['user'], NEO4J_CONFIG['password'])
-    )
+        auth=(NEO4J_CONFIG['user'], NEO4J_CONFIG['password']),
+        max_connection_pool_size=POOL_CONFIG['neo4j_max']
+    ))
+
+def obter_armazem():
+    """Armazém dos documentos consolidados (o Redis configurado, ou o em processo)."""
+    if _armazenamento is not None:
+        return _armazenamento.armazem
+    return _obter_pool('redis', lambda: ArmazemRedis(REDIS_CONFIG, POOL_CONFIG['redis_max']))
 
 def get_redis_client():
-    """Retorna cliente Redis."""
-    return redis.Redis(**REDIS_CONFIG)
+    """
+    Retorna cliente Redis sobre o pool compartilhado. Chamar close() no
+    cliente apenas devolve a conexão ao pool.
+    """
+    return obter_armazem().cliente()
 
 
-@app.get("/", response_class=HTMLResponse)
-async def root():
-    """Serve a página HTML principal."""
+@contextmanager
+def abrir_fontes():
+    """
+    Repositórios das três fontes para uma sincronização: sobre uma conexão
+    emprestada do pool do PostgreSQL e os clientes compartilhados do MongoDB
+    e do Neo4j (ou os em processo, com `usar_armazenamento`).
+    """
+    if _armazenamento is not None:
+        yield _armazenamento.fontes()
+        return
+    with postgres_conexao() as pg_conn:
+        yield FontesDados(
+            RepositorioClientesPostgres(pg_conn),
+            RepositorioInteressesMongoDB(get_mongodb_client()['recomendacao_db']['clientes_interesses']),
+            RepositorioAmizadesNeo4j(get_neo4j_driver())
+        )
+
+
+def usar_armazenamento(armazenamento):
+    """
+    Passa a usar um repositorios.ArmazenamentoMemoria (fontes e armazém em
+    processo) no lugar dos bancos configurados; None volta aos bancos.
+    """
+    global _armazenamento
+    _armazenamento = armazenamento
+
+
+def usar_fontes_em_processos(caminho: Optional[str]):
+    """
+    Faz os processos de consolidação (SYNC_PROCESSOS > 1) lerem as fontes
+    gravadas em `caminho` por ArmazenamentoMemoria.salvar no lugar dos
+    bancos configurados, como no benchmark de processos; None volta aos
+    bancos. O armazém continua sendo o Redis de REDIS_CONFIG.
+    """
+    global _fontes_processos
+    _fontes_processos = caminho
+
+
+def buscar_dicionario_zstd(dict_id: int) -> Optional[bytes]:
+    """Bytes de um dicionário zstd guardado no Redis (usado pelo codec ao ler um valor comprimido com ele)."""
+    redis_client = get_redis_client()
     try:
-        static_path = Path("static/index.html")
-        if static_path.exists():
-            return FileResponse(str(static_path))
+        return redis_client.hget(CHAVE_DICIONARIOS, dict_id)
+    finally:
+        redis_client.close()
+
+
+def carregar_dicionario_ativo(redis_client) -> Optional[int]:
+    """Ativa no codec o dicionário zstd marcado como ativo no Redis (ou nenhum). Retorna o id dele."""
+    dict_id = redis_client.get(CHAVE_DICIONARIO_ATIVO)
+    dados = redis_client.hget(CHAVE_DICIONARIOS, dict_id) if dict_id is not None else None
+    return ativar_dicionario(dados)
+
+
+configurar_busca_dicionarios(buscar_dicionario_zstd)
+
+
+def verificar_pools() -> Dict[str, Dict[str, Any]]:
+    """Testa uma ida e volta em cada pool e retorna o estado de cada um."""
+    estado = {}
+    
+    def verificar(nome, teste, detalhes=None):
+        inicio = time.perf_counter()
+        try:
+            teste()
+            estado[nome] = {'ok': True, 'latencia_ms': round((time.perf_counter() - inicio) * 1000, 1)}
+        except Exception as e:
+            estado[nome] = {'ok': False, 'erro': str(e)}
+        if detalhes:
+            estado[nome].update(detalhes())
+    
+    def testar_postgres():
+        with postgres_conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+    
+    def detalhes_postgres():
+        pool = _pools.get('postgres')
+        if pool is None:
+            return {}
+        return {'em_uso': len(pool._used), 'livres': len(pool._pool), 'maximo': pool.maxconn}
+    
+    def testar_redis():
+        redis_client = get_redis_client()
+        try:
+            redis_client.ping()
+        finally:
+            redis_client.close()
+    
+    if _armazenamento is not None:
+        verificar('memoria', testar_redis)
+        return estado
+    
+    verificar('postgres', testar_postgres, detalhes_postgres)
+    verificar('mongodb', lambda: get_mongodb_client().admin.command('ping'),
+              lambda: {'maximo': POOL_CONFIG['mongodb_max']})
+    verificar('neo4j', lambda: get_neo4j_driver().verify_connectivity(),
+              lambda: {'maximo': POOL_CONFIG['neo4j_max']})
+    verificar('redis', testar_redis, lambda: obter_armazem().estado())
+    return estado
+
+
+def iniciar_pools():
+    """Cria os pools e abre as primeiras conexões, para a primeira requisição não pagar o handshake."""
+    print("Iniciando pools de conexão...")
+    for nome, estado in verificar_pools().items():
+        if estado['ok']:
+            print(f"[OK] Pool {nome} pronto ({estado['latencia_ms']} ms)")
         else:
-            return "<h1>Arquivo index.html não encontrado</h1>"
+            print(f"[AVISO] Pool {nome} indisponível na subida: {estado['erro']}")
+
+
+def encerrar_pools():
+    """Fecha todas as conexões dos pools."""
+    with _pools_lock:
+        pools = dict(_pools)
+        _pools.clear()
+    if 'postgres' in pools:
+        pools['postgres'].closeall()
+    if 'mongodb' in pools:
+        pools['mongodb'].close()
+    if 'neo4j' in pools:
+        pools['neo4j'].close()
+    if 'redis' in pools:
+        pools['redis'].fechar()
+
+
+# Funções auxiliares das gerações do Redis
+def chave_cliente(geracao: int, cliente_id: int) -> str:
+    """Chave do documento consolidado de um cliente dentro de uma geração."""
+    return f"g{geracao}:cliente:{cliente_id}"
+
+
+def chave_layout(geracao: int) -> str:
+    """Chave com o layout (REDIS_LAYOUT) em que os clientes de uma geração foram gravados."""
+    return f"g{geracao}:layout"
+
+
+# Partes do documento consolidado (campos do hash de cada cliente no layout `hash`)
+CAMPOS_DOCUMENTO = ('dados_pessoais', 'compras', 'interesses', 'amigos', 'recomendacoes', 'ultima_atualizacao')
+# Contadores gravados junto com as partes no layout `hash`: contador -> parte contada
+CONTADORES_DOCUMENTO = {
+    'num_compras': 'compras',
+    'num_amigos': 'amigos',
+    'num_interesses': 'interesses',
+    'num_recomendacoes': 'recomendacoes',
+}
+
+
+def gravar_cliente(pipe, geracao: int, cliente_data: Dict[str, Any]):
+    """Enfileira no pipeline a gravação de um documento consolidado no layout configurado."""
+    chave = chave_cliente(geracao, cliente_data['dados_pessoais']['id'])
+    if REDIS_LAYOUT == 'hash':
+        campos = {campo: codificar(cliente_data[campo]) for campo in CAMPOS_DOCUMENTO}
+        campos.update((contador, len(cliente_data[parte])) for contador, parte in CONTADORES_DOCUMENTO.items())
+        pipe.hset(chave, mapping=campos)
+    else:
+        pipe.set(chave, codificar(cliente_data))
+
+
+def ler_documentos(redis_client, geracao: int, ids: List[int],
+                   campos: Optional[Iterable[str]] = None) -> List[Optional[Dict[str, Any]]]:
+    """
+    Lê os documentos consolidados de `ids` com uma única ida ao Redis, na
+    mesma ordem (None para os clientes que não existem). No layout `hash` só
+    as partes e contadores em `campos` são lidos (todas as partes, se None);
+    no layout `documento` o documento vem sempre inteiro.
+    """
+    chaves = [chave_cliente(geracao, cliente_id) for cliente_id in ids]
+    if not chaves:
+        return []
+    if REDIS_LAYOUT != 'hash':
+        return [decodificar(valor) if valor is not None else None for valor in redis_client.mget(chaves)]
+    
+    campos = list(campos or CAMPOS_DOCUMENTO)
+    with redis_client.pipeline(transaction=False) as pipe:
+        for chave in chaves:
+            pipe.hmget(chave, campos)
+        respostas = pipe.execute()
+    documentos = []
+    for valores in respostas:
+        if all(valor is None for valor in valores):
+            documentos.append(None)
+            continue
+        documentos.append({
+            campo: int(valor) if campo in CONTADORES_DOCUMENTO else decodificar(valor)
+            for campo, valor in zip(campos, valores) if valor is not None
+        })
+    return documentos
+
+
+def contar(cliente_data: Dict[str, Any], contador: str) -> int:
+    """Tamanho de uma parte do documento: o contador gravado (layout `hash`) ou o tamanho da lista."""
+    if contador in cliente_data:
+        return cliente_data[contador]
+    return len(cliente_data.get(CONTADORES_DOCUMENTO[contador], []))
+
+
+# Índices de ordenação mantidos por geração (sorted sets):
+# - id: score = id do cliente, membro = id
+# - nome: score 0, membro = "nome\x00id" (ordem lexicográfica por nome e depois id)
+# - recomendacoes: como `nome`, mas só com os clientes que têm recomendações
+ORDENS_INDICES = ('id', 'nome', 'recomendacoes')
+
+
+def chave_indice(geracao: int, ordem: str) -> str:
+    """Chave de um índice de ordenação dos clientes de uma geração."""
+    return f"g{geracao}:idx:{ordem}"
+
+
+def membro_nome(nome: Optional[str], cliente_id: int) -> str:
+    """Membro dos índices por nome; o id com zeros à esquerda desempata na ordem numérica."""
+    return f"{nome or ''}\x00{cliente_id:010d}"
+
+
+def entradas_indices(cliente_data: Dict[str, Any]) -> Dict[str, Dict[Any, int]]:
+    """Entradas (membro -> score) de um documento consolidado em cada índice de ordenação."""
+    dados_pessoais = cliente_data['dados_pessoais']
+    cliente_id = dados_pessoais['id']
+    membro = membro_nome(dados_pessoais.get('nome'), cliente_id)
+    entradas = {'id': {cliente_id: cliente_id}, 'nome': {membro: 0}}
+    if cliente_data.get('recomendacoes'):
+        entradas['recomendacoes'] = {membro: 0}
+    return entradas
+
+
+def chave_listagem(geracao: int, nome: str) -> str:
+    """Chave do corpo JSON pré-renderizado de uma rota de listagem."""
+    return f"g{geracao}:listagem:{nome}"
+
+
+def chave_itens_listagem(geracao: int, nome: str) -> str:
+    """Chave (hash cliente_id -> JSON) dos itens já renderizados de uma rota de listagem."""
+    return f"g{geracao}:itens:{nome}"
+
+
+def chave_produtos(geracao: int) -> str:
+    """Chave (hash produto_id -> JSON) do catálogo de produtos de uma geração."""
+    return f"g{geracao}:produtos"
+
+
+def chave_pessoas(geracao: int) -> str:
+    """Chave (hash pessoa_id -> JSON com nome e cpf) do resumo das pessoas de uma geração."""
+    return f"g{geracao}:pessoas"
+
+
+def referencias_documento(cliente_data: Dict[str, Any]) -> Tuple[set, set]:
+    """Ids de produtos e de pessoas citados por um documento consolidado."""
+    produtos = {compra['produto_id'] for compra in cliente_data.get('compras', [])}
+    pessoas = set(cliente_data.get('amigos', []))
+    for recomendacao in cliente_data.get('recomendacoes', []):
+        produtos.add(recomendacao['produto_id'])
+        pessoas.update(recomendacao['amigos_que_compraram'])
+    return produtos, pessoas
+
+
+def hidratar_documento(cliente_data: Dict[str, Any],
+                       produtos: Dict[int, Dict[str, Any]],
+                       pessoas: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Documento no formato completo servido pelas rotas: compras e recomendações
+    com os dados do produto, amigos com nome e cpf e, nas recomendações, os
+    nomes dos amigos que compraram.
+    """
+    def produto(produto_id):
+        dados = produtos.get(produto_id) or {}
+        return {'produto': dados.get('produto'), 'valor': dados.get('valor'), 'tipo': dados.get('tipo')}
+    
+    def pessoa(pessoa_id):
+        return pessoas.get(pessoa_id) or {}
+    
+    return {
+        **cliente_data,
+        'compras': [
+            {'id': compra['id'], 'data': compra['data'], **produto(compra['produto_id'])}
+            for compra in cliente_data.get('compras', [])
+        ],
+        'amigos': [
+            {'id': amigo_id, 'nome': pessoa(amigo_id).get('nome'), 'cpf': pessoa(amigo_id).get('cpf')}
+            for amigo_id in cliente_data.get('amigos', [])
+        ],
+        'recomendacoes': [
+            {
+                'produto_id': recomendacao['produto_id'],
+                **produto(recomendacao['produto_id']),
+                'amigos_que_compraram': [pessoa(amigo_id).get('nome') for amigo_id in recomendacao['amigos_que_compraram']]
+            }
+            for recomendacao in cliente_data.get('recomendacoes', [])
+        ]
+    }
+
+
+def carregar_catalogos(redis_client, geracao: int, ids_produtos: Iterable[int],
+                       ids_pessoas: Iterable[int]) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, Dict[str, Any]]]:
+    """Busca no Redis (HMGET em lotes de REDIS_LOTE_LEITURA) os produtos e as pessoas informados."""
+    produtos, pessoas = {}, {}
+    consultas = []
+    for chave, ids, destino in ((chave_produtos(geracao), list(ids_produtos), produtos),
+                                (chave_pessoas(geracao), list(ids_pessoas), pessoas)):
+        for inicio in range(0, len(ids), REDIS_LOTE_LEITURA):
+            consultas.append((chave, ids[inicio:inicio + REDIS_LOTE_LEITURA], destino))
+    if not consultas:
+        return produtos, pessoas
+    
+    with redis_client.pipeline(transaction=False) as pipe:
+        for chave, lote, _ in consultas:
+            pipe.hmget(chave, lote)
+        respostas = pipe.execute()
+    for (_, lote, destino), valores in zip(consultas, respostas):
+        destino.update((item_id, decodificar(valor)) for item_id, valor in zip(lote, valores) if valor is not None)
+    return produtos, pessoas
+
+
+def catalogos_dos_documentos(redis_client, geracao: int, documentos: List[Dict[str, Any]]
+                             ) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, Dict[str, Any]]]:
+    """Produtos e pessoas citados por um lote de documentos, com uma única ida ao Redis."""
+    ids_produtos, ids_pessoas = set(), set()
+    for cliente_data in documentos:
+        produtos, pessoas = referencias_documento(cliente_data)
+        ids_produtos.update(produtos)
+        ids_pessoas.update(pessoas)
+    return carregar_catalogos(redis_client, geracao, ids_produtos, ids_pessoas)
+
+
+def hidratar_documentos(redis_client, geracao: int, documentos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Hidrata um lote de documentos com uma única ida ao Redis para os catálogos."""
+    produtos, pessoas = catalogos_dos_documentos(redis_client, geracao, documentos)
+    return [hidratar_documento(cliente_data, produtos, pessoas) for cliente_data in documentos]
+
+
+def ler_clientes(redis_client, campos: Optional[Iterable[str]] = None,
+                 geracao: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Percorre, em ordem de id, os documentos consolidados (já hidratados) da
+    geração publicada (ou de `geracao`). Os ids vêm do índice da geração e os
+    documentos são lidos em lotes de REDIS_LOTE_LEITURA clientes (nunca com
+    KEYS); no layout `hash`, só as partes em `campos`.
+    """
+    if geracao is None:
+        geracao = obter_geracao_atual(redis_client)
+    if geracao is None:
+        return
+    ids = [int(cliente_id) for cliente_id in redis_client.zrange(chave_indice(geracao, 'id'), 0, -1)]
+    for inicio in range(0, len(ids), REDIS_LOTE_LEITURA):
+        lote = ids[inicio:inicio + REDIS_LOTE_LEITURA]
+        # Um cliente removido por uma sincronização incremental no meio da leitura fica de fora
+        documentos = [
+            cliente_data for cliente_data in ler_documentos(redis_client, geracao, lote, campos)
+            if cliente_data is not None
+        ]
+        yield from hidratar_documentos(redis_client, geracao, documentos)
+
+
+def obter_geracao_atual(redis_client) -> Optional[int]:
+    """Retorna a geração publicada (None se nenhuma sincronização completa terminou)."""
+    geracao = redis_client.get(CHAVE_GERACAO_ATUAL)
+    return int(geracao) if geracao is not None else None
+
+
+def publicar_geracao(redis_client, geracao: int, watermarks: Dict[str, str]) -> bool:
+    """
+    Troca o ponteiro da geração atual (junto com as marcas d'água) em uma
+    transação. Não publica se uma sincronização mais nova já foi publicada.
+    """
+    with redis_client.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(CHAVE_GERACAO_ATUAL)
+                atual = pipe.get(CHAVE_GERACAO_ATUAL)
+                if atual is not None and int(atual) > geracao:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.set(CHAVE_GERACAO_ATUAL, geracao)
+                pipe.hset(CHAVE_WATERMARKS, mapping=watermarks)
+                pipe.incr(CHAVE_REVISAO)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                continue
+
+
+def apagar_geracao(redis_client, geracao: int):
+    """Remove todas as chaves de uma geração (SCAN + UNLINK, sem bloquear o Redis)."""
+    lote = []
+    for chave in redis_client.scan_iter(match=f"g{geracao}:*", count=1000):
+        lote.append(chave)
+        if len(lote) >= 1000:
+            redis_client.unlink(*lote)
+            lote = []
+    if lote:
+        redis_client.unlink(*lote)
+    redis_client.srem(CHAVE_GERACOES, geracao)
+
+
+def coletar_geracoes(descartar: Optional[int] = None):
+    """
+    Apaga as gerações anteriores à publicada e, se informada, uma geração
+    descartada por uma sincronização que falhou.
+    """
+    redis_client = get_redis_client()
+    try:
+        atual = obter_geracao_atual(redis_client)
+        for geracao in redis_client.smembers(CHAVE_GERACOES):
+            geracao = int(geracao)
+            if geracao == descartar or (atual is not None and geracao < atual):
+                print(f"Removendo geração antiga g{geracao} do Redis...")
+                apagar_geracao(redis_client, geracao)
     except Exception as e:
-        return f"<h1>Erro ao carregar página: {str(e)}</h1>"
+        print(f"Erro ao remover gerações antigas do Redis: {e}")
+    finally:
+        redis_client.close()
+
+
+def agendar_coleta_geracoes(descartar: Optional[int] = None):
+    """Agenda a coleta de gerações antigas em segundo plano, após SYNC_GC_ATRASO_S."""
+    timer = threading.Timer(SYNC_GC_ATRASO_S, coletar_geracoes, kwargs={'descartar': descartar})
+    timer.daemon = True
+    timer.start()
+
+
+# Funções auxiliares das rotas de listagem
+def item_cliente(cliente_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Projeção de um documento consolidado para GET /api/clientes."""
+    dados_pessoais = cliente_data.get('dados_pessoais', {})
+    return {
+        'id': dados_pessoais.get('id'),
+        'cpf': dados_pessoais.get('cpf'),
+        'nome': dados_pessoais.get('nome'),
+        'cidade': dados_pessoais.get('cidade'),
+        'uf': dados_pessoais.get('uf'),
+        'email': dados_pessoais.get('email'),
+        'interesses': cliente_data.get('interesses', []),
+        'num_compras': contar(cliente_data, 'num_compras'),
+        'num_amigos': contar(cliente_data, 'num_amigos'),
+        'num_interesses': contar(cliente_data, 'num_interesses')
+    }
+
+
+def item_cliente_amigos(cliente_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Projeção de um documento consolidado para GET /api/clientes/amigos."""
+    dados_pessoais = cliente_data.get('dados_pessoais', {})
+    amigos = cliente_data.get('amigos', [])
+    return {
+        'cliente': {
+            'id': dados_pessoais.get('id'),
+            'nome': dados_pessoais.get('nome'),
+            'cpf': dados_pessoais.get('cpf')
+        },
+        'amigos': amigos,
+        'total_amigos': len(amigos)
+    }
+
+
+def item_cliente_compras(cliente_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Projeção de um documento consolidado para GET /api/clientes/compras."""
+    dados_pessoais = cliente_data.get('dados_pessoais', {})
+    compras = cliente_data.get('compras', [])
+    
+    # Calcular valor total
+    valor_total = sum(compra.get('valor') or 0 for compra in compras)
+    
+    return {
+        'cliente': {
+            'id': dados_pessoais.get('id'),
+            'nome': dados_pessoais.get('nome'),
+            'cpf': dados_pessoais.get('cpf'),
+            'cidade': dados_pessoais.get('cidade')
+        },
+        'compras': compras,
+        'total_compras': len(compras),
+        'valor_total': round(valor_total, 2)
+    }
+
+
+def item_recomendacoes(cliente_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Projeção para GET /api/recomendacoes (None para clientes sem recomendações)."""
+    dados_pessoais = cliente_data.get('dados_pessoais', {})
+    recomendacoes = cliente_data.get('recomendacoes', [])
+    if not recomendacoes:
+        return None
+    return {
+        'cliente_id': dados_pessoais.get('id'),
+        'cliente_nome': dados_pessoais.get('nome'),
+        'cliente_cpf': dados_pessoais.get('cpf'),
+        'recomendacoes': recomendacoes,
+        'total_recomendacoes': len(recomendacoes)
+    }
 
 
-@app.post("/api/sync_data")
-async def sync_data():
+# Listagens: nome -> (campo da lista na resposta, projeção, índice que dá a ordem da listagem)
+LISTAGENS = {
+    'clientes': ('clientes', item_cliente, 'id'),
+    'clientes_amigos': ('clientes_amigos', item_cliente_amigos, 'nome'),
+    'clientes_compras': ('clientes_compras', item_cliente_compras, 'nome'),
+    'recomendacoes': ('recomendacoes', item_recomendacoes, 'recomendacoes'),
+}
+
+# Partes do documento usadas pela projeção de cada listagem (lidas no layout `hash`)
+CAMPOS_LISTAGENS = {
+    'clientes': ('dados_pessoais', 'interesses', 'num_compras', 'num_amigos'),
+    'clientes_amigos': ('dados_pessoais', 'amigos'),
+    'clientes_compras': ('dados_pessoais', 'compras'),
+    'recomendacoes': ('dados_pessoais', 'recomendacoes'),
+}
+
+
+def codificar_json(dados: Any) -> bytes:
+    """JSON compacto (UTF-8) usado nos corpos e itens pré-renderizados."""
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def itens_listagens(cliente_data: Dict[str, Any],
+                    produtos: Dict[int, Dict[str, Any]],
+                    pessoas: Dict[int, Dict[str, Any]]) -> Dict[str, Optional[bytes]]:
     """
-    Rota de ETL: Consolida dados de PostgreSQL, MongoDB e Neo4j no Redis.
-    Limpa o Redis e recria os dados consolidados.
+    Item JSON de um documento consolidado em cada rota de listagem, já
+    hidratado com os catálogos informados (None nas listagens em que o
+    cliente não entra).
+    """
+    documento = hidratar_documento(cliente_data, produtos, pessoas)
+    itens = {}
+    for nome, (_, projetar, _) in LISTAGENS.items():
+        item = projetar(documento)
+        itens[nome] = codificar_json(item) if item is not None else None
+    return itens
+
+
+def gravar_itens_listagens(pipe, geracao: int, itens_lote: Dict[str, Dict[int, Optional[bytes]]]):
+    """
+    Enfileira no pipeline os itens acumulados das listagens (HSET, ou HDEL
+    para os clientes que saíram de uma listagem) e esvazia o acumulador.
+    """
+    for nome, itens in itens_lote.items():
+        chave = chave_itens_listagem(geracao, nome)
+        gravar = {cliente_id: item for cliente_id, item in itens.items() if item is not None}
+        remover = [cliente_id for cliente_id, item in itens.items() if item is None]
+        if gravar:
+            pipe.hset(chave, mapping=gravar)
+        if remover:
+            pipe.hdel(chave, *remover)
+        itens.clear()
+
+
+def ids_dos_membros(ordem: str, membros: List[bytes]) -> List[int]:
+    """Ids dos clientes a partir dos membros de um índice de ordenação."""
+    if ordem == 'id':
+        return [int(membro) for membro in membros]
+    return [int(membro.rsplit(b'\x00', 1)[1]) for membro in membros]
+
+
+def lotes_listagem(redis_client, geracao: int, nome: str) -> Iterator[List[bytes]]:
+    """
+    Percorre, na ordem da listagem, os itens já renderizados: o índice da
+    listagem é lido em faixas de REDIS_LOTE_LEITURA posições (ZRANGE) e os
+    itens de cada faixa com um HMGET. Nenhum documento é lido nem hidratado.
+    """
+    ordem = LISTAGENS[nome][2]
+    chave = chave_indice(geracao, ordem)
+    inicio = 0
+    while True:
+        membros = redis_client.zrange(chave, inicio, inicio + REDIS_LOTE_LEITURA - 1)
+        if not membros:
+            return
+        valores = redis_client.hmget(chave_itens_listagem(geracao, nome), ids_dos_membros(ordem, membros))
+        # Um cliente removido no meio da leitura fica de fora
+        yield [valor for valor in valores if valor is not None]
+        inicio += len(membros)
+
+
+def cabecalho_listagem(nome: str, total: int) -> bytes:
+    """Início do corpo JSON de uma listagem, até a abertura da lista de itens."""
+    return b'{"status":"success","total":%d,%s:[' % (total, codificar_json(LISTAGENS[nome][0]))
+
+
+def montar_listagem(redis_client, geracao: int, nome: str) -> bytes:
+    """Corpo JSON completo de uma listagem, montado a partir dos itens já renderizados."""
+    itens = [item for lote in lotes_listagem(redis_client, geracao, nome) for item in lote]
+    return cabecalho_listagem(nome, len(itens)) + b','.join(itens) + b']}'
+
+
+def gravar_listagem(redis_client, geracao: int, nome: str) -> int:
+    """
+    Grava o corpo de uma listagem de uma geração ainda não publicada em
+    partes (SET do cabeçalho e um APPEND por faixa do índice), sem montar o
+    corpo inteiro em memória. Retorna a quantidade de itens.
+    """
+    chave = chave_listagem(geracao, nome)
+    total = redis_client.zcard(chave_indice(geracao, LISTAGENS[nome][2]))
+    redis_client.set(chave, cabecalho_listagem(nome, total))
+    separador = b''
+    for lote in lotes_listagem(redis_client, geracao, nome):
+        if lote:
+            redis_client.append(chave, separador + b','.join(lote))
+            separador = b','
+    redis_client.append(chave, b']}')
+    return total
+
+
+# Uma montagem por listagem por vez neste processo (as demais leituras esperam por ela)
+_travas_listagens = {nome: threading.Lock() for nome in LISTAGENS}
+
+
+def obter_listagem(redis_client, nome: str):
     """
+    Retorna o corpo pré-renderizado de uma listagem da geração publicada.
+    As sincronizações completas gravam os corpos antes de publicar; as
+    incrementais atualizam só os itens dos clientes afetados e descartam os
+    corpos. Um corpo que falta é montado a partir dos itens (sem ler nem
+    hidratar documentos) por uma única leitura, enquanto as demais esperam,
+    e gravado de volta, a menos que outra sincronização tenha sido publicada
+    durante a montagem (WATCH em sync:revisao).
+    """
+    geracao = obter_geracao_atual(redis_client)
+    if geracao is None:
+        return cabecalho_listagem(nome, 0) + b']}'
+    corpo = redis_client.get(chave_listagem(geracao, nome))
+    if corpo is not None:
+        return corpo
+    
+    with _travas_listagens[nome], redis_client.pipeline() as pipe:
+        pipe.watch(CHAVE_REVISAO)
+        geracao = obter_geracao_atual(pipe)
+        if geracao is None:
+            return cabecalho_listagem(nome, 0) + b']}'
+        corpo = pipe.get(chave_listagem(geracao, nome))
+        if corpo is not None:
+            return corpo
+        
+        corpo = montar_listagem(redis_client, geracao, nome)
+        try:
+            pipe.multi()
+            pipe.set(chave_listagem(geracao, nome), corpo)
+            pipe.execute()
+        except redis.WatchError:
+            pass
+        return corpo
+
+
+def codificar_cursor(membro: str) -> str:
+    """Cursor opaco (base64 URL-safe) a partir do último membro de índice de uma página."""
+    return base64.urlsafe_b64encode(str(membro).encode('utf-8')).decode('ascii')
+
+
+def decodificar_cursor(cursor: str) -> str:
+    """Inverso de codificar_cursor; cursores inválidos geram HTTP 400."""
+    try:
+        return base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Parâmetro cursor inválido")
+
+
+def obter_pagina(redis_client, nome: str, limit: int, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Retorna uma página de uma listagem, na mesma ordem da listagem completa,
+    usando o índice ordenado da geração publicada (ZRANGE) e lendo só os
+    clientes da página (e, no layout `hash`, só as partes que a listagem usa). `next_cursor` é None na última página.
+    """
+    campo, projetar, ordem = LISTAGENS[nome]
+    geracao = obter_geracao_atual(redis_client)
+    if geracao is None:
+        return {"status": "success", "total": 0, campo: [], "next_cursor": None}
+    
+    chave = chave_indice(geracao, ordem)
+    ultimo = decodificar_cursor(cursor) if cursor else None
+    if ordem == 'id' and ultimo is not None and not ultimo.isdigit():
+        raise HTTPException(status_code=400, detail="Parâmetro cursor inválido")
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zcard(chave)
+        if ordem == 'id':
+            inicio = f"({int(ultimo)}" if ultimo is not None else '-inf'
+            pipe.zrange(chave, inicio, '+inf', byscore=True, offset=0, num=limit)
+        else:
+            inicio = f"({ultimo}" if ultimo is not None else '-'
+            pipe.zrange(chave, inicio, '+', bylex=True, offset=0, num=limit)
+        total, membros = pipe.execute()
+    
+    membros = [membro.decode('utf-8') for membro in membros]
+    ids = membros if ordem == 'id' else [membro.rsplit('\x00', 1)[1] for membro in membros]
+    itens = []
+    if ids:
+        documentos = [
+            cliente_data
+            for cliente_data in ler_documentos(redis_client, geracao, [int(cliente_id) for cliente_id in ids],
+                                               CAMPOS_LISTAGENS[nome])
+            if cliente_data is not None
+        ]
+        for cliente_data in hidratar_documentos(redis_client, geracao, documentos):
+            item = projetar(cliente_data)
+            if item is not None:
+                itens.append(item)
+    
+    return {
+        "status": "success",
+        "total": total,
+        campo: itens,
+        "next_cursor": codificar_cursor(membros[-1]) if len(membros) == limit else None
+    }
+
+
+def transmitir_listagem(nome: str, cursor: Optional[str]) -> StreamingResponse:
+    """
+    Listagem completa em NDJSON (um item JSON por linha), na mesma ordem da
+    listagem normal. Os itens são lidos do Redis página a página (como em
+    `limit=REDIS_LOTE_LEITURA`) e cada página é enviada assim que fica pronta,
+    com memória constante. Com `cursor`, começa depois dele.
+    """
+    campo = LISTAGENS[nome][0]
+    redis_client = get_redis_client()
     try:
-        print("Iniciando sincronização de dados...")
+        # A primeira página é lida antes de responder: erros (ex.: cursor inválido) ainda viram HTTP 4xx/5xx
+        pagina = obter_pagina(redis_client, nome, REDIS_LOTE_LEITURA, cursor)
+    except BaseException:
+        redis_client.close()
+        raise
+    
+    def linhas():
+        nonlocal pagina
+        try:
+            while True:
+                if pagina[campo]:
+                    yield ''.join(
+                        json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n' for item in pagina[campo]
+                    ).encode('utf-8')
+                if pagina['next_cursor'] is None:
+                    return
+                pagina = obter_pagina(redis_client, nome, REDIS_LOTE_LEITURA, pagina['next_cursor'])
+        finally:
+            redis_client.close()
+    
+    corpo = linhas()
+    if DEBUG_PROFILE_TOKEN:
+        # Com ?profile=1, as páginas lidas depois da resposta também entram no perfil
+        corpo = perfilar_iterador(corpo)
+    return StreamingResponse(corpo, media_type="application/x-ndjson")
+
+
+def quer_ndjson(request: Request, stream: bool) -> bool:
+    """Se a listagem deve ser transmitida em NDJSON (`?stream=1` ou `Accept: application/x-ndjson`)."""
+    return stream or 'application/x-ndjson' in request.headers.get('accept', '')
+
+
+def responder_listagem(nome: str, limit: Optional[int], cursor: Optional[str], ndjson: bool = False):
+    """
+    Listagem completa (corpo pré-renderizado), uma página dela (com `limit`)
+    ou, com `ndjson`, a listagem completa transmitida em NDJSON.
+    """
+    if ndjson:
+        return transmitir_listagem(nome, cursor)
+    redis_client = get_redis_client()
+    try:
+        if limit is None:
+            return Response(content=obter_listagem(redis_client, nome), media_type="application/json")
+        return obter_pagina(redis_client, nome, limit, cursor)
+    finally:
+        redis_client.close()
+
+
+def chave_cache_cliente(tipo: str, cliente_id: int) -> str:
+    """Chave da resposta guardada de uma rota por cliente (`detalhe` ou `recomendacoes`)."""
+    return f"cache:{tipo}:{cliente_id}"
+
+
+def renderizar_detalhe_cliente(redis_client, geracao: int, cliente_id: int) -> Optional[bytes]:
+    """Corpo de GET /api/clientes/{id}: o documento consolidado completo (None se não existir)."""
+    cliente_data = ler_documentos(redis_client, geracao, [cliente_id])[0]
+    if cliente_data is None:
+        return None
+    cliente_data = hidratar_documentos(redis_client, geracao, [cliente_data])[0]
+    return json.dumps({"status": "success", "cliente": cliente_data},
+                      ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def renderizar_recomendacoes_cliente(redis_client, geracao: int, cliente_id: int) -> Optional[bytes]:
+    """
+    Corpo de GET /api/recomendacoes/{id}, calculado só para este cliente a
+    partir dos documentos dele e dos amigos na geração publicada.
+    """
+    cliente_data = ler_documentos(redis_client, geracao, [cliente_id], ('dados_pessoais', 'compras', 'amigos'))[0]
+    if cliente_data is None:
+        return None
+    amigos = cliente_data.get('amigos', [])
+    
+    compras_por_cliente = {cliente_id: cliente_data.get('compras', [])}
+    for inicio in range(0, len(amigos), REDIS_LOTE_LEITURA):
+        lote = amigos[inicio:inicio + REDIS_LOTE_LEITURA]
+        for amigo_id, amigo_data in zip(lote, ler_documentos(redis_client, geracao, lote, ('compras',))):
+            if amigo_data is not None:
+                compras_por_cliente[amigo_id] = amigo_data.get('compras', [])
+    cliente_data['recomendacoes'] = gerar_recomendacoes(
+        cliente_id, {cliente_id: [{'id': amigo_id} for amigo_id in amigos]}, compras_por_cliente
+    )
+    
+    cliente_data = hidratar_documentos(redis_client, geracao, [cliente_data])[0]
+    dados_pessoais = cliente_data['dados_pessoais']
+    return json.dumps({
+        "status": "success",
+        "cliente_id": dados_pessoais.get('id'),
+        "cliente_nome": dados_pessoais.get('nome'),
+        "cliente_cpf": dados_pessoais.get('cpf'),
+        "recomendacoes": cliente_data['recomendacoes'],
+        "total_recomendacoes": len(cliente_data['recomendacoes'])
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+# Rotas por cliente: tipo -> função que renderiza a resposta
+RENDERIZADORES_CLIENTE = {
+    'detalhe': renderizar_detalhe_cliente,
+    'recomendacoes': renderizar_recomendacoes_cliente,
+}
+
+
+def obter_resposta_cliente(redis_client, tipo: str, cliente_id: int) -> Optional[bytes]:
+    """
+    Resposta de uma rota por cliente. Um único MGET traz a geração publicada,
+    a revisão e a resposta guardada; ela vale se foi gerada na mesma geração e
+    revisão (qualquer sincronização a invalida). Se faltar ou estiver velha, é
+    renderizada só para este cliente e guardada por CACHE_CLIENTE_TTL_S.
+    Retorna None se o cliente não existir.
+    """
+    chave = chave_cache_cliente(tipo, cliente_id)
+    geracao, revisao, guardada = redis_client.mget(CHAVE_GERACAO_ATUAL, CHAVE_REVISAO, chave)
+    if geracao is None:
+        return None
+    carimbo = f"{int(geracao)}:{int(revisao or 0)}".encode('ascii')
+    if guardada is not None:
+        carimbo_guardado, _, corpo = guardada.partition(b'\n')
+        if carimbo_guardado == carimbo:
+            return corpo
+    
+    corpo = RENDERIZADORES_CLIENTE[tipo](redis_client, int(geracao), cliente_id)
+    if corpo is not None:
+        redis_client.set(chave, carimbo + b'\n' + corpo, ex=CACHE_CLIENTE_TTL_S)
+    return corpo
+
+
+def responder_cliente(tipo: str, cliente_id: int):
+    """Resposta JSON de uma rota por cliente (404 se o cliente não existir no Redis)."""
+    redis_client = get_redis_client()
+    try:
+        corpo = obter_resposta_cliente(redis_client, tipo, cliente_id)
+    finally:
+        redis_client.close()
+    if corpo is None:
+        raise HTTPException(status_code=404, detail=f"Cliente {cliente_id} não encontrado")
+    return Response(content=corpo, media_type="application/json")
+
+
+# Funções auxiliares de extração
+def capturar_watermarks(fontes: FontesDados) -> Dict[str, str]:
+    """
+    Lê o "agora" de cada fonte antes da extração. Alterações feitas depois
+    deste ponto ficam para a próxima sincronização incremental. Junto vai a
+    quantidade de amizades até a marca do Neo4j, para a próxima sincronização
+    incremental perceber amizades removidas.
+    """
+    marca_neo4j = fontes.amizades.marca_dagua()
+    return {
+        'postgres': fontes.clientes.marca_dagua(),
+        'mongodb': fontes.interesses.marca_dagua(),
+        'neo4j': marca_neo4j,
+        'neo4j_arestas': str(fontes.amizades.contar_arestas_ate(int(marca_neo4j)))
+    }
+
+
+def produtos_das_compras(compras_por_cliente: Dict[int, List[Dict[str, Any]]]) -> set:
+    """Ids dos produtos citados pelas compras extraídas."""
+    return {compra['produto_id'] for compras in compras_por_cliente.values() for compra in compras}
+
+
+def resumo_pessoas(amigos_por_cliente: Dict[int, List[Dict[str, Any]]]) -> Dict[int, Dict[str, Any]]:
+    """Nome e cpf (do Neo4j) de cada pessoa que aparece como amigo, por id."""
+    return {
+        amigo['id']: {'nome': amigo['nome'], 'cpf': amigo['cpf']}
+        for amigos in amigos_por_cliente.values()
+        for amigo in amigos
+    }
+
+
+def extrair_em_paralelo(tarefas: Dict[str, Callable[[], Any]]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Executa as extrações de cada fonte ao mesmo tempo, uma thread por fonte
+    (os drivers são bloqueantes e liberam o GIL durante a E/S). Retorna o
+    resultado e a duração em ms de cada tarefa.
+    """
+    def cronometrar(funcao):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        return resultado, round((time.perf_counter() - inicio) * 1000, 1)
+    
+    with ThreadPoolExecutor(max_workers=len(tarefas), thread_name_prefix='extracao') as executor:
+        futuros = {nome: executor.submit(cronometrar, funcao) for nome, funcao in tarefas.items()}
+        concluidos = {nome: futuro.result() for nome, futuro in futuros.items()}
+    
+    resultados = {nome: resultado for nome, (resultado, _) in concluidos.items()}
+    tempos = {nome: duracao for nome, (_, duracao) in concluidos.items()}
+    return resultados, tempos
+
+
+def contar_linhas(por_cliente: Dict[int, list]) -> int:
+    """Total de itens (compras, amigos...) de um agrupamento por cliente."""
+    return sum(len(itens) for itens in por_cliente.values())
+
+
+def medir_extracao(progresso: 'ProgressoSync', tempos_ms: Dict[str, float], linhas: Dict[str, int]):
+    """Registra nas medidas do progresso o tempo (ms) e as linhas lidas de cada fonte."""
+    for fonte, duracao in tempos_ms.items():
+        progresso.medir(f"extracao_{fonte}", duracao / 1000, linhas=linhas.get(fonte, 0))
+
+
+def marca_mongodb_com_margem(marca: str) -> str:
+    """
+    Recua a marca d'água dos interesses (a maior `data_atualizacao`, string
+    ISO gravada pelos clientes) em SYNC_MARGEM_WATERMARK_S e mais um segundo,
+    sem a fração. Como a comparação no MongoDB é entre strings, a data sem a
+    fração (gravada por versões antigas) fica antes da marca com fração do
+    mesmo segundo; com a marca no segundo anterior, as duas formas entram.
+    """
+    if not marca:
+        return marca
+    try:
+        data = datetime.fromisoformat(marca)
+    except ValueError:
+        return marca
+    desde = data.replace(microsecond=0) - timedelta(seconds=SYNC_MARGEM_WATERMARK_S + 1)
+    return desde.isoformat(timespec='seconds')
+
+
+def descartar_remocoes_refletidas(fontes: FontesDados, watermarks: Dict[str, str]):
+    """
+    Depois de publicada uma sincronização completa, descarta as remoções
+    registradas no PostgreSQL até a marca d'água dela (menos a margem usada
+    pela detecção incremental), que já não fazem diferença.
+    """
+    try:
+        ate = datetime.fromisoformat(watermarks['postgres']) - timedelta(seconds=SYNC_MARGEM_WATERMARK_S)
+        fontes.clientes.descartar_remocoes(ate)
+    except Exception as e:
+        print(f"Erro ao descartar o registro de remoções: {e}")
+
+
+def detectar_clientes_alterados(fontes: FontesDados, watermarks: Dict[str, str]) -> Optional[set]:
+    """
+    Descobre quais documentos `cliente:{id}` precisam ser refeitos desde as
+    marcas d'água da última sincronização.
+
+    Além dos próprios clientes alterados, entram os amigos de quem teve compras
+    (ou produtos comprados) alteradas ou removidas e de quem mudou de nome no
+    Neo4j, pois as recomendações e a lista de amigos deles dependem desses dados.
+
+    Retorna None quando amizades foram removidas no Neo4j desde a última
+    sincronização: não há registro de quais eram, então é preciso uma
+    sincronização completa.
+    """
+    margem = timedelta(seconds=SYNC_MARGEM_WATERMARK_S)
+    desde_pg = datetime.fromisoformat(watermarks['postgres']) - margem
+    desde_neo4j = int(watermarks['neo4j']) - SYNC_MARGEM_WATERMARK_S * 1000
+
+    arestas_antes = watermarks.get('neo4j_arestas')
+    if arestas_antes is None or fontes.amizades.contar_arestas_ate(int(watermarks['neo4j'])) < int(arestas_antes):
+        return None
+
+    afetados, propagar_para_amigos = fontes.clientes.alterados_desde(desde_pg)
+    afetados.update(fontes.interesses.alterados_desde(marca_mongodb_com_margem(watermarks['mongodb'])))
+    amizades_alteradas, pessoas_alteradas = fontes.amizades.alterados_desde(desde_neo4j)
+    afetados.update(amizades_alteradas)
+    propagar_para_amigos.update(pessoas_alteradas)
+
+    if propagar_para_amigos:
+        afetados.update(propagar_para_amigos)
+        for amigos in fontes.amizades.amigos(list(propagar_para_amigos)).values():
+            afetados.update(amigo['id'] for amigo in amigos)
+
+    afetados.discard(None)
+    return afetados
+
+
+# Funções auxiliares de consolidação
+def consolidar_cliente(cliente: tuple,
+                       compras_por_cliente: Dict[int, List[Dict[str, Any]]],
+                       interesses_por_cliente: Dict[int, List[str]],
+                       amigos_por_cliente: Dict[int, List[Dict[str, Any]]],
+                       recomendacoes: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Monta o documento consolidado de um cliente (linha da tabela `clientes`).
+    Produtos e amigos são gravados só pelo id; os dados deles ficam nos
+    catálogos da geração (`gravar_catalogos`). As recomendações podem vir já
+    calculadas em lote (`calcular_recomendacoes`).
+    """
+    cliente_id = cliente[0]
+    
+    # Dados pessoais
+    dados_pessoais = {
+        'id': cliente_id,
+        'cpf': cliente[1],
+        'nome': cliente[2],
+        'endereco': cliente[3],
+        'cidade': cliente[4],
+        'uf': cliente[5],
+        'email': cliente[6]
+    }
+    
+    return {
+        'dados_pessoais': dados_pessoais,
+        'compras': compras_por_cliente.get(cliente_id, []),
+        'interesses': interesses_por_cliente.get(cliente_id, []),
+        'amigos': [amigo['id'] for amigo in amigos_por_cliente.get(cliente_id, [])],
+        'recomendacoes': recomendacoes if recomendacoes is not None
+                         else gerar_recomendacoes(cliente_id, amigos_por_cliente, compras_por_cliente),
+        'ultima_atualizacao': datetime.now().isoformat()
+    }
+
+
+def gravar_catalogos(pipe, geracao: int, produtos: Dict[int, Dict[str, Any]],
+                     pessoas: Dict[int, Dict[str, Any]]):
+    """
+    Enfileira no pipeline a gravação (HSET de até REDIS_LOTE_ESCRITA campos
+    por comando) do catálogo de produtos e do resumo das pessoas da geração.
+    """
+    for chave, itens in ((chave_produtos(geracao), produtos), (chave_pessoas(geracao), pessoas)):
+        itens = list(itens.items())
+        for inicio in range(0, len(itens), REDIS_LOTE_ESCRITA):
+            pipe.hset(chave, mapping={
+                item_id: codificar(dados)
+                for item_id, dados in itens[inicio:inicio + REDIS_LOTE_ESCRITA]
+            })
+
+
+def gravar_indices(pipe, geracao: int, indices_lote: Dict[str, Dict[Any, int]]):
+    """Enfileira no pipeline as entradas acumuladas dos índices de ordenação e esvazia o acumulador."""
+    for ordem, entradas in indices_lote.items():
+        if entradas:
+            pipe.zadd(chave_indice(geracao, ordem), entradas)
+            entradas.clear()
+
+
+def estatisticas_carga(clientes: int, chaves: int, inicio_carga: float) -> Dict[str, Any]:
+    """Resumo da etapa de carga no Redis (consolidação + gravação) para a resposta da sincronização."""
+    duracao = time.perf_counter() - inicio_carga
+    return {
+        'clientes_processados': clientes,
+        'chaves_gravadas': chaves,
+        'duracao_carga_ms': round(duracao * 1000, 1),
+        'chaves_por_segundo': round(chaves / duracao, 1) if duracao > 0 else None
+    }
+
+
+def chave_job(job_id: str) -> str:
+    """Chave do registro (JSON) de um job de sincronização."""
+    return f"sync:job:{job_id}"
+
+
+class ProgressoSync:
+    """
+    Acompanha a etapa atual, as contagens processados/total e o tempo de cada
+    etapa de uma sincronização. Quando recebe um job, grava o estado no Redis
+    (no máximo a cada SYNC_JOB_INTERVALO_PROGRESSO_S) para a rota de consulta.
+    """
+    
+    def __init__(self, redis_client=None, job: Optional[Dict[str, Any]] = None):
+        self.redis_client = redis_client
+        self.job = job if job is not None else {}
+        self.job.setdefault('etapas', [])
+        # Tempo e contagens acumulados de cada etapa das métricas
+        # (extracao_postgres, recomendacao, serializacao, carga_redis...)
+        self.medidas: Dict[str, Dict[str, Any]] = {}
+        self._inicio_etapa = None
+        self._ultima_gravacao = 0.0
+    
+    def etapa(self, nome: str, total: Optional[int] = None):
+        """Encerra a etapa anterior (registrando sua duração) e inicia a próxima."""
+        self._encerrar_etapa()
+        self._inicio_etapa = time.perf_counter()
+        self.job['etapa'] = nome
+        self.job['processados'] = 0
+        self.job['total'] = total
+        self.job['etapas'].append({'nome': nome, 'duracao_ms': None, 'inicio': time.time()})
+        self.gravar(forcar=True)
+    
+    def avancar(self, quantidade: int):
+        self.job['processados'] = self.job.get('processados', 0) + quantidade
+        self.gravar()
+    
+    def medir(self, etapa: str, segundos: float, linhas: int = 0, chaves: int = 0):
+        """Acumula tempo, linhas e chaves de uma etapa (publicados nas métricas ao fim da sincronização)."""
+        medida = self.medidas.setdefault(etapa, {'segundos': 0.0, 'linhas': 0, 'chaves': 0})
+        medida['segundos'] += segundos
+        medida['linhas'] += linhas
+        medida['chaves'] += chaves
+    
+    def somar_medidas(self, medidas: Dict[str, Dict[str, Any]]):
+        """Acumula as medidas de outro ProgressoSync (ex.: de um processo de consolidação)."""
+        for etapa, medida in medidas.items():
+            self.medir(etapa, **medida)
+    
+    def finalizar(self, status: str, **campos):
+        """Encerra a última etapa e grava o estado final do job."""
+        self._encerrar_etapa()
+        self.job['status'] = status
+        self.job['etapa'] = None
+        self.job['finalizado_em'] = datetime.now().isoformat()
+        self.job.update(campos)
+        self.gravar(forcar=True)
+    
+    def _encerrar_etapa(self):
+        if self._inicio_etapa is not None and self.job['etapas']:
+            self.job['etapas'][-1]['duracao_ms'] = round((time.perf_counter() - self._inicio_etapa) * 1000, 1)
+            self._inicio_etapa = None
+    
+    def gravar(self, forcar: bool = False):
+        if self.redis_client is None or 'id' not in self.job:
+            return
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_gravacao < SYNC_JOB_INTERVALO_PROGRESSO_S:
+            return
+        self._ultima_gravacao = agora
+        self.redis_client.set(chave_job(self.job['id']), json.dumps(self.job, ensure_ascii=False), ex=SYNC_JOB_TTL_S)
+
+
+def carregar_clientes(redis_client, geracao: int, clientes_pg: Iterable[tuple],
+                      compras_por_cliente: Dict[int, List[Dict[str, Any]]],
+                      interesses_por_cliente: Dict[int, List[str]],
+                      amigos_por_cliente: Dict[int, List[Dict[str, Any]]],
+                      progresso: ProgressoSync,
+                      catalogos: Optional[Tuple[Dict[int, Dict[str, Any]], Dict[int, Dict[str, Any]]]] = None) -> int:
+    """
+    Consolida os clientes e grava os documentos, os índices de ordenação e os
+    itens das listagens na geração informada, em pipelines de
+    REDIS_LOTE_ESCRITA clientes. Os itens são hidratados com `catalogos`
+    (produtos, pessoas) ou, se None, com os catálogos já gravados na geração.
+    Retorna a quantidade de clientes gravados.
+    """
+    gravados = 0
+    # Recomendações de todos os clientes calculadas de uma vez (matriz esparsa)
+    clientes_pg = list(clientes_pg)
+    inicio = time.perf_counter()
+    recomendacoes_por_cliente = calcular_recomendacoes(
+        [cliente[0] for cliente in clientes_pg], amigos_por_cliente, compras_por_cliente
+    )
+    progresso.medir('recomendacao', time.perf_counter() - inicio, linhas=len(clientes_pg))
+    inicio = time.perf_counter()
+    tempo_redis = 0.0
+    with redis_client.pipeline(transaction=False) as pipe:
+        indices_lote = {ordem: {} for ordem in ORDENS_INDICES}
+        itens_lote = {nome: {} for nome in LISTAGENS}
+        documentos = []
         
-        # Conectar nos bancos
-        pg_conn = get_postgres_connection()
-        mongo_client = get_mongodb_client()
-        neo4j_driver = get_neo4j_driver()
-        redis_client = get_redis_client()
+        def gravar_lote():
+            nonlocal tempo_redis, gravados
+            produtos, pessoas = catalogos or catalogos_dos_documentos(redis_client, geracao, documentos)
+            for cliente_data in documentos:
+                cliente_id = cliente_data['dados_pessoais']['id']
+                for nome, item in itens_listagens(cliente_data, produtos, pessoas).items():
+                    itens_lote[nome][cliente_id] = item
+            gravar_indices(pipe, geracao, indices_lote)
+            gravar_itens_listagens(pipe, geracao, itens_lote)
+            inicio_execucao = time.perf_counter()
+            pipe.execute()
+            tempo_redis += time.perf_counter() - inicio_execucao
+            progresso.avancar(len(documentos))
+            gravados += len(documentos)
+            documentos.clear()
         
-        # Limpar Redis
-        print("Limpando Redis...")
-        redis_client.flushdb()
+        for cliente in clientes_pg:
+            cliente_consolidado = consolidar_cliente(
+                cliente, compras_por_cliente, interesses_por_cliente, amigos_por_cliente,
+                recomendacoes_por_cliente[cliente[0]]
+            )
+            documentos.append(cliente_consolidado)
+            
+            # Salvar no Redis (chave: g{geracao}:cliente:{id}), em lotes de REDIS_LOTE_ESCRITA
+            gravar_cliente(pipe, geracao, cliente_consolidado)
+            for ordem, entradas in entradas_indices(cliente_consolidado).items():
+                indices_lote[ordem].update(entradas)
+            if len(documentos) >= REDIS_LOTE_ESCRITA:
+                gravar_lote()
+        if documentos:
+            gravar_lote()
+    # Consolidação e codificação dos documentos de um lado, envio ao Redis do outro
+    progresso.medir('serializacao', time.perf_counter() - inicio - tempo_redis, linhas=gravados)
+    progresso.medir('carga_redis', tempo_redis, chaves=gravados)
+    return gravados
+
+
+def consolidar_bloco(fontes: FontesDados, redis_client, geracao: int, bloco: List[tuple],
+                     produtos: Dict[int, Dict[str, Any]], progresso: ProgressoSync,
+                     tempos_extracao: Dict[str, float], linhas_extraidas: Dict[str, int]) -> int:
+    """
+    Extrai das fontes os dados de um bloco de clientes (interesses e amigos
+    ao mesmo tempo, depois as compras deles e dos amigos, usadas nas
+    recomendações), grava o resumo das pessoas citadas e consolida e grava o
+    bloco em `geracao`. Acumula em `tempos_extracao` (ms) e
+    `linhas_extraidas` o que foi lido de cada fonte; retorna os clientes
+    gravados.
+    """
+    ids = [cliente[0] for cliente in bloco]
+    resultados, tempos = extrair_em_paralelo({
+        'mongodb': lambda: fontes.interesses.interesses(ids),
+        'neo4j': lambda: fontes.amizades.amigos(ids)
+    })
+    amigos_por_cliente = resultados['neo4j']
+    
+    inicio_compras = time.perf_counter()
+    ids_compras = set(ids)
+    for amigos in amigos_por_cliente.values():
+        ids_compras.update(amigo['id'] for amigo in amigos)
+    compras_por_cliente = fontes.clientes.compras(sorted(ids_compras))
+    tempos['postgres'] = (time.perf_counter() - inicio_compras) * 1000
+    for fonte, duracao in tempos.items():
+        tempos_extracao[fonte] += duracao
+    linhas_extraidas['postgres'] += len(bloco) + contar_linhas(compras_por_cliente)
+    linhas_extraidas['mongodb'] += len(resultados['mongodb'])
+    linhas_extraidas['neo4j'] += contar_linhas(amigos_por_cliente)
+    
+    inicio_catalogo = time.perf_counter()
+    pessoas = resumo_pessoas(amigos_por_cliente)
+    with redis_client.pipeline(transaction=False) as pipe:
+        gravar_catalogos(pipe, geracao, {}, pessoas)
+        pipe.execute()
+    progresso.medir('carga_redis', time.perf_counter() - inicio_catalogo)
+    return carregar_clientes(
+        redis_client, geracao, bloco, compras_por_cliente,
+        resultados['mongodb'], amigos_por_cliente, progresso, (produtos, pessoas)
+    )
+
+
+def _iniciar_processo_consolidacao(redis_config: Dict[str, Any], fontes_processos: Optional[str]):
+    """
+    Inicialização de cada processo de consolidação (um interpretador novo,
+    sem as threads e conexões da API): guarda a configuração do Redis (e as
+    fontes em memória, com `usar_fontes_em_processos`) e lê o dicionário zstd
+    ativo. O coletor de ciclos fica desligado, pois o processo só cria os
+    objetos pequenos e sem ciclos da consolidação e termina ao fim da
+    sincronização.
+    """
+    global REDIS_CONFIG
+    gc.disable()
+    REDIS_CONFIG = redis_config
+    if fontes_processos is not None:
+        usar_armazenamento(ArmazenamentoMemoria.abrir(fontes_processos))
+    redis_client = redis.Redis(**REDIS_CONFIG)
+    try:
+        carregar_dicionario_ativo(redis_client)
+    finally:
+        redis_client.close()
+
+
+def _consolidar_faixa(tarefa: tuple) -> Tuple[int, Dict[str, Dict[str, Any]]]:
+    """
+    Extrai, consolida e grava, com conexões próprias às fontes e ao Redis,
+    os clientes de uma faixa de ids (geração, primeiro id, fim exclusivo ou
+    None). Retorna os clientes gravados e as medidas das etapas.
+    """
+    geracao, inicio, fim = tarefa
+    progresso = ProgressoSync()
+    tempos_extracao = {'postgres': 0.0, 'mongodb': 0.0, 'neo4j': 0.0}
+    linhas_extraidas = {'postgres': 0, 'mongodb': 0, 'neo4j': 0}
+    redis_client = redis.Redis(**REDIS_CONFIG)
+    try:
+        with abrir_fontes() as fontes:
+            inicio_extracao = time.perf_counter()
+            # O catálogo de produtos não cresce com a quantidade de clientes
+            produtos = fontes.clientes.produtos()
+            clientes_pg = fontes.clientes.clientes_da_faixa(inicio, fim)
+            tempos_extracao['postgres'] += (time.perf_counter() - inicio_extracao) * 1000
+            linhas_extraidas['postgres'] += len(produtos)
+            gravados = 0
+            if clientes_pg:
+                gravados = consolidar_bloco(
+                    fontes, redis_client, geracao, clientes_pg, produtos,
+                    progresso, tempos_extracao, linhas_extraidas
+                )
+        medir_extracao(progresso, tempos_extracao, linhas_extraidas)
+        return gravados, progresso.medidas
+    finally:
+        redis_client.close()
+
+
+def contexto_processos():
+    """
+    Contexto do multiprocessing dos processos de consolidação: o servidor
+    `forkserver`, que importa este módulo uma vez e do qual os processos já
+    nascem com ele, ou `spawn` onde ele não existe.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context('forkserver')
+        contexto.set_forkserver_preload([__name__])
+        return contexto
+    return multiprocessing.get_context('spawn')
+
+
+def consolidar_em_processos(geracao: int, inicios: List[int], progresso: ProgressoSync,
+                            processos: int = SYNC_PROCESSOS) -> int:
+    """
+    Consolida os clientes em `processos` processos, uma faixa de ids por
+    tarefa (`inicios`: o primeiro id de cada faixa, em ordem). Cada processo
+    extrai das fontes os dados das suas faixas e grava os documentos e os
+    índices direto no Redis; o processo principal só distribui os limites das
+    faixas. Retorna a quantidade de clientes gravados.
+
+    Os processos não são cópias (`fork`) da API em execução, que tem threads,
+    pools de conexões e travas: são criados pelo servidor `forkserver` (ou com
+    `spawn` onde ele não existe) e abrem suas próprias conexões.
+    """
+    tarefas = [
+        (geracao, inicio, inicios[posicao + 1] if posicao + 1 < len(inicios) else None)
+        for posicao, inicio in enumerate(inicios)
+    ]
+    if not tarefas:
+        return 0
+    
+    gravados = 0
+    with contexto_processos().Pool(min(processos, len(tarefas)), initializer=_iniciar_processo_consolidacao,
+                       initargs=(REDIS_CONFIG, _fontes_processos)) as pool:
+        for quantidade, medidas in pool.imap_unordered(_consolidar_faixa, tarefas):
+            progresso.avancar(quantidade)
+            progresso.somar_medidas(medidas)
+            gravados += quantidade
+    return gravados
+
+
+def preparar_fontes(fontes: FontesDados):
+    """Garante o esquema e os índices de cada fonte usados pela sincronização."""
+    fontes.clientes.preparar()
+    fontes.interesses.preparar()
+    fontes.amizades.preparar()
+
+
+def gravar_listagens(redis_client, geracao: int, progresso: ProgressoSync) -> int:
+    """
+    Grava os corpos das listagens a partir dos itens já gravados em `geracao`
+    (sem ler nem hidratar os documentos), dentro da sincronização, para que
+    as leituras não precisem montá-los. Cada corpo vai para o Redis em partes
+    (`gravar_listagem`): a memória usada não depende da quantidade de
+    clientes. Retorna a quantidade de corpos gravados.
+    """
+    progresso.etapa('listagens')
+    inicio = time.perf_counter()
+    for nome in LISTAGENS:
+        gravar_listagem(redis_client, geracao, nome)
+    progresso.medir('carga_redis', time.perf_counter() - inicio, chaves=len(LISTAGENS))
+    return len(LISTAGENS)
+
+
+def sincronizar_completo(fontes: FontesDados, redis_client,
+                         progresso: Optional[ProgressoSync] = None) -> Dict[str, Any]:
+    """
+    Recria todos os documentos consolidados em uma nova geração do Redis e
+    publica essa geração ao final. Retorna as estatísticas da carga.
+    """
+    progresso = progresso or ProgressoSync()
+    if SYNC_PROCESSOS > 1 and _armazenamento is None:
+        # Só com um Redis de verdade (o armazém em memória não é visível de
+        # outros processos)
+        return sincronizar_em_processos(fontes, redis_client, progresso, SYNC_PROCESSOS)
+    progresso.etapa('extracao')
+    preparar_fontes(fontes)
+    watermarks = capturar_watermarks(fontes)
+    
+    # Clientes e compras (na mesma transação das marcas d'água)
+    def extrair_postgres():
+        return fontes.clientes.clientes(), fontes.clientes.compras(), fontes.clientes.produtos()
+    
+    # As três fontes são lidas ao mesmo tempo (os amigos: todas as arestas de uma vez)
+    resultados, tempos_extracao = extrair_em_paralelo({
+        'postgres': extrair_postgres,
+        'mongodb': fontes.interesses.interesses,
+        'neo4j': fontes.amizades.amigos
+    })
+    clientes_pg, compras_por_cliente, produtos = resultados['postgres']
+    interesses_por_cliente = resultados['mongodb']
+    amigos_por_cliente = resultados['neo4j']
+    pessoas = resumo_pessoas(amigos_por_cliente)
+    medir_extracao(progresso, tempos_extracao, {
+        'postgres': len(clientes_pg) + contar_linhas(compras_por_cliente) + len(produtos),
+        'mongodb': len(interesses_por_cliente),
+        'neo4j': contar_linhas(amigos_por_cliente)
+    })
+    
+    # Nova geração: os leitores continuam vendo a anterior até a publicação
+    geracao = redis_client.incr(CHAVE_SEQ_GERACAO)
+    redis_client.sadd(CHAVE_GERACOES, geracao)
+    redis_client.set(chave_layout(geracao), REDIS_LAYOUT)
+    
+    try:
+        # Consolidar dados e salvar no Redis
+        print(f"Consolidando dados de {len(clientes_pg)} clientes na geração g{geracao}...")
+        progresso.etapa('consolidacao', total=len(clientes_pg))
+        inicio_carga = time.perf_counter()
+        with redis_client.pipeline(transaction=False) as pipe:
+            gravar_catalogos(pipe, geracao, produtos, pessoas)
+            pipe.execute()
+        progresso.medir('carga_redis', time.perf_counter() - inicio_carga, chaves=2)
+        carregar_clientes(
+            redis_client, geracao, clientes_pg, compras_por_cliente,
+            interesses_por_cliente, amigos_por_cliente, progresso, (produtos, pessoas)
+        )
         
-        # Buscar todos os clientes do PostgreSQL
-        pg_cursor = pg_conn.cursor()
-        pg_cursor.execute("""
-            SELECT id, cpf, nome, endereco, cidade, uf, email
-            FROM clientes
-            ORDER BY id
-        """)
-        clientes_pg = pg_cursor.fetchall()
+        # Corpos das rotas de listagem, servidos prontos a partir desta geração
+        corpos_gravados = gravar_listagens(redis_client, geracao, progresso)
+        estatisticas = estatisticas_carga(len(clientes_pg), len(clientes_pg) + corpos_gravados + 2, inicio_carga)
+        estatisticas['tempos_extracao_ms'] = tempos_extracao
         
-        # Buscar compras do PostgreSQL
-        pg_cursor.execute("""
-            SELECT c.id_cliente, c.id, c.data, p.produto, p.valor, p.tipo
-            FROM compras c
-            JOIN produtos p ON c.id_produto = p.id
-            ORDER BY c.id_cliente, c.data
-        """)
-        compras_pg = pg_cursor.fetchall()
+        progresso.etapa('publicacao')
+        publicada = publicar_geracao(redis_client, geracao, watermarks)
+    except Exception:
+        agendar_coleta_geracoes(descartar=geracao)
+        raise
+    
+    if publicada:
+        descartar_remocoes_refletidas(fontes, watermarks)
+        agendar_coleta_geracoes()
+    else:
+        print(f"Geração g{geracao} descartada: uma sincronização mais nova já foi publicada")
+        agendar_coleta_geracoes(descartar=geracao)
+    return estatisticas
+
+
+def sincronizar_em_processos(fontes: FontesDados, redis_client, progresso: ProgressoSync,
+                             processos: int = SYNC_PROCESSOS) -> Dict[str, Any]:
+    """
+    Sincronização completa com `processos` processos (SYNC_PROCESSOS > 1):
+    o processo principal só captura as marcas d'água, grava o catálogo de
+    produtos e divide os ids dos clientes em faixas com a mesma quantidade de
+    clientes (no próprio banco, sem ler os clientes). Cada processo extrai
+    das fontes, consolida e grava as suas faixas, como os blocos do modo
+    streaming (`consolidar_em_processos`); ao final, os corpos das listagens
+    são montados no Redis e a geração é publicada.
+    """
+    progresso.etapa('extracao')
+    preparar_fontes(fontes)
+    watermarks = capturar_watermarks(fontes)
+    total_clientes = fontes.clientes.contar_clientes()
+    produtos = fontes.clientes.produtos()
+    # Mais faixas que processos, para que um processo lento não atrase o fim da carga
+    inicios = fontes.clientes.inicios_faixas(processos * 4)
+    
+    geracao = redis_client.incr(CHAVE_SEQ_GERACAO)
+    redis_client.sadd(CHAVE_GERACOES, geracao)
+    redis_client.set(chave_layout(geracao), REDIS_LAYOUT)
+    
+    try:
+        print(f"Consolidando dados de {total_clientes} clientes na geração g{geracao} "
+              f"em {processos} processos...")
+        progresso.etapa('consolidacao', total=total_clientes)
+        inicio_carga = time.perf_counter()
+        with redis_client.pipeline(transaction=False) as pipe:
+            gravar_catalogos(pipe, geracao, produtos, {})
+            pipe.execute()
+        progresso.medir('carga_redis', time.perf_counter() - inicio_carga, chaves=1)
+        clientes_gravados = consolidar_em_processos(geracao, inicios, progresso, processos)
         
-        # Organizar compras por cliente
-        compras_por_cliente = {}
-        for compra in compras_pg:
-            cliente_id = compra[0]
-            if cliente_id not in compras_por_cliente:
-                compras_por_cliente[cliente_id] = []
-            compras_por_cliente[cliente_id].append({
-                'id': compra[1],
-                'data': compra[2].isoformat() if compra[2] else None,
-                'produto': compra[3],
-                'valor': float(compra[4]),
-                'tipo': compra[5]
-            })
+        corpos_gravados = gravar_listagens(redis_client, geracao, progresso)
+        estatisticas = estatisticas_carga(clientes_gravados, clientes_gravados + corpos_gravados + 2, inicio_carga)
+        # Soma dos processos
+        estatisticas['tempos_extracao_ms'] = {
+            fonte: round(progresso.medidas.get(f"extracao_{fonte}", {}).get('segundos', 0.0) * 1000, 1)
+            for fonte in ('postgres', 'mongodb', 'neo4j')
+        }
         
-        # Buscar interesses do MongoDB
-        mongo_db = mongo_client['recomendacao_db']
-        mongo_collection = mongo_db['clientes_interesses']
-        interesses_por_cliente = {}
-        for doc in mongo_collection.find({}):
-            cliente_id = doc.get('id_cliente')
-            if cliente_id:
-                interesses_por_cliente[cliente_id] = doc.get('interesses', [])
+        progresso.etapa('publicacao')
+        publicada = publicar_geracao(redis_client, geracao, watermarks)
+    except Exception:
+        agendar_coleta_geracoes(descartar=geracao)
+        raise
+    
+    if publicada:
+        descartar_remocoes_refletidas(fontes, watermarks)
+        agendar_coleta_geracoes()
+    else:
+        print(f"Geração g{geracao} descartada: uma sincronização mais nova já foi publicada")
+        agendar_coleta_geracoes(descartar=geracao)
+    return estatisticas
+
+
+def sincronizar_em_blocos(fontes: FontesDados, redis_client,
+                          progresso: Optional[ProgressoSync] = None) -> Dict[str, Any]:
+    """
+    Sincronização completa com memória limitada (modo streaming): os clientes
+    são lidos de um cursor do lado do servidor em blocos de SYNC_TAMANHO_BLOCO
+    ids, e cada bloco é extraído, consolidado e gravado em uma nova geração
+    antes da leitura do próximo. O consumo de memória depende do tamanho do
+    bloco, não do tamanho das bases.
+
+    Os itens das listagens são gravados bloco a bloco, junto com os
+    documentos e os índices; ao final, os corpos das listagens completas são
+    montados no próprio Redis, uma faixa do índice por vez (`gravar_listagens`),
+    também sem depender do tamanho das bases.
+    """
+    progresso = progresso or ProgressoSync()
+    progresso.etapa('extracao')
+    preparar_fontes(fontes)
+    watermarks = capturar_watermarks(fontes)
+    total_clientes = fontes.clientes.contar_clientes()
+    # O catálogo de produtos não cresce com a quantidade de clientes: lido uma vez
+    produtos = fontes.clientes.produtos()
+    
+    geracao = redis_client.incr(CHAVE_SEQ_GERACAO)
+    redis_client.sadd(CHAVE_GERACOES, geracao)
+    redis_client.set(chave_layout(geracao), REDIS_LAYOUT)
+    
+    # No PostgreSQL, um cursor do lado do servidor entrega os clientes aos
+    # poucos, na mesma transação das marcas d'água
+    blocos = fontes.clientes.blocos_clientes(SYNC_TAMANHO_BLOCO)
+    try:
+        print(f"Consolidando dados de {total_clientes} clientes na geração g{geracao} "
+              f"em blocos de {SYNC_TAMANHO_BLOCO}...")
+        progresso.etapa('consolidacao', total=total_clientes)
+        inicio_carga = time.perf_counter()
+        tempos_extracao = {'postgres': 0.0, 'mongodb': 0.0, 'neo4j': 0.0}
+        linhas_extraidas = {'postgres': len(produtos), 'mongodb': 0, 'neo4j': 0}
+        clientes_gravados = 0
+        with redis_client.pipeline(transaction=False) as pipe:
+            gravar_catalogos(pipe, geracao, produtos, {})
+            pipe.execute()
+        progresso.medir('carga_redis', time.perf_counter() - inicio_carga, chaves=1)
+        while True:
+            inicio_bloco = time.perf_counter()
+            bloco = next(blocos, None)
+            if not bloco:
+                break
+            tempos_extracao['postgres'] += (time.perf_counter() - inicio_bloco) * 1000
+            clientes_gravados += consolidar_bloco(
+                fontes, redis_client, geracao, bloco, produtos,
+                progresso, tempos_extracao, linhas_extraidas
+            )
         
-        # Buscar amigos do Neo4j
-        amigos_por_cliente = {}
-        with neo4j_driver.session() as session:
-            for cliente_id, _, _, _, _, _, _ in clientes_pg:
-                result = session.run("""
-                    MATCH (p:Pessoa {id: $cliente_id})-[:AMIGO_DE]->(amigo:Pessoa)
-                    RETURN amigo.id as id, amigo.nome as nome, amigo.cpf as cpf
-                    ORDER BY amigo.nome
-                """, cliente_id=cliente_id)
-                
-                amigos = []
-                for record in result:
-                    amigos.append({
-                        'id': record['id'],
-                        'nome': record['nome'],
-                        'cpf': record['cpf']
-                    })
-                amigos_por_cliente[cliente_id] = amigos
+        medir_extracao(progresso, tempos_extracao, linhas_extraidas)
+        corpos_gravados = gravar_listagens(redis_client, geracao, progresso)
+        estatisticas = estatisticas_carga(clientes_gravados, clientes_gravados + corpos_gravados + 2, inicio_carga)
+        estatisticas['tempos_extracao_ms'] = {fonte: round(duracao, 1) for fonte, duracao in tempos_extracao.items()}
         
-        # Gerar recomendações baseadas em compras dos amigos
-        def gerar_recomendacoes(cliente_id: int) -> List[Dict[str, Any]]:
-            """Gera recomendações baseadas nas compras dos amigos."""
-            recomendacoes = []
-            amigos = amigos_por_cliente.get(cliente_id, [])
-            
-            # Produtos que o cliente já comprou
-            produtos_cliente = set()
-            for compra in compras_por_cliente.get(cliente_id, []):
-                produtos_cliente.add(compra['produto'])
-            
-            # Contar produtos comprados pelos amigos
-            produtos_amigos = {}
-            for amigo in amigos:
-                amigo_id = amigo['id']
-                for compra in compras_por_cliente.get(amigo_id, []):
-                    produto = compra['produto']
-                    if produto not in produtos_cliente:  # Apenas produtos que o cliente não tem
-                        if produto not in produtos_amigos:
-                            produtos_amigos[produto] = {
-                                'produto': produto,
-                                'valor': compra['valor'],
-                                'tipo': compra['tipo'],
-                                'amigos_que_compraram': []
-                            }
-                        produtos_amigos[produto]['amigos_que_compraram'].append(amigo['nome'])
-            
-            # Converter para lista e ordenar por número de amigos que compraram
-            recomendacoes = list(produtos_amigos.values())
-            recomendacoes.sort(key=lambda x: len(x['amigos_que_compraram']), reverse=True)
-            
-            return recomendacoes[:10]  # Top 10 recomendações
+        progresso.etapa('publicacao')
+        publicada = publicar_geracao(redis_client, geracao, watermarks)
+    except Exception:
+        agendar_coleta_geracoes(descartar=geracao)
+        raise
+    finally:
+        blocos.close()
+    
+    if publicada:
+        descartar_remocoes_refletidas(fontes, watermarks)
+        agendar_coleta_geracoes()
+    else:
+        print(f"Geração g{geracao} descartada: uma sincronização mais nova já foi publicada")
+        agendar_coleta_geracoes(descartar=geracao)
+    return estatisticas
+
+
+def sincronizar_incremental(fontes: FontesDados, redis_client,
+                            ids: Optional[List[int]] = None,
+                            progresso: Optional[ProgressoSync] = None) -> Optional[Dict[str, Any]]:
+    """
+    Refaz apenas os documentos afetados desde a última sincronização (ou os
+    `ids` informados). Retorna as estatísticas da carga, ou None quando ainda
+    não há marcas d'água ou a geração publicada foi gravada em outro
+    REDIS_LAYOUT (ou sem os itens das listagens), casos em que é preciso uma
+    sincronização completa.
+    """
+    geracao = obter_geracao_atual(redis_client)
+    watermarks = {fonte.decode('utf-8'): valor.decode('utf-8')
+                  for fonte, valor in redis_client.hgetall(CHAVE_WATERMARKS).items()}
+    if geracao is None or (ids is None and len(watermarks) < 3):
+        return None
+    layout = redis_client.get(chave_layout(geracao))
+    if (layout or b'documento').decode('ascii') != REDIS_LAYOUT:
+        print(f"Geração g{geracao} gravada em outro layout, é preciso uma sincronização completa")
+        return None
+    if not redis_client.exists(chave_itens_listagem(geracao, 'clientes')) and redis_client.zcard(chave_indice(geracao, 'id')):
+        print(f"Geração g{geracao} gravada sem os itens das listagens, é preciso uma sincronização completa")
+        return None
+    
+    progresso = progresso or ProgressoSync()
+    progresso.etapa('deteccao')
+    if ids is None:
+        novas_watermarks = capturar_watermarks(fontes)
+        afetados = detectar_clientes_alterados(fontes, watermarks)
+        if afetados is None:
+            print("Amizades removidas desde a última sincronização, é preciso uma sincronização completa")
+            return None
+    else:
+        novas_watermarks = None
+        afetados = set(ids)
+    
+    afetados = sorted(afetados)
+    print(f"Sincronização incremental: {len(afetados)} clientes afetados")
+    
+    clientes_pg, amigos_por_cliente, interesses_por_cliente, compras_por_cliente, produtos = [], {}, {}, {}, {}
+    tempos_extracao = {}
+    progresso.etapa('extracao')
+    if afetados:
+        resultados, tempos_extracao = extrair_em_paralelo({
+            'postgres': lambda: fontes.clientes.clientes(afetados),
+            'mongodb': lambda: fontes.interesses.interesses(afetados),
+            'neo4j': lambda: fontes.amizades.amigos(afetados)
+        })
+        clientes_pg = resultados['postgres']
+        interesses_por_cliente = resultados['mongodb']
+        amigos_por_cliente = resultados['neo4j']
         
-        # Consolidar dados e salvar no Redis
-        print(f"Consolidando dados de {len(clientes_pg)} clientes...")
-        clientes_consolidados = []
+        # As recomendações precisam das compras dos amigos dos clientes afetados
+        inicio_compras = time.perf_counter()
+        ids_compras = set(afetados)
+        for amigos in amigos_por_cliente.values():
+            ids_compras.update(amigo['id'] for amigo in amigos)
+        compras_por_cliente = fontes.clientes.compras(sorted(ids_compras))
+        produtos = fontes.clientes.produtos(produtos_das_compras(compras_por_cliente))
+        tempos_extracao['postgres'] = round(
+            tempos_extracao['postgres'] + (time.perf_counter() - inicio_compras) * 1000, 1
+        )
+        medir_extracao(progresso, tempos_extracao, {
+            'postgres': len(clientes_pg) + contar_linhas(compras_por_cliente) + len(produtos),
+            'mongodb': len(interesses_por_cliente),
+            'neo4j': contar_linhas(amigos_por_cliente)
+        })
+    
+    # Entradas antigas dos índices por nome (o nome ou as recomendações podem ter mudado)
+    progresso.etapa('consolidacao', total=len(afetados))
+    inicio_carga = time.perf_counter()
+    membros_antigos = []
+    if afetados:
+        for cliente_data in ler_documentos(redis_client, geracao, afetados, ('dados_pessoais', 'recomendacoes')):
+            if cliente_data is not None:
+                membros_antigos.extend(entradas_indices(cliente_data)['nome'])
+    
+    # Os documentos refeitos são gravados na geração publicada em uma única
+    # transação, para que os leitores vejam todas as alterações ou nenhuma
+    with redis_client.pipeline(transaction=True) as pipe:
+        if membros_antigos:
+            pipe.zrem(chave_indice(geracao, 'nome'), *membros_antigos)
+            pipe.zrem(chave_indice(geracao, 'recomendacoes'), *membros_antigos)
         
-        for cliente in clientes_pg:
-            cliente_id = cliente[0]
-            
-            # Dados pessoais
-            dados_pessoais = {
-                'id': cliente_id,
-                'cpf': cliente[1],
-                'nome': cliente[2],
-                'endereco': cliente[3],
-                'cidade': cliente[4],
-                'uf': cliente[5],
-                'email': cliente[6]
-            }
-            
-            # Compras
-            compras = compras_por_cliente.get(cliente_id, [])
-            
-            # Interesses
-            interesses = interesses_por_cliente.get(cliente_id, [])
-            
-            # Amigos
-            amigos = amigos_por_cliente.get(cliente_id, [])
-            
-            # Recomendações
-            recomendacoes = gerar_recomendacoes(cliente_id)
-            
-            # Objeto consolidado
-            cliente_consolidado = {
-                'dados_pessoais': dados_pessoais,
-                'compras': compras,
-                'interesses': interesses,
-                'amigos': amigos,
-                'recomendacoes': recomendacoes,
-                'ultima_atualizacao': datetime.now().isoformat()
-            }
-            
-            # Salvar no Redis (chave: cliente:{id})
-            redis_key = f"cliente:{cliente_id}"
-            redis_client.set(redis_key, json.dumps(cliente_consolidado, ensure_ascii=False))
-            
-            clientes_consolidados.append(cliente_consolidado)
+        # Produtos e pessoas citados pelos documentos refeitos (dados novos
+        # valem também para os demais documentos que os citam)
+        pessoas = resumo_pessoas(amigos_por_cliente)
+        gravar_catalogos(pipe, geracao, produtos, pessoas)
         
-        # Fechar conexões
-        pg_cursor.close()
-        pg_conn.close()
-        mongo_client.close()
-        neo4j_driver.close()
-        redis_client.close()
+        indices_lote = {ordem: {} for ordem in ORDENS_INDICES}
+        itens_lote = {nome: {} for nome in LISTAGENS}
+        inicio = time.perf_counter()
+        recomendacoes_por_cliente = calcular_recomendacoes(
+            [cliente[0] for cliente in clientes_pg], amigos_por_cliente, compras_por_cliente
+        )
+        progresso.medir('recomendacao', time.perf_counter() - inicio, linhas=len(clientes_pg))
+        inicio = time.perf_counter()
+        for cliente in clientes_pg:
+            cliente_consolidado = consolidar_cliente(
+                cliente, compras_por_cliente, interesses_por_cliente, amigos_por_cliente,
+                recomendacoes_por_cliente[cliente[0]]
+            )
+            gravar_cliente(pipe, geracao, cliente_consolidado)
+            for ordem, entradas in entradas_indices(cliente_consolidado).items():
+                indices_lote[ordem].update(entradas)
+            # Os clientes que citam produtos ou pessoas alterados também estão
+            # entre os afetados: os itens dos demais continuam valendo
+            for nome, item in itens_listagens(cliente_consolidado, produtos, pessoas).items():
+                itens_lote[nome][cliente[0]] = item
         
-        print(f"Sincronização concluída! {len(clientes_consolidados)} clientes consolidados.")
+        # Clientes que não existem mais no PostgreSQL saem do Redis
+        removidos = set(afetados) - {cliente[0] for cliente in clientes_pg}
+        for cliente_id in removidos:
+            for itens in itens_lote.values():
+                itens[cliente_id] = None
+        gravar_indices(pipe, geracao, indices_lote)
+        gravar_itens_listagens(pipe, geracao, itens_lote)
+        progresso.medir('serializacao', time.perf_counter() - inicio, linhas=len(clientes_pg))
+        progresso.avancar(len(clientes_pg))
+        if removidos:
+            pipe.delete(*[chave_cliente(geracao, cliente_id) for cliente_id in removidos])
+            pipe.zrem(chave_indice(geracao, 'id'), *removidos)
         
+        # Os corpos das listagens são descartados junto com a nova revisão: a
+        # primeira leitura de cada um o remonta a partir dos itens
+        if afetados:
+            pipe.delete(*[chave_listagem(geracao, nome) for nome in LISTAGENS])
+            pipe.incr(CHAVE_REVISAO)
+        if novas_watermarks:
+            pipe.hset(CHAVE_WATERMARKS, mapping=novas_watermarks)
+        inicio = time.perf_counter()
+        pipe.execute()
+        progresso.medir('carga_redis', time.perf_counter() - inicio, chaves=len(afetados))
+    estatisticas = estatisticas_carga(len(clientes_pg), len(afetados), inicio_carga)
+    estatisticas['tempos_extracao_ms'] = tempos_extracao
+    return estatisticas
+
+
+def calcular_etag(redis_client, caminho: str, parametros: str) -> Optional[str]:
+    """
+    ETag de uma resposta de consulta: geração publicada e revisão (mudam a cada
+    sincronização) mais a rota e os parâmetros. None se nada foi publicado.
+    """
+    geracao, revisao = redis_client.mget(CHAVE_GERACAO_ATUAL, CHAVE_REVISAO)
+    if geracao is None:
+        return None
+    assinatura = hashlib.sha1(f"{caminho}?{parametros}".encode('utf-8')).hexdigest()[:16]
+    return f'"g{int(geracao)}r{int(revisao or 0)}-{assinatura}"'
+
+
+def etag_corresponde(if_none_match: str, etag: str) -> bool:
+    """Se o cabeçalho If-None-Match (lista de ETags, fortes ou fracos, ou `*`) inclui o ETag atual."""
+    candidatos = {candidato.strip() for candidato in if_none_match.split(',')}
+    return '*' in candidatos or etag in candidatos or f"W/{etag}" in candidatos
+
+
+def obter_etag(caminho: str, parametros: str) -> Optional[str]:
+    redis_client = get_redis_client()
+    try:
+        return calcular_etag(redis_client, caminho, parametros)
+    finally:
+        redis_client.close()
+
+
+@app.middleware("http")
+async def respostas_condicionais(request: Request, call_next):
+    """
+    GET condicional nas rotas de consulta: com o ETag atual em If-None-Match,
+    responde 304 lendo do Redis só a geração e a revisão (nenhum documento ou
+    listagem); nas respostas 200, envia o ETag e o Cache-Control configurado.
+    """
+    if request.method != 'GET' or not request.url.path.startswith(ROTAS_COM_ETAG):
+        return await call_next(request)
+    
+    parametros = '&'.join(f"{nome}={valor}" for nome, valor in sorted(request.query_params.multi_items()))
+    if 'application/x-ndjson' in request.headers.get('accept', ''):
+        # A mesma URL responde em NDJSON conforme o Accept: o ETag precisa diferir
+        parametros += '#ndjson'
+    try:
+        etag = await run_in_threadpool(obter_etag, request.url.path, parametros)
+    except Exception as e:
+        print(f"Erro ao calcular ETag: {e}")
+        etag = None
+    if etag is None:
+        return await call_next(request)
+    
+    # O 304 repete o Vary da resposta completa, que o CompressaoMiddleware completa com Accept-Encoding
+    cabecalhos = {'ETag': etag, 'Cache-Control': HTTP_CACHE_CONTROL, 'Vary': 'Accept, Accept-Encoding'}
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and etag_corresponde(if_none_match, etag):
+        return Response(status_code=304, headers=cabecalhos)
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(cabecalhos)
+    return response
+
+
+# Registrado depois das respostas condicionais, para envolvê-las (comprime também as respostas com ETag)
+app.add_middleware(CompressaoMiddleware, minimo=HTTP_COMPRESSAO_MIN_BYTES)
+# Por fora de todos: mede a requisição inteira e o corpo como enviado (já comprimido)
+app.add_middleware(metricas.MetricasMiddleware)
+if DEBUG_PROFILE_TOKEN:
+    # ?profile=1 troca a resposta pelas estatísticas do cProfile (sem token, nem é registrado)
+    app.add_middleware(PerfilRequisicaoMiddleware, token=DEBUG_PROFILE_TOKEN)
+
+
+# Arquivos estáticos, lidos e pré-comprimidos uma única vez
+_ativos_estaticos = None
+_ativos_lock = threading.Lock()
+
+
+def preparar_ativo(conteudo: bytes, media_type: str) -> Dict[str, Any]:
+    """Conteúdo de um arquivo estático em cada codificação (só as que o reduzem) e o ETag dele."""
+    variantes = {'identity': conteudo}
+    for codificacao in CODIFICACOES:
+        comprimido = comprimir(conteudo, codificacao, nivel=11 if codificacao == 'br' else 9)
+        if len(comprimido) < len(conteudo):
+            variantes[codificacao] = comprimido
+    return {
+        'variantes': variantes,
+        'media_type': media_type,
+        'etag': f'W/"{hashlib.sha256(conteudo).hexdigest()[:16]}"',
+        'imutavel': False
+    }
+
+
+def construir_ativos_estaticos() -> Dict[str, Dict[str, Any]]:
+    """
+    Lê os arquivos de PASTA_ESTATICOS e os publica com dois nomes: o original
+    (revalidado a cada uso) e um com o hash do conteúdo (`script.<hash>.js`),
+    que o navegador guarda sem revalidar. O index.html é reescrito para usar
+    os nomes com hash, então cada alteração de um arquivo muda a URL dele.
+    """
+    ativos, versionados = {}, {}
+    for caminho in sorted(PASTA_ESTATICOS.iterdir()):
+        if not caminho.is_file() or caminho.name == 'index.html':
+            continue
+        conteudo = caminho.read_bytes()
+        media_type = mimetypes.guess_type(caminho.name)[0] or 'application/octet-stream'
+        versionado = f"{caminho.stem}.{hashlib.sha256(conteudo).hexdigest()[:12]}{caminho.suffix}"
+        versionados[caminho.name] = versionado
+        ativos[caminho.name] = preparar_ativo(conteudo, media_type)
+        ativos[versionado] = {**ativos[caminho.name], 'imutavel': True}
+    
+    index = PASTA_ESTATICOS / 'index.html'
+    if index.exists():
+        html = index.read_text(encoding='utf-8')
+        for nome, versionado in versionados.items():
+            html = html.replace(f'/static/{nome}"', f'/static/{versionado}"')
+        ativos['index.html'] = preparar_ativo(html.encode('utf-8'), 'text/html')
+    print(f"Cache de arquivos estáticos: {len(versionados) + ('index.html' in ativos)} arquivos pré-comprimidos")
+    return ativos
+
+
+def obter_ativos_estaticos() -> Dict[str, Dict[str, Any]]:
+    """Cache dos arquivos estáticos, montado na subida da API (ou no primeiro uso)."""
+    global _ativos_estaticos
+    if _ativos_estaticos is None:
+        with _ativos_lock:
+            if _ativos_estaticos is None:
+                _ativos_estaticos = construir_ativos_estaticos()
+    return _ativos_estaticos
+
+
+def servir_ativo(request: Request, nome: str) -> Response:
+    """Resposta de um arquivo estático do cache, na melhor codificação aceita pelo cliente."""
+    ativo = obter_ativos_estaticos().get(nome)
+    if ativo is None:
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    cabecalhos = {
+        'ETag': ativo['etag'],
+        'Cache-Control': 'public, max-age=31536000, immutable' if ativo['imutavel'] else 'no-cache',
+        'Vary': 'Accept-Encoding'
+    }
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and etag_corresponde(if_none_match, ativo['etag']):
+        return Response(status_code=304, headers=cabecalhos)
+    
+    codificacao = escolher_codificacao(
+        request.headers.get('accept-encoding', ''),
+        [codificacao for codificacao in CODIFICACOES if codificacao in ativo['variantes']]
+    )
+    if codificacao is not None:
+        cabecalhos['Content-Encoding'] = codificacao
+    return Response(content=ativo['variantes'][codificacao or 'identity'],
+                    media_type=ativo['media_type'], headers=cabecalhos)
+
+
+@app.get("/", response_class=HTMLResponse)
+def root(request: Request):
+    """Serve a página HTML principal (que aponta para os arquivos estáticos com hash no nome)."""
+    try:
+        if 'index.html' in obter_ativos_estaticos():
+            return servir_ativo(request, 'index.html')
+        else:
+            return "<h1>Arquivo index.html não encontrado</h1>"
+    except Exception as e:
+        return f"<h1>Erro ao carregar página: {str(e)}</h1>"
+
+
+@app.get("/static/{nome}")
+def static(request: Request, nome: str):
+    """Arquivos estáticos pré-comprimidos; os nomes com hash do conteúdo podem ficar em cache para sempre."""
+    return servir_ativo(request, nome)
+
+
+def executar_sincronizacao(mode: str, ids_lista: Optional[List[int]],
+                           progresso: Optional[ProgressoSync] = None) -> Dict[str, Any]:
+    """Executa a sincronização (bloqueante) e monta o resultado do job de ETL."""
+    print("Iniciando sincronização de dados...")
+    inicio = time.perf_counter()
+    progresso = progresso or ProgressoSync()
+    modo_executado = 'incremental' if ids_lista is not None else mode
+    
+    # Conexões emprestadas dos pools compartilhados
+    redis_client = get_redis_client()
+    
+    try:
+        # Um dicionário treinado depois da subida da API vale a partir desta sincronização
+        carregar_dicionario_ativo(redis_client)
+        with abrir_fontes() as fontes:
+            estatisticas = None
+            if modo_executado == 'incremental':
+                estatisticas = sincronizar_incremental(
+                    fontes, redis_client, ids_lista, progresso
+                )
+                if estatisticas is None:
+                    print("Sincronização incremental indisponível, executando sincronização completa...")
+                    modo_executado = 'full'
+            if modo_executado == 'streaming':
+                estatisticas = sincronizar_em_blocos(
+                    fontes, redis_client, progresso
+                )
+            if estatisticas is None:
+                estatisticas = sincronizar_completo(
+                    fontes, redis_client, progresso
+                )
+    except Exception:
+        metricas.registrar_sync(modo_executado, 'erro', time.perf_counter() - inicio)
+        raise
+    finally:
+        redis_client.close()
+    
+    metricas.registrar_sync(modo_executado, 'sucesso', time.perf_counter() - inicio, progresso.medidas)
+    duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+    print(f"Sincronização concluída! {estatisticas['clientes_processados']} clientes consolidados "
+          f"em {duracao_ms} ms ({estatisticas['chaves_por_segundo']} chaves/s na carga).")
+    
+    return {
+        "status": "success",
+        "message": f"Dados sincronizados com sucesso",
+        "modo": modo_executado,
+        **estatisticas,
+        "duracao_ms": duracao_ms,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def renovar_job_ativo(redis_client, job_id: str) -> bool:
+    """Renova o prazo da trava do job ativo, desde que ela ainda pertença a este job."""
+    with redis_client.pipeline() as pipe:
+        try:
+            pipe.watch(CHAVE_JOB_ATIVO)
+            if pipe.get(CHAVE_JOB_ATIVO) != job_id.encode('ascii'):
+                return False
+            pipe.multi()
+            pipe.expire(CHAVE_JOB_ATIVO, SYNC_JOB_TRAVA_S)
+            pipe.execute()
+            return True
+        except redis.WatchError:
+            return False
+
+
+def manter_job_ativo(job_id: str, parar: threading.Event):
+    """
+    Corpo da thread que renova a trava do job a cada terço de
+    SYNC_JOB_TRAVA_S até `parar`, independente do progresso (uma etapa longa
+    sem avanço não deixa a trava expirar com o job ainda em execução).
+    """
+    redis_client = get_redis_client()
+    try:
+        while not parar.wait(SYNC_JOB_TRAVA_S / 3):
+            try:
+                if not renovar_job_ativo(redis_client, job_id):
+                    print(f"Trava do job de sincronização {job_id} perdida")
+                    return
+            except redis.RedisError as e:
+                print(f"Erro ao renovar a trava do job {job_id}: {e}")
+    finally:
+        redis_client.close()
+
+
+def passar_job_ativo(redis_client, job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Ao fim de um job, passa a trava para o primeiro job da fila (retornado)
+    ou a remove se a fila estiver vazia, desde que ela ainda pertença a este
+    job. A troca é atômica com a leitura da fila, para que um job enfileirado
+    nesse meio tempo não fique sem ser executado.
+    """
+    with redis_client.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(CHAVE_JOB_ATIVO, CHAVE_JOBS_PENDENTES)
+                if pipe.get(CHAVE_JOB_ATIVO) != job_id.encode('ascii'):
+                    pipe.unwatch()
+                    return None
+                proximo_id = pipe.lindex(CHAVE_JOBS_PENDENTES, 0)
+                valor = pipe.get(chave_job(proximo_id.decode('ascii'))) if proximo_id is not None else None
+                pipe.multi()
+                if proximo_id is None:
+                    pipe.delete(CHAVE_JOB_ATIVO)
+                else:
+                    pipe.lpop(CHAVE_JOBS_PENDENTES)
+                    pipe.set(CHAVE_JOB_ATIVO, proximo_id, ex=SYNC_JOB_TRAVA_S)
+                pipe.execute()
+                if proximo_id is None:
+                    return None
+                if valor is None:
+                    # Registro expirado: o job é descartado e a trava passa ao seguinte
+                    job_id = proximo_id.decode('ascii')
+                    continue
+                return json.loads(valor)
+            except redis.WatchError:
+                continue
+
+
+def executar_job_sincronizacao(job: Dict[str, Any]):
+    """
+    Corpo da thread de um job: executa a sincronização registrando o
+    progresso no Redis e, ao final, os jobs enfileirados enquanto ela rodava.
+    """
+    redis_client = get_redis_client()
+    try:
+        while job is not None:
+            parar = threading.Event()
+            threading.Thread(
+                target=manter_job_ativo, args=(job['id'], parar), name=f"sync-trava-{job['id'][:8]}", daemon=True
+            ).start()
+            progresso = ProgressoSync(redis_client, job)
+            try:
+                job['status'] = 'executando'
+                job['iniciado_em'] = datetime.now().isoformat()
+                resultado = executar_sincronizacao(job['modo'], job['ids'], progresso)
+                progresso.finalizar('concluido', resultado=resultado)
+            except Exception as e:
+                print(f"Erro durante sincronização (job {job['id']}): {e}")
+                import traceback
+                traceback.print_exc()
+                progresso.finalizar('erro', erro=f"Erro ao sincronizar dados: {str(e)}")
+            finally:
+                parar.set()
+            job = passar_job_ativo(redis_client, job['id'])
+    finally:
+        redis_client.close()
+
+
+def mesmo_pedido(job: Dict[str, Any], modo: str, ids_lista: Optional[List[int]]) -> bool:
+    """Se o job foi disparado com o mesmo modo e os mesmos ids (a ordem dos ids não importa)."""
+    ids_job = job.get('ids')
+    if (ids_job is None) != (ids_lista is None):
+        return False
+    return job['modo'] == modo and (ids_lista is None or sorted(ids_job) == sorted(ids_lista))
+
+
+def disparar_job_sincronizacao(mode: str, ids_lista: Optional[List[int]]) -> Tuple[Dict[str, Any], str]:
+    """
+    Registra um novo job e o executa em uma thread em segundo plano. Se já
+    houver um job em execução, o disparo é agrupado nele (ou em um job da
+    fila) quando o modo e os ids forem os mesmos; senão, o novo job entra na
+    fila e é executado quando o ativo terminar. Retorna o job e a situação
+    ('iniciado', 'agrupado' ou 'enfileirado').
+    """
+    modo = 'incremental' if ids_lista is not None else mode
+    job = {
+        'id': uuid.uuid4().hex,
+        'status': 'pendente',
+        'modo': modo,
+        'ids': ids_lista,
+        'criado_em': datetime.now().isoformat(),
+        'etapa': None,
+        'processados': 0,
+        'total': None,
+        'etapas': []
+    }
+    redis_client = get_redis_client()
+    try:
+        with redis_client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(CHAVE_JOB_ATIVO, CHAVE_JOBS_PENDENTES)
+                    job_ativo = pipe.get(CHAVE_JOB_ATIVO)
+                    if job_ativo is None:
+                        situacao = 'iniciado'
+                    else:
+                        ids_existentes = [job_ativo] + pipe.lrange(CHAVE_JOBS_PENDENTES, 0, -1)
+                        for valor in pipe.mget([chave_job(job_id.decode('ascii')) for job_id in ids_existentes]):
+                            existente = json.loads(valor) if valor is not None else None
+                            if existente is not None and mesmo_pedido(existente, modo, ids_lista):
+                                pipe.unwatch()
+                                return existente, 'agrupado'
+                        situacao = 'enfileirado'
+                    pipe.multi()
+                    pipe.set(chave_job(job['id']), json.dumps(job, ensure_ascii=False), ex=SYNC_JOB_TTL_S)
+                    if situacao == 'iniciado':
+                        pipe.set(CHAVE_JOB_ATIVO, job['id'], ex=SYNC_JOB_TRAVA_S)
+                    else:
+                        pipe.rpush(CHAVE_JOBS_PENDENTES, job['id'])
+                    pipe.execute()
+                    break
+                except redis.WatchError:
+                    continue
+    finally:
+        redis_client.close()
+    
+    if situacao == 'iniciado':
+        threading.Thread(
+            target=executar_job_sincronizacao, args=(job,), name=f"sync-{job['id'][:8]}", daemon=True
+        ).start()
+    return job, situacao
+
+
+@app.post("/api/sync_data", status_code=202)
+def sync_data(mode: str = "full", ids: Optional[str] = None):
+    """
+    Rota de ETL: Consolida dados de PostgreSQL, MongoDB e Neo4j no Redis.
+
+    - `mode=full` (padrão): recria todos os dados consolidados em uma nova
+      geração do Redis e a publica ao final, sem deixar os leitores sem dados.
+    - `mode=streaming`: como `full`, mas percorre os clientes em blocos de
+      SYNC_TAMANHO_BLOCO ids, com memória limitada pelo tamanho do bloco.
+    - `mode=incremental`: refaz apenas os clientes alterados nas fontes desde a
+      última sincronização (marcas d'água guardadas no Redis).
+    - `ids=1,2,3`: refaz apenas os clientes informados.
+
+    A sincronização roda em segundo plano: a rota responde na hora com o id do
+    job, acompanhado em `GET /api/sync_jobs/{id}`. Disparos feitos enquanto um
+    job está em execução são agrupados nele (ou em um job da fila) se tiverem
+    o mesmo modo e os mesmos ids; os demais entram na fila e rodam em seguida.
+    """
+    if mode not in ('full', 'streaming', 'incremental'):
+        raise HTTPException(status_code=400, detail="Parâmetro mode deve ser 'full', 'streaming' ou 'incremental'")
+    ids_lista = None
+    if ids:
+        try:
+            ids_lista = [int(cliente_id) for cliente_id in ids.split(',') if cliente_id.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Parâmetro ids deve ser uma lista de inteiros separados por vírgula")
+
+    try:
+        job, situacao = disparar_job_sincronizacao(mode, ids_lista)
+        mensagens = {
+            'iniciado': "Sincronização iniciada",
+            'agrupado': "Sincronização igual já em andamento ou na fila",
+            'enfileirado': "Sincronização enfileirada para depois da que está em andamento"
+        }
         return {
-            "status": "success",
-            "message": f"Dados sincronizados com sucesso",
-            "clientes_processados": len(clientes_consolidados),
-            "timestamp": datetime.now().isoformat()
+            "status": "accepted",
+            "message": mensagens[situacao],
+            "job_id": job['id'],
+            "agrupado": situacao == 'agrupado',
+            "enfileirado": situacao == 'enfileirado',
+            "job": job,
+            "url": f"/api/sync_jobs/{job['id']}"
         }
         
     except Exception as e:
-        print(f"Erro durante sincronização: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Erro ao sincronizar dados: {str(e)}")
+        print(f"Erro ao iniciar sincronização: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro ao iniciar sincronização: {str(e)}")
 
 
-@app.get("/api/clientes")
-async def get_clientes():
-    """Retorna lista com dados básicos de todos os clientes (do Redis)."""
+@app.get("/api/sync_jobs/{job_id}")
+def get_sync_job(job_id: str):
+    """Estado de um job de sincronização: etapa, processados/total, tempo por etapa e resultado."""
     try:
         redis_client = get_redis_client()
+        try:
+            valor = redis_client.get(chave_job(job_id))
+        finally:
+            redis_client.close()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar job de sincronização: {str(e)}")
+    
+    if valor is None:
+        raise HTTPException(status_code=404, detail="Job de sincronização não encontrado")
+    job = json.loads(valor)
+    
+    # Tempo decorrido da etapa em andamento
+    agora = time.time()
+    for etapa in job['etapas']:
+        if etapa['duracao_ms'] is None:
+            etapa['decorrido_ms'] = round((agora - etapa['inicio']) * 1000, 1)
+    return job
+
+
+@app.get("/api/ready")
+def readiness():
+    """Informa se os pools de conexão com os quatro bancos estão respondendo (503 se algum não estiver)."""
+    estado = verificar_pools()
+    pronto = all(pool['ok'] for pool in estado.values())
+    return JSONResponse(
+        status_code=200 if pronto else 503,
+        content={"status": "ready" if pronto else "unavailable", "pools": estado}
+    )
+
+
+@app.get("/metrics")
+def metrics():
+    """Métricas da sincronização, das rotas /api/* e das idas e voltas aos bancos, no formato do Prometheus."""
+    if not metricas.DISPONIVEL:
+        raise HTTPException(status_code=503, detail="Métricas indisponíveis: instale o pacote prometheus_client")
+    # Content-Type pelo cabeçalho: o media_type do Starlette acrescentaria outro charset
+    return Response(content=metricas.gerar(), headers={'Content-Type': metricas.TIPO_CONTEUDO})
+
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def debug_profile(request: Request, seconds: float = Query(10, gt=0, le=DEBUG_PROFILE_MAX_S),
+                        idle: bool = False):
+    """
+    Amostra as pilhas de todas as threads por `seconds` segundos e responde
+    com elas no formato collapsed (flamegraph.pl, speedscope). Exige o token
+    DEBUG_PROFILE_TOKEN no cabeçalho X-Debug-Token (sem ele configurado, a
+    rota não existe). Threads só esperando trabalho ficam de fora, a menos
+    que `idle=1`.
+    """
+    if not DEBUG_PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token_valido(DEBUG_PROFILE_TOKEN, request.headers.get('x-debug-token')):
+        raise HTTPException(status_code=403, detail="Token de perfil ausente ou inválido")
+    amostrador = await amostrar(seconds, DEBUG_PROFILE_INTERVALO_MS / 1000, idle)
+    if amostrador is None:
+        raise HTTPException(status_code=409, detail="Outra amostragem já está em andamento")
+    return PlainTextResponse(
+        amostrador.relatorio(),
+        headers={'Cache-Control': 'no-store', 'X-Profile-Amostras': str(amostrador.amostras)}
+    )
+
+
+@app.get("/api/clientes")
+def get_clientes(request: Request, limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO_PAGINA),
+                 cursor: Optional[str] = None, stream: bool = False):
+    """
+    Retorna lista com dados básicos de todos os clientes (do Redis).
+    Com `limit`, retorna uma página e o `next_cursor` da seguinte. Com
+    `stream=1` (ou `Accept: application/x-ndjson`), transmite todos os itens
+    em NDJSON, um por linha, a partir de `cursor` se informado.
+    """
+    try:
+        return responder_listagem('clientes', limit, cursor, quer_ndjson(request, stream))
         
-        # Buscar todas as chaves de clientes
-        keys = redis_client.keys("cliente:*")
-        
-        clientes = []
-        for key in keys:
-            cliente_data = json.loads(redis_client.get(key))
-            dados_pessoais = cliente_data.get('dados_pessoais', {})
-            clientes.append({
-                'id': dados_pessoais.get('id'),
-                'cpf': dados_pessoais.get('cpf'),
-                'nome': dados_pessoais.get('nome'),
-                'cidade': dados_pessoais.get('cidade'),
-                'uf': dados_pessoais.get('uf'),
-                'email': dados_pessoais.get('email'),
-                'interesses': cliente_data.get('interesses', []),
-                'num_compras': len(cliente_data.get('compras', [])),
-                'num_amigos': len(cliente_data.get('amigos', [])),
-                'num_interesses': len(cliente_data.get('interesses', []))
-            })
-        
-        redis_client.close()
-        
-        # Ordenar por ID
-        clientes.sort(key=lambda x: x['id'])
-        
-        return {
-            "status": "success",
-            "total": len(clientes),
-            "clientes": clientes
-        }
-        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar clientes: {str(e)}")
 
 
 @app.get("/api/clientes/amigos")
-async def get_clientes_amigos():
-    """Retorna clientes e seus respectivos amigos (do Redis)."""
+def get_clientes_amigos(request: Request, limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO_PAGINA),
+                        cursor: Optional[str] = None, stream: bool = False):
+    """
+    Retorna clientes e seus respectivos amigos (do Redis).
+    Com `limit`, retorna uma página e o `next_cursor` da seguinte. Com
+    `stream=1` (ou `Accept: application/x-ndjson`), transmite todos os itens
+    em NDJSON, um por linha, a partir de `cursor` se informado.
+    """
     try:
-        redis_client = get_redis_client()
-        
-        keys = redis_client.keys("cliente:*")
-        
-        clientes_amigos = []
-        for key in keys:
-            cliente_data = json.loads(redis_client.get(key))
-            dados_pessoais = cliente_data.get('dados_pessoais', {})
-            amigos = cliente_data.get('amigos', [])
-            
-            clientes_amigos.append({
-                'cliente': {
-                    'id': dados_pessoais.get('id'),
-                    'nome': dados_pessoais.get('nome'),
-                    'cpf': dados_pessoais.get('cpf')
-                },
-                'amigos': amigos,
-                'total_amigos': len(amigos)
-            })
-        
-        redis_client.close()
-        
-        # Ordenar por nome do cliente
-        clientes_amigos.sort(key=lambda x: x['cliente']['nome'])
-        
-        return {
-            "status": "success",
-            "total": len(clientes_amigos),
-            "clientes_amigos": clientes_amigos
-        }
+        return responder_listagem('clientes_amigos', limit, cursor, quer_ndjson(request, stream))
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar clientes e amigos: {str(e)}")
 
 
 @app.get("/api/clientes/compras")
-async def get_clientes_compras():
-    """Retorna clientes e suas compras realizadas (do Redis)."""
+def get_clientes_compras(request: Request, limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO_PAGINA),
+                         cursor: Optional[str] = None, stream: bool = False):
+    """
+    Retorna clientes e suas compras realizadas (do Redis).
+    Com `limit`, retorna uma página e o `next_cursor` da seguinte. Com
+    `stream=1` (ou `Accept: application/x-ndjson`), transmite todos os itens
+    em NDJSON, um por linha, a partir de `cursor` se informado.
+    """
     try:
-        redis_client = get_redis_client()
-        
-        keys = redis_client.keys("cliente:*")
-        
-        clientes_compras = []
-        for key in keys:
-            cliente_data = json.loads(redis_client.get(key))
-            dados_pessoais = cliente_data.get('dados_pessoais', {})
-            compras = cliente_data.get('compras', [])
-            
-            # Calcular valor total
-            valor_total = sum(compra.get('valor', 0) for compra in compras)
-            
-            clientes_compras.append({
-                'cliente': {
-                    'id': dados_pessoais.get('id'),
-                    'nome': dados_pessoais.get('nome'),
-                    'cpf': dados_pessoais.get('cpf'),
-                    'cidade': dados_pessoais.get('cidade')
-                },
-                'compras': compras,
-                'total_compras': len(compras),
-                'valor_total': round(valor_total, 2)
-            })
-        
-        redis_client.close()
-        
-        # Ordenar por nome do cliente
-        clientes_compras.sort(key=lambda x: x['cliente']['nome'])
-        
-        return {
-            "status": "success",
-            "total": len(clientes_compras),
-            "clientes_compras": clientes_compras
-        }
+        return responder_listagem('clientes_compras', limit, cursor, quer_ndjson(request, stream))
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar compras: {str(e)}")
 
 
 @app.get("/api/recomendacoes")
-async def get_recomendacoes():
-    """Lista os clientes e as recomendações geradas para eles (do Redis)."""
+def get_recomendacoes(request: Request, limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO_PAGINA),
+                      cursor: Optional[str] = None, stream: bool = False):
+    """
+    Lista os clientes e as recomendações geradas para eles (do Redis).
+    Com `limit`, retorna uma página e o `next_cursor` da seguinte. Com
+    `stream=1` (ou `Accept: application/x-ndjson`), transmite todos os itens
+    em NDJSON, um por linha, a partir de `cursor` se informado.
+    """
     try:
-        redis_client = get_redis_client()
-        
-        keys = redis_client.keys("cliente:*")
-        
-        recomendacoes_list = []
-        for key in keys:
-            cliente_data = json.loads(redis_client.get(key))
-            dados_pessoais = cliente_data.get('dados_pessoais', {})
-            recomendacoes = cliente_data.get('recomendacoes', [])
-            
-            if recomendacoes:  # Apenas clientes com recomendações
-                recomendacoes_list.append({
-                    'cliente_id': dados_pessoais.get('id'),
-                    'cliente_nome': dados_pessoais.get('nome'),
-                    'cliente_cpf': dados_pessoais.get('cpf'),
-                    'recomendacoes': recomendacoes,
-                    'total_recomendacoes': len(recomendacoes)
-                })
+        return responder_listagem('recomendacoes', limit, cursor, quer_ndjson(request, stream))
         
-        redis_client.close()
-        
-        # Ordenar por nome do cliente
-        recomendacoes_list.sort(key=lambda x: x['cliente_nome'])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar recomendações: {str(e)}")
+
+
+@app.get("/api/clientes/{cliente_id}")
+def get_cliente(cliente_id: int):
+    """Documento consolidado de um cliente (do Redis)."""
+    try:
+        return responder_cliente('detalhe', cliente_id)
         
-        return {
-            "status": "success",
-            "total": len(recomendacoes_list),
-            "recomendacoes": recomendacoes_list
-        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao buscar cliente: {str(e)}")
+
+
+@app.get("/api/recomendacoes/{cliente_id}")
+def get_recomendacoes_cliente(cliente_id: int):
+    """Recomendações de um cliente, calculadas sob demanda e guardadas no Redis."""
+    try:
+        return responder_cliente('recomendacoes', cliente_id)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar recomendações: {str(e)}")
 
 
+if DEBUG_PROFILE_TOKEN:
+    # Com ?profile=1, as funções de rota (executadas no pool de threads) entram no perfil
+    perfilar_rotas(app)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
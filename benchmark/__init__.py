@@ -0,0 +1,14 @@
+"""
+Benchmark reproduzível da sincronização e das rotas de leitura em escala
+(10 mil, 100 mil, 1 milhão de clientes).
+
+- `gerador`: dados sintéticos rápidos (nomes de listas pré-montadas,
+  distribuições configuráveis de amigos e de compras) e carga em massa nos
+  bancos;
+- `medicao`: tempo e pico de memória de cada cenário, resultados em JSON e
+  comparação com um baseline gravado;
+- `cenarios`: sincronização completa, em blocos e incremental e cada rota de
+  listagem.
+
+Uso: python -m benchmark --help
+"""
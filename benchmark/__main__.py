@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Executa o benchmark: gera os dados sintéticos, carrega os bancos (só com
+--carregar, que APAGA os dados existentes neles), roda os cenários
+escolhidos, grava os resultados em JSON e, com --baseline, compara com um
+resultado anterior. Uma regressão acima da tolerância encerra com código de
+saída 1. Com --backend memoria as fontes e o Redis são substituídos pelos
+repositórios em processo (repositorios.py), sem precisar dos containers.
+
+Exemplos:
+    python -m benchmark --clientes 100000 --carregar --saida resultados.json
+    python -m benchmark --clientes 100000 --baseline baseline.json
+    python -m benchmark --clientes 100000 --baseline baseline.json --atualizar-baseline
+    python -m benchmark --backend memoria --clientes 20000
+"""
+
+import os
+import sys
+# Garantir que o encoding padrão é UTF-8
+if sys.platform == 'win32':
+    os.environ['PYTHONIOENCODING'] = 'utf-8'
+    # Configurar stdout/stderr para UTF-8
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    if hasattr(sys.stderr, 'reconfigure'):
+        sys.stderr.reconfigure(encoding='utf-8')
+
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+import app
+from benchmark import medicao
+from benchmark.cenarios import CENARIOS
+from benchmark.gerador import (DISTRIBUICOES, PARAMETROS_PADRAO, carregar_bancos, carregar_memoria, gerar_dados,
+                               resumo_dados)
+from repositorios import ArmazenamentoMemoria
+
+
+def ler_argumentos():
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description=__doc__.split('\n\n')[0])
+    dados = parser.add_argument_group('dados sintéticos')
+    dados.add_argument('--clientes', type=int, default=PARAMETROS_PADRAO['clientes'])
+    dados.add_argument('--produtos', type=int, default=PARAMETROS_PADRAO['produtos'])
+    dados.add_argument('--media-amigos', type=float, default=PARAMETROS_PADRAO['media_amigos'])
+    dados.add_argument('--distribuicao-amigos', choices=sorted(DISTRIBUICOES),
+                       default=PARAMETROS_PADRAO['distribuicao_amigos'])
+    dados.add_argument('--media-compras', type=float, default=PARAMETROS_PADRAO['media_compras'])
+    dados.add_argument('--distribuicao-compras', choices=sorted(DISTRIBUICOES),
+                       default=PARAMETROS_PADRAO['distribuicao_compras'])
+    dados.add_argument('--semente', type=int, default=PARAMETROS_PADRAO['semente'])
+    dados.add_argument('--carregar', action='store_true',
+                       help='recria os bancos configurados com os dados gerados, APAGANDO o que houver neles '
+                            '(sem esta opção os bancos devem ter sido carregados antes com os mesmos parâmetros)')
+
+    execucao = parser.add_argument_group('execução')
+    execucao.add_argument('--backend', choices=('bancos', 'memoria'), default='bancos',
+                          help='bancos configurados (padrão) ou repositórios em processo')
+    execucao.add_argument('--cenarios', default=','.join(CENARIOS),
+                          help=f"lista separada por vírgulas (padrão: todos, na ordem {','.join(CENARIOS)})")
+    execucao.add_argument('--repeticoes', type=int, default=5, help='leituras medidas por rota de listagem')
+    execucao.add_argument('--fracao-incremental', type=float, default=0.01,
+                          help='fração dos clientes alterada antes da sincronização incremental')
+    execucao.add_argument('--saida', default='benchmark_resultados.json')
+
+    comparacao = parser.add_argument_group('comparação')
+    comparacao.add_argument('--baseline', help='resultados anteriores para comparar')
+    comparacao.add_argument('--atualizar-baseline', action='store_true',
+                            help='grava os resultados como o novo baseline em vez de comparar')
+    comparacao.add_argument('--tolerancia', type=float, default=0.2,
+                            help='aumento relativo tolerado em cada métrica (padrão: 0.2 = 20%%)')
+    comparacao.add_argument('--minimo-ms', type=float, default=5.0,
+                            help='diferença absoluta abaixo da qual tempos não contam como regressão')
+    comparacao.add_argument('--minimo-mb', type=float, default=10.0,
+                            help='diferença absoluta abaixo da qual memória não conta como regressão')
+    return parser.parse_args()
+
+
+def main() -> int:
+    argumentos = ler_argumentos()
+    nomes_cenarios = [nome.strip() for nome in argumentos.cenarios.split(',') if nome.strip()]
+    desconhecidos = [nome for nome in nomes_cenarios if nome not in CENARIOS]
+    if desconhecidos:
+        print(f"Cenários desconhecidos: {', '.join(desconhecidos)} (disponíveis: {', '.join(CENARIOS)})")
+        return 2
+
+    parametros = {chave: getattr(argumentos, chave) for chave in PARAMETROS_PADRAO}
+    print(f"Gerando dados sintéticos: {parametros}")
+    inicio = time.perf_counter()
+    dados = gerar_dados(**parametros)
+    extras = {'geracao_dados_ms': round((time.perf_counter() - inicio) * 1000, 1), 'dados': resumo_dados(dados)}
+    print(f"  {extras['dados']} em {extras['geracao_dados_ms'] / 1000:.1f} s")
+
+    armazenamento = mongo_collection = neo4j_driver = None
+    if argumentos.backend == 'memoria':
+        print("Carregando o armazenamento em memória...")
+        armazenamento = ArmazenamentoMemoria()
+        inicio = time.perf_counter()
+        carregar_memoria(dados, armazenamento)
+        extras['carga_ms'] = {'memoria': round((time.perf_counter() - inicio) * 1000, 1)}
+        print(f"  carregado em {extras['carga_ms']['memoria'] / 1000:.1f} s")
+        app.usar_armazenamento(armazenamento)
+    else:
+        mongo_collection = app.get_mongodb_client()['recomendacao_db']['clientes_interesses']
+        neo4j_driver = app.get_neo4j_driver()
+        if argumentos.carregar:
+            print("Carregando os bancos (os dados existentes são apagados)...")
+            with app.postgres_conexao() as pg_conn:
+                extras['carga_ms'] = carregar_bancos(dados, pg_conn, mongo_collection, neo4j_driver)
+
+    contexto = {
+        'dados': dados,
+        'parametros': parametros,
+        'repeticoes': argumentos.repeticoes,
+        'fracao_incremental': argumentos.fracao_incremental,
+        'armazenamento': armazenamento,
+        'mongo_collection': mongo_collection,
+        'neo4j_driver': neo4j_driver
+    }
+    cenarios = {}
+    with TestClient(app.app) as cliente_http:
+        contexto['http'] = cliente_http
+        for nome in nomes_cenarios:
+            preparar, executar = CENARIOS[nome]
+            print(f"\n[{nome}]")
+            if preparar is not None:
+                preparar(contexto)
+            cenarios[nome] = medicao.medir(lambda: executar(contexto))
+            resultado = cenarios[nome]
+            etapas = ', '.join(f"{etapa} {duracao} ms" for etapa, duracao in resultado['etapas_ms'].items())
+            print(f"  {resultado['duracao_ms']} ms | pico de memória {resultado['pico_memoria_mb']} MB | {etapas}")
+
+    resultados = medicao.montar_resultados(parametros, cenarios, extras)
+    medicao.gravar_resultados(resultados, argumentos.saida)
+    print(f"\nResultados gravados em {argumentos.saida}")
+
+    if not argumentos.baseline:
+        return 0
+    if argumentos.atualizar_baseline or not os.path.exists(argumentos.baseline):
+        medicao.gravar_resultados(resultados, argumentos.baseline)
+        print(f"Baseline gravado em {argumentos.baseline}")
+        return 0
+
+    regressoes, avisos = medicao.comparar(
+        resultados, medicao.ler_resultados(argumentos.baseline),
+        argumentos.tolerancia, argumentos.minimo_ms, argumentos.minimo_mb
+    )
+    for aviso in avisos:
+        print(f"Aviso: {aviso}")
+    if regressoes:
+        print("\n" + "=" * 60)
+        print(f"REGRESSÃO em relação a {argumentos.baseline} (tolerância {argumentos.tolerancia * 100:.0f}%):")
+        for regressao in regressoes:
+            print(f"  - {regressao}")
+        print("=" * 60)
+        return 1
+    print(f"Sem regressões em relação a {argumentos.baseline} (tolerância {argumentos.tolerancia * 100:.0f}%)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
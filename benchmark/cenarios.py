@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cenários do benchmark. Cada cenário tem uma preparação (fora da medição) e
+uma execução medida, que retorna o tempo de cada etapa (`etapas_ms`) e
+`detalhes` informativos.
+
+- `sync_completo`, `sync_streaming`: sincronização completa (mode=full e
+  mode=streaming), com as etapas registradas pela própria sincronização e o
+  tempo de extração de cada fonte;
+- `sync_incremental`: sincronização incremental depois de alterar uma
+  fração dos clientes nas três fontes (a alteração não entra na medição);
+- `listagem_*`: uma rota de listagem, pela aplicação ASGI inteira
+  (middlewares incluídos): a primeira leitura completa, a mediana das
+  leituras seguintes, a listagem percorrida em páginas de
+  LIMITE_MAXIMO_PAGINA e a listagem em NDJSON.
+"""
+
+import statistics
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import app
+from benchmark.gerador import alterar_clientes, alterar_clientes_memoria
+
+# Rotas de listagem: nome do cenário -> caminho
+ROTAS_LISTAGEM = {
+    'listagem_clientes': '/api/clientes',
+    'listagem_clientes_amigos': '/api/clientes/amigos',
+    'listagem_clientes_compras': '/api/clientes/compras',
+    'listagem_recomendacoes': '/api/recomendacoes',
+}
+
+# Cabeçalhos das leituras (fixos, para que as medições sejam comparáveis)
+CABECALHOS = {'Accept-Encoding': 'gzip'}
+
+
+def _ms(inicio: float) -> float:
+    return round((time.perf_counter() - inicio) * 1000, 1)
+
+
+def _sincronizar(modo: str) -> Dict[str, Any]:
+    """Executa uma sincronização e separa o tempo de cada etapa dos detalhes."""
+    progresso = app.ProgressoSync()
+    resultado = app.executar_sincronizacao(modo, None, progresso)
+    progresso.finalizar('concluido')
+    etapas = {etapa['nome']: etapa['duracao_ms'] for etapa in progresso.job['etapas']}
+    for fonte, duracao in resultado.get('tempos_extracao_ms', {}).items():
+        etapas[f"extracao.{fonte}"] = duracao
+    return {
+        'etapas_ms': etapas,
+        'detalhes': {
+            'modo': resultado['modo'],
+            'clientes_processados': resultado['clientes_processados'],
+            'chaves_gravadas': resultado['chaves_gravadas'],
+            'chaves_por_segundo': resultado['chaves_por_segundo']
+        }
+    }
+
+
+def _garantir_geracao(contexto: Dict[str, Any]):
+    """Os cenários que leem ou sincronizam de forma incremental precisam de uma geração publicada."""
+    redis_client = app.get_redis_client()
+    try:
+        publicada = app.obter_geracao_atual(redis_client) is not None
+    finally:
+        redis_client.close()
+    if not publicada:
+        print("  Nenhuma geração publicada: executando uma sincronização completa (fora da medição)...")
+        _sincronizar('full')
+
+
+def _preparar_incremental(contexto: Dict[str, Any]):
+    _garantir_geracao(contexto)
+    dados, fracao, semente = contexto['dados'], contexto['fracao_incremental'], contexto['parametros']['semente']
+    if contexto['armazenamento'] is not None:
+        alterados = alterar_clientes_memoria(dados, fracao, semente, contexto['armazenamento'])
+    else:
+        with app.postgres_conexao() as pg_conn:
+            alterados = alterar_clientes(
+                dados, fracao, semente, pg_conn, contexto['mongo_collection'], contexto['neo4j_driver']
+            )
+    print(f"  {alterados} clientes alterados antes da sincronização incremental")
+
+
+def _cenario_listagem(caminho: str) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    def executar(contexto: Dict[str, Any]) -> Dict[str, Any]:
+        cliente = contexto['http']
+        etapas, detalhes = {}, {}
+
+        inicio = time.perf_counter()
+        resposta = cliente.get(caminho, headers=CABECALHOS)
+        resposta.raise_for_status()
+        etapas['completa_primeira'] = _ms(inicio)
+        detalhes['bytes_completa'] = len(resposta.content)
+
+        duracoes = []
+        for _ in range(contexto['repeticoes']):
+            inicio = time.perf_counter()
+            cliente.get(caminho, headers=CABECALHOS).raise_for_status()
+            duracoes.append(_ms(inicio))
+        etapas['completa'] = statistics.median(duracoes)
+        detalhes['completa_p95_ms'] = max(duracoes) if len(duracoes) < 20 else \
+            statistics.quantiles(duracoes, n=20)[-1]
+
+        inicio = time.perf_counter()
+        paginas, cursor = 0, None
+        while True:
+            parametros = {'limit': app.LIMITE_MAXIMO_PAGINA}
+            if cursor:
+                parametros['cursor'] = cursor
+            pagina = cliente.get(caminho, params=parametros, headers=CABECALHOS)
+            pagina.raise_for_status()
+            paginas += 1
+            cursor = pagina.json()['next_cursor']
+            if cursor is None:
+                break
+        etapas['paginada'] = _ms(inicio)
+        detalhes['paginas'] = paginas
+
+        inicio = time.perf_counter()
+        linhas = 0
+        with cliente.stream('GET', caminho, params={'stream': 'true'}, headers=CABECALHOS) as resposta:
+            resposta.raise_for_status()
+            for _ in resposta.iter_lines():
+                linhas += 1
+        etapas['ndjson'] = _ms(inicio)
+        detalhes['linhas_ndjson'] = linhas
+        return {'etapas_ms': etapas, 'detalhes': detalhes}
+    return executar
+
+
+# Cenários: nome -> (preparação fora da medição ou None, execução medida)
+CENARIOS: Dict[str, Tuple[Optional[Callable[[Dict[str, Any]], None]], Callable[[Dict[str, Any]], Dict[str, Any]]]] = {
+    'sync_completo': (None, lambda contexto: _sincronizar('full')),
+    'sync_streaming': (None, lambda contexto: _sincronizar('streaming')),
+    'sync_incremental': (_preparar_incremental, lambda contexto: _sincronizar('incremental')),
+    **{
+        nome: (_garantir_geracao, _cenario_listagem(caminho))
+        for nome, caminho in ROTAS_LISTAGEM.items()
+    }
+}
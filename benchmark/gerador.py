@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gerador de dados sintéticos para o benchmark, no mesmo esquema do
+seed_databases.py, e carga em massa nos três bancos de origem.
+
+Os nomes, endereços e cidades são combinados a partir de listas
+pré-montadas (sem chamadas ao Faker por registro), e tudo sai de um único
+`random.Random(semente)`: a mesma semente gera sempre os mesmos dados. A
+quantidade de amigos e de compras de cada cliente segue uma distribuição
+configurável (`uniforme`, `exponencial` ou `potencia`, esta com poucos
+clientes com muitos amigos/compras) em torno da média informada, e a
+popularidade dos produtos segue uma lei de Zipf.
+
+A carga usa COPY no PostgreSQL, insert_many no MongoDB e UNWIND em lotes
+no Neo4j, e apaga os dados que existirem antes. Com o armazenamento em
+processo (repositorios.ArmazenamentoMemoria) a carga é o `carregar` dele.
+As datas de atualização dos dados carregados ficam no passado (`datas_carga`),
+para que a sincronização incremental do benchmark veja só as alterações do
+cenário.
+"""
+
+import io
+import math
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from seed_databases import INTERESSES, PRODUTOS_POR_TIPO, TIPOS_PRODUTOS, setup_postgres_schema
+
+PRIMEIROS_NOMES = [
+    'Ana', 'Beatriz', 'Bruno', 'Camila', 'Carlos', 'Daniel', 'Eduarda', 'Felipe', 'Fernanda', 'Gabriel',
+    'Helena', 'Igor', 'Isabela', 'João', 'Júlia', 'Lucas', 'Luana', 'Marcos', 'Maria', 'Mateus',
+    'Natália', 'Otávio', 'Paula', 'Pedro', 'Rafael', 'Renata', 'Rodrigo', 'Sofia', 'Thiago', 'Vitória'
+]
+SOBRENOMES = [
+    'Almeida', 'Alves', 'Barbosa', 'Cardoso', 'Carvalho', 'Costa', 'Dias', 'Fernandes', 'Ferreira', 'Gomes',
+    'Lima', 'Martins', 'Melo', 'Moreira', 'Nascimento', 'Oliveira', 'Pereira', 'Ribeiro', 'Rocha', 'Santos',
+    'Silva', 'Souza', 'Teixeira', 'Vieira'
+]
+LOGRADOUROS = [
+    'Rua das Flores', 'Avenida Brasil', 'Rua XV de Novembro', 'Avenida Paulista', 'Rua da Praia',
+    'Rua São João', 'Avenida Atlântica', 'Rua Sete de Setembro', 'Travessa do Comércio', 'Alameda Santos'
+]
+CIDADES = [
+    ('São Paulo', 'SP'), ('Campinas', 'SP'), ('Rio de Janeiro', 'RJ'), ('Niterói', 'RJ'),
+    ('Belo Horizonte', 'MG'), ('Uberlândia', 'MG'), ('Curitiba', 'PR'), ('Londrina', 'PR'),
+    ('Porto Alegre', 'RS'), ('Florianópolis', 'SC'), ('Salvador', 'BA'), ('Recife', 'PE'),
+    ('Fortaleza', 'CE'), ('Belém', 'PA'), ('Manaus', 'AM'), ('Goiânia', 'GO'), ('Brasília', 'DF')
+]
+DOMINIOS = ['email.com', 'correio.com.br', 'exemplo.org']
+VARIACOES_PRODUTO = ['', '', '', ' Premium', ' Pro', ' Plus', ' Deluxe', ' Edition']
+FAIXAS_VALOR = {
+    'eletrônicos': (100.0, 5000.0), 'roupas': (30.0, 500.0), 'livros': (20.0, 80.0),
+    'casa': (50.0, 800.0), 'esportes': (40.0, 2000.0), 'beleza': (15.0, 300.0),
+    'alimentos': (10.0, 150.0), 'brinquedos': (25.0, 400.0), 'ferramentas': (30.0, 600.0),
+    'jogos': (50.0, 6000.0)
+}
+
+# Linhas por COPY/insert_many/UNWIND na carga
+LOTE_CARGA = 10000
+# Recuo das datas de atualização da carga (bem acima de SYNC_MARGEM_WATERMARK_S)
+# e período pelo qual as datas dos interesses são espalhadas, como no
+# seed_databases.py (a marca d'água do MongoDB é a maior data existente)
+RECUO_CARGA = timedelta(hours=1)
+JANELA_INTERESSES = timedelta(days=180)
+
+# Sorteio da quantidade de amigos/compras de um cliente com a média informada
+DISTRIBUICOES: Dict[str, Callable[[random.Random, float], int]] = {
+    'uniforme': lambda rng, media: rng.randint(0, int(2 * media)),
+    'exponencial': lambda rng, media: int(rng.expovariate(1 / media) + 0.5) if media > 0 else 0,
+    # Pareto com alfa 2: média `media`, mínimo media/2 e cauda longa
+    'potencia': lambda rng, media: int(rng.paretovariate(2.0) * media / 2 + 0.5)
+}
+
+PARAMETROS_PADRAO = {
+    'clientes': 10000,
+    'produtos': 500,
+    'media_amigos': 8,
+    'distribuicao_amigos': 'potencia',
+    'media_compras': 5,
+    'distribuicao_compras': 'exponencial',
+    'semente': 42
+}
+
+
+def gerar_dados(clientes: int, produtos: int, media_amigos: float, distribuicao_amigos: str,
+                media_compras: float, distribuicao_compras: str, semente: int) -> Dict[str, Any]:
+    """
+    Gera os dados sintéticos: clientes e produtos (tuplas das tabelas do
+    PostgreSQL), compras (id_produto, data, id_cliente), interesses por
+    cliente e amizades (pares id1 < id2, gravados nos dois sentidos).
+    """
+    rng = random.Random(semente)
+    sortear_amigos = DISTRIBUICOES[distribuicao_amigos]
+    sortear_compras = DISTRIBUICOES[distribuicao_compras]
+
+    nomes = [
+        f"{primeiro} {sobrenome} {ultimo}"
+        for primeiro, sobrenome, ultimo in zip(
+            rng.choices(PRIMEIROS_NOMES, k=clientes), rng.choices(SOBRENOMES, k=clientes),
+            rng.choices(SOBRENOMES, k=clientes)
+        )
+    ]
+    lista_clientes = []
+    for cliente_id, nome in enumerate(nomes, start=1):
+        cidade, uf = rng.choice(CIDADES)
+        lista_clientes.append((
+            cliente_id, f"{cliente_id:011d}", nome,
+            f"{rng.choice(LOGRADOUROS)}, {rng.randint(1, 3000)}", cidade, uf,
+            f"cliente{cliente_id}@{rng.choice(DOMINIOS)}"
+        ))
+
+    lista_produtos = []
+    for produto_id in range(1, produtos + 1):
+        tipo = rng.choice(TIPOS_PRODUTOS)
+        minimo, maximo = FAIXAS_VALOR.get(tipo, (10.0, 1000.0))
+        lista_produtos.append((
+            produto_id, rng.choice(PRODUTOS_POR_TIPO[tipo]) + rng.choice(VARIACOES_PRODUTO),
+            round(rng.uniform(minimo, maximo), 2), rng.randint(1, 100), tipo
+        ))
+
+    # Poucos produtos muito populares (Zipf), sorteados pelos pesos acumulados
+    pesos_acumulados = []
+    acumulado = 0.0
+    for posicao in range(1, produtos + 1):
+        acumulado += 1 / posicao
+        pesos_acumulados.append(acumulado)
+    ids_produtos = list(range(1, produtos + 1))
+    hoje = date.today()
+    datas = [(hoje - timedelta(days=dias)).isoformat() for dias in range(365)]
+    compras = []
+    for cliente_id in range(1, clientes + 1):
+        quantidade = sortear_compras(rng, media_compras)
+        if quantidade:
+            for produto_id in rng.choices(ids_produtos, cum_weights=pesos_acumulados, k=quantidade):
+                compras.append((produto_id, rng.choice(datas), cliente_id))
+
+    interesses = {
+        cliente_id: rng.sample(INTERESSES, rng.randint(1, 6)) for cliente_id in range(1, clientes + 1)
+    }
+
+    # Cada cliente inicia metade das suas amizades (a outra metade vem dos
+    # outros clientes); pares codificados em um inteiro para o conjunto ocupar pouco
+    pares = set()
+    for cliente_id in range(1, clientes + 1):
+        for _ in range(math.ceil(sortear_amigos(rng, media_amigos) / 2)):
+            amigo_id = rng.randint(1, clientes)
+            if amigo_id != cliente_id:
+                menor, maior = min(cliente_id, amigo_id), max(cliente_id, amigo_id)
+                pares.add(menor * (clientes + 1) + maior)
+    amizades = [divmod(par, clientes + 1) for par in sorted(pares)]
+
+    return {
+        'clientes': lista_clientes,
+        'produtos': lista_produtos,
+        'compras': compras,
+        'interesses': interesses,
+        'amizades': amizades
+    }
+
+
+def resumo_dados(dados: Dict[str, Any]) -> Dict[str, int]:
+    """Quantidades geradas de cada tipo de registro."""
+    return {
+        'clientes': len(dados['clientes']),
+        'produtos': len(dados['produtos']),
+        'compras': len(dados['compras']),
+        'amizades': len(dados['amizades'])
+    }
+
+
+def _lotes(itens: List[Any], tamanho: int = LOTE_CARGA) -> Iterable[List[Any]]:
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+
+def _copiar(cursor, tabela: str, colunas: Tuple[str, ...], linhas: List[tuple]):
+    """COPY das linhas (valores sem tabulação nem quebra de linha) para a tabela, em lotes."""
+    comando = f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN"
+    for lote in _lotes(linhas, LOTE_CARGA * 10):
+        buffer = io.StringIO()
+        for linha in lote:
+            buffer.write('\t'.join(map(str, linha)))
+            buffer.write('\n')
+        buffer.seek(0)
+        cursor.copy_expert(comando, buffer)
+
+
+def datas_carga(dados: Dict[str, Any]) -> Tuple[datetime, Dict[int, str]]:
+    """
+    Data de atualização dos registros carregados (RECUO_CARGA antes de agora)
+    e a `data_atualizacao` de cada documento de interesses, espalhadas pela
+    JANELA_INTERESSES que termina nela, em ordem de id. Se todos tivessem a
+    mesma data, todos cairiam na margem da marca d'água do MongoDB e a
+    sincronização incremental refaria todos os clientes.
+    """
+    atualizado_em = datetime.now(timezone.utc) - RECUO_CARGA
+    fim_interesses = datetime.now() - RECUO_CARGA
+    passo = JANELA_INTERESSES / max(1, len(dados['clientes']))
+    total = len(dados['clientes'])
+    datas_interesses = {
+        cliente[0]: (fim_interesses - passo * (total - indice)).isoformat(timespec='microseconds')
+        for indice, cliente in enumerate(dados['clientes'], 1)
+    }
+    return atualizado_em, datas_interesses
+
+
+def carregar_postgres(pg_conn, dados: Dict[str, Any], atualizado_em: datetime):
+    """Recria o esquema do PostgreSQL e carrega clientes, produtos e compras com COPY."""
+    setup_postgres_schema(pg_conn)
+    cursor = pg_conn.cursor()
+    marca = atualizado_em.isoformat()
+    try:
+        _copiar(cursor, 'clientes', ('id', 'cpf', 'nome', 'endereco', 'cidade', 'uf', 'email', 'atualizado_em'),
+                [cliente + (marca,) for cliente in dados['clientes']])
+        _copiar(cursor, 'produtos', ('id', 'produto', 'valor', 'quantidade', 'tipo', 'atualizado_em'),
+                [produto + (marca,) for produto in dados['produtos']])
+        _copiar(cursor, 'compras', ('id_produto', 'data', 'id_cliente', 'atualizado_em'),
+                [compra + (marca,) for compra in dados['compras']])
+        # Os ids foram informados no COPY: as sequências continuam depois deles
+        for tabela in ('clientes', 'produtos'):
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), GREATEST(max(id), 1)) FROM {tabela}"
+            )
+        pg_conn.commit()
+        # Estatísticas atualizadas para o planejador antes das consultas da sincronização
+        pg_conn.autocommit = True
+        cursor.execute("ANALYZE")
+    finally:
+        pg_conn.autocommit = False
+        cursor.close()
+
+
+def carregar_mongodb(mongo_collection, dados: Dict[str, Any], datas_interesses: Dict[int, str]):
+    """Recria a coleção de interesses com um documento por cliente."""
+    mongo_collection.drop()
+    documentos = [
+        {'id_cliente': cliente[0], 'cpf': cliente[1], 'nome': cliente[2],
+         'interesses': dados['interesses'][cliente[0]], 'data_atualizacao': datas_interesses[cliente[0]]}
+        for cliente in dados['clientes']
+    ]
+    for lote in _lotes(documentos):
+        mongo_collection.insert_many(lote, ordered=False)
+
+
+def carregar_neo4j(neo4j_driver, dados: Dict[str, Any], atualizado_em: datetime):
+    """Recria as pessoas e as amizades (nos dois sentidos) do Neo4j com UNWIND em lotes."""
+    marca = int(atualizado_em.timestamp() * 1000)
+    with neo4j_driver.session() as session:
+        session.run("""
+            MATCH (n)
+            CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS
+        """).consume()
+        session.run("CREATE INDEX pessoa_id IF NOT EXISTS FOR (p:Pessoa) ON (p.id)").consume()
+        session.run("CALL db.awaitIndexes()").consume()
+        for lote in _lotes(dados['clientes']):
+            session.run("""
+                UNWIND $pessoas AS pessoa
+                CREATE (:Pessoa {id: pessoa[0], cpf: pessoa[1], nome: pessoa[2], atualizado_em: $marca})
+            """, pessoas=[[cliente[0], cliente[1], cliente[2]] for cliente in lote], marca=marca).consume()
+        for lote in _lotes(dados['amizades']):
+            session.run("""
+                UNWIND $pares AS par
+                MATCH (p1:Pessoa {id: par[0]})
+                MATCH (p2:Pessoa {id: par[1]})
+                CREATE (p1)-[:AMIGO_DE {atualizado_em: $marca}]->(p2),
+                       (p2)-[:AMIGO_DE {atualizado_em: $marca}]->(p1)
+            """, pares=[list(par) for par in lote], marca=marca).consume()
+
+
+def carregar_bancos(dados: Dict[str, Any], pg_conn, mongo_collection, neo4j_driver) -> Dict[str, float]:
+    """
+    Carrega os dados gerados nos três bancos, apagando o que houver neles.
+    Retorna o tempo (ms) de cada carga.
+    """
+    atualizado_em, datas_interesses = datas_carga(dados)
+    tempos = {}
+    for nome, carregar, destino, marca in (
+        ('postgres', carregar_postgres, pg_conn, atualizado_em),
+        ('mongodb', carregar_mongodb, mongo_collection, datas_interesses),
+        ('neo4j', carregar_neo4j, neo4j_driver, atualizado_em)
+    ):
+        inicio = time.perf_counter()
+        carregar(destino, dados, marca)
+        tempos[nome] = round((time.perf_counter() - inicio) * 1000, 1)
+        print(f"  [{nome}] carregado em {tempos[nome] / 1000:.1f} s")
+    return tempos
+
+
+def carregar_memoria(dados: Dict[str, Any], armazenamento):
+    """Carrega os dados gerados no repositorios.ArmazenamentoMemoria, com as mesmas datas de `carregar_bancos`."""
+    atualizado_em, datas_interesses = datas_carga(dados)
+    armazenamento.carregar(**dados, atualizado_em=atualizado_em, datas_interesses=datas_interesses)
+
+
+def _alteracoes(dados: Dict[str, Any], fracao: float, semente: int) -> Tuple[List[tuple], Dict[int, List[str]], List[List[int]]]:
+    """
+    Atividade entre duas sincronizações para o cenário incremental: uma
+    fração dos clientes faz uma compra nova, outra muda de interesses e outra
+    ganha um amigo. Retorna (compras novas, interesses novos, pares de amigos).
+    """
+    rng = random.Random(semente)
+    total = len(dados['clientes'])
+    quantidade = max(1, int(total * fracao / 3))
+    ids_produtos = [produto[0] for produto in dados['produtos']]
+    hoje = date.today().isoformat()
+
+    compras = [(rng.choice(ids_produtos), hoje, cliente_id)
+               for cliente_id in rng.sample(range(1, total + 1), quantidade)]
+    interesses = {cliente_id: rng.sample(INTERESSES, rng.randint(1, 6))
+                  for cliente_id in rng.sample(range(1, total + 1), quantidade)}
+    pares = [[rng.randint(1, total), rng.randint(1, total)] for _ in range(quantidade)]
+    return compras, interesses, pares
+
+
+def alterar_clientes(dados: Dict[str, Any], fracao: float, semente: int,
+                     pg_conn, mongo_collection, neo4j_driver) -> int:
+    """Aplica as alterações do cenário incremental nos três bancos. Retorna quantos clientes foram alterados diretamente."""
+    compras, interesses, pares = _alteracoes(dados, fracao, semente)
+    cursor = pg_conn.cursor()
+    try:
+        cursor.executemany("INSERT INTO compras (id_produto, data, id_cliente) VALUES (%s, %s, %s)", compras)
+        pg_conn.commit()
+    finally:
+        cursor.close()
+
+    atualizacao = datetime.now().isoformat(timespec='microseconds')
+    for cliente_id, novos in interesses.items():
+        mongo_collection.update_one(
+            {'id_cliente': cliente_id},
+            {'$set': {'interesses': novos, 'data_atualizacao': atualizacao}}
+        )
+
+    with neo4j_driver.session() as session:
+        session.run("""
+            UNWIND $pares AS par
+            MATCH (p1:Pessoa {id: par[0]})
+            MATCH (p2:Pessoa {id: par[1]})
+            WHERE p1 <> p2
+            MERGE (p1)-[r1:AMIGO_DE]->(p2)
+            ON CREATE SET r1.atualizado_em = timestamp()
+            MERGE (p2)-[r2:AMIGO_DE]->(p1)
+            ON CREATE SET r2.atualizado_em = timestamp()
+        """, pares=pares).consume()
+    return len(compras) + len(interesses) + len(pares)
+
+
+def alterar_clientes_memoria(dados: Dict[str, Any], fracao: float, semente: int, armazenamento) -> int:
+    """As mesmas alterações de `alterar_clientes`, no repositorios.ArmazenamentoMemoria."""
+    compras, interesses, pares = _alteracoes(dados, fracao, semente)
+    armazenamento.clientes.executar("INSERT INTO compras (id_produto, data, id_cliente) VALUES (?, ?, ?)", compras)
+    atualizacao = datetime.now().isoformat(timespec='microseconds')
+    for cliente_id, novos in interesses.items():
+        armazenamento.interesses.gravar(cliente_id, novos, atualizacao)
+    for id1, id2 in pares:
+        armazenamento.amizades.adicionar_amizade(id1, id2)
+    return len(compras) + len(interesses) + len(pares)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Medição dos cenários do benchmark e comparação com um baseline.
+
+O pico de memória é o maior RSS do processo durante o cenário menos o RSS
+no início dele, amostrado por uma thread (em /proc/self/statm, no Linux).
+Sem /proc, vale o pico do processo inteiro (`resource.getrusage`), que só
+cresce entre cenários. Com SYNC_PROCESSOS > 1 a memória dos processos de
+consolidação não entra na conta.
+"""
+
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # resource não existe no Windows
+    resource = None
+
+# Intervalo (segundos) entre as amostras de memória
+INTERVALO_AMOSTRAGEM_S = 0.005
+# Versão do formato do arquivo de resultados
+VERSAO_RESULTADOS = 1
+
+
+def _rss_mb() -> Optional[float]:
+    """RSS atual do processo em MB (None se não houver /proc)."""
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        return None
+
+
+def _rss_maximo_mb() -> Optional[float]:
+    """Maior RSS do processo até agora em MB (None sem o módulo resource)."""
+    if resource is None:
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return maximo / 1024 / 1024 if sys.platform == 'darwin' else maximo / 1024
+
+
+class AmostradorMemoria:
+    """Mede o pico de RSS (acima do RSS inicial) enquanto o bloco `with` executa."""
+
+    def __init__(self):
+        self.pico_mb: Optional[float] = None
+        self._parar = threading.Event()
+        self._thread = None
+        self._inicial = None
+        self._maximo = None
+
+    def __enter__(self):
+        self._inicial = _rss_mb()
+        if self._inicial is None:
+            return self
+        self._maximo = self._inicial
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+        self._thread.start()
+        return self
+
+    def _amostrar(self):
+        while not self._parar.wait(INTERVALO_AMOSTRAGEM_S):
+            self._maximo = max(self._maximo, _rss_mb())
+
+    def __exit__(self, *erro):
+        if self._thread is None:
+            maximo = _rss_maximo_mb()
+            self.pico_mb = round(maximo, 1) if maximo is not None else None
+            return False
+        self._parar.set()
+        self._thread.join()
+        self._maximo = max(self._maximo, _rss_mb())
+        self.pico_mb = round(self._maximo - self._inicial, 1)
+        return False
+
+
+def medir(funcao: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Executa um cenário medindo a duração total e o pico de memória. O cenário
+    retorna um dicionário com `etapas_ms` (tempo de cada etapa) e, se quiser,
+    `detalhes` (contagens e outras informações, fora da comparação).
+    """
+    with AmostradorMemoria() as memoria:
+        inicio = time.perf_counter()
+        resultado = funcao()
+        duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+    return {
+        'duracao_ms': duracao_ms,
+        'etapas_ms': resultado.get('etapas_ms', {}),
+        'pico_memoria_mb': memoria.pico_mb,
+        'detalhes': resultado.get('detalhes', {})
+    }
+
+
+def ambiente() -> Dict[str, Any]:
+    """Versões e configuração que influenciam os números (gravadas junto com os resultados)."""
+    import codec
+    import app
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'processadores': os.cpu_count(),
+        'redis_codec': codec.REDIS_CODEC,
+        'redis_compressao': codec.REDIS_COMPRESSAO,
+        'redis_layout': app.REDIS_LAYOUT,
+        'sync_processos': app.SYNC_PROCESSOS,
+        'backend': 'bancos' if app._armazenamento is None else 'memoria'
+    }
+
+
+def montar_resultados(parametros: Dict[str, Any], cenarios: Dict[str, Dict[str, Any]],
+                      extras: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Documento JSON com os parâmetros, o ambiente e as medições de cada cenário."""
+    return {
+        'versao': VERSAO_RESULTADOS,
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'parametros': parametros,
+        'ambiente': ambiente(),
+        **(extras or {}),
+        'cenarios': cenarios
+    }
+
+
+def gravar_resultados(resultados: Dict[str, Any], caminho: str):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+
+
+def ler_resultados(caminho: str) -> Dict[str, Any]:
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def _metricas(cenario: Dict[str, Any]) -> Dict[str, Tuple[Optional[float], str]]:
+    """Métricas comparáveis de um cenário: nome -> (valor, unidade)."""
+    metricas = {'duracao_ms': (cenario.get('duracao_ms'), 'ms')}
+    for etapa, duracao in cenario.get('etapas_ms', {}).items():
+        metricas[f"etapas_ms.{etapa}"] = (duracao, 'ms')
+    metricas['pico_memoria_mb'] = (cenario.get('pico_memoria_mb'), 'MB')
+    return metricas
+
+
+def comparar(atual: Dict[str, Any], baseline: Dict[str, Any], tolerancia: float,
+             minimo_ms: float, minimo_mb: float) -> Tuple[List[str], List[str]]:
+    """
+    Compara os resultados com o baseline. Uma métrica regride quando passa
+    do valor do baseline em mais que `tolerancia` (fração) e em mais que a
+    diferença mínima absoluta (`minimo_ms` ou `minimo_mb`, para ignorar
+    ruído em medições curtas). Retorna (regressões, avisos).
+    """
+    regressoes, avisos = [], []
+    if atual.get('parametros') != baseline.get('parametros'):
+        avisos.append(f"parâmetros diferentes dos do baseline: {baseline.get('parametros')}")
+    diferencas = {chave: (valor, atual['ambiente'].get(chave))
+                  for chave, valor in baseline.get('ambiente', {}).items()
+                  if atual['ambiente'].get(chave) != valor}
+    if diferencas:
+        avisos.append(f"ambiente diferente do baseline (baseline, atual): {diferencas}")
+
+    for nome, cenario_base in baseline.get('cenarios', {}).items():
+        cenario = atual['cenarios'].get(nome)
+        if cenario is None:
+            continue
+        metricas_atuais = _metricas(cenario)
+        for metrica, (valor_base, unidade) in _metricas(cenario_base).items():
+            valor = metricas_atuais.get(metrica, (None, unidade))[0]
+            if valor is None or valor_base is None:
+                continue
+            minimo = minimo_ms if unidade == 'ms' else minimo_mb
+            if valor > valor_base * (1 + tolerancia) and valor - valor_base > minimo:
+                variacao = (valor / valor_base - 1) * 100 if valor_base else float('inf')
+                regressoes.append(f"{nome} {metrica}: {valor_base} -> {valor} {unidade} (+{variacao:.0f}%)")
+    return regressoes, avisos
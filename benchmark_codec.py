@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark dos codificadores de valores do Redis (codec.py): tempo de
+codificação e decodificação e tamanho gravado de documentos de clientes
+realistas (montados como na sincronização, com compras, amigos, interesses
+e recomendações), para cada codificador instalado. Em seguida compara as
+compressões instaladas (zstd, zstd com dicionário e lz4) sobre os documentos
+acima de REDIS_COMPRESSAO_MIN_BYTES e, por fim, os bytes lidos e o tempo de
+decodificação por cliente em cada listagem nos dois layouts (REDIS_LAYOUT).
+
+Uso: python benchmark_codec.py [clientes] [repeticoes]
+"""
+
+import os
+import sys
+# Garantir que o encoding padrão é UTF-8
+if sys.platform == 'win32':
+    os.environ['PYTHONIOENCODING'] = 'utf-8'
+    # Configurar stdout/stderr para UTF-8
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    if hasattr(sys.stderr, 'reconfigure'):
+        sys.stderr.reconfigure(encoding='utf-8')
+
+import random
+import time
+from typing import List, Dict, Any
+
+import codec
+from app import consolidar_cliente, CAMPOS_LISTAGENS, CONTADORES_DOCUMENTO
+from benchmark_recomendacoes import gerar_dados
+from recomendacao import calcular_recomendacoes
+
+INTERESSES = ['Tecnologia', 'Esportes', 'Música', 'Viagens', 'Culinária', 'Leitura', 'Cinema', 'Games']
+CIDADES = [('São Paulo', 'SP'), ('Rio de Janeiro', 'RJ'), ('Belo Horizonte', 'MG'), ('Curitiba', 'PR')]
+
+
+def gerar_documentos(total_clientes: int) -> List[Dict[str, Any]]:
+    """Documentos consolidados (formato gravado no Redis) sobre dados sintéticos."""
+    amigos_por_cliente, compras_por_cliente = gerar_dados(total_clientes, 8, 5, 500)
+    for compras in compras_por_cliente.values():
+        for compra in compras:
+            compra['data'] = f"2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}T10:30:00"
+    clientes = list(range(1, total_clientes + 1))
+    recomendacoes = calcular_recomendacoes(clientes, amigos_por_cliente, compras_por_cliente)
+    interesses = {cliente_id: random.sample(INTERESSES, random.randint(1, 4)) for cliente_id in clientes}
+
+    documentos = []
+    for cliente_id in clientes:
+        cidade, uf = random.choice(CIDADES)
+        cliente = (cliente_id, f"{cliente_id:011d}", f"Cliente {cliente_id} da Silva",
+                   f"Rua {cliente_id}, {random.randint(1, 999)}", cidade, uf, f"cliente{cliente_id}@email.com")
+        documentos.append(consolidar_cliente(cliente, compras_por_cliente, interesses, amigos_por_cliente,
+                                             recomendacoes[cliente_id]))
+    return documentos
+
+
+def medir(nome: str, documentos: List[Dict[str, Any]], repeticoes: int) -> Dict[str, float]:
+    """Melhor tempo (de `repeticoes`) para codificar e decodificar todos os documentos com um codificador."""
+    formato, codificar_valor = codec.CODIFICADORES[nome]
+    cabecalho = codec.MARCADOR + bytes([formato, codec.VERSAO])
+    codificados = [cabecalho + codificar_valor(documento) for documento in documentos]
+
+    tempo_codificacao = tempo_decodificacao = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for documento in documentos:
+            cabecalho + codificar_valor(documento)
+        tempo_codificacao = min(tempo_codificacao, time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        for valor in codificados:
+            codec.decodificar(valor)
+        tempo_decodificacao = min(tempo_decodificacao, time.perf_counter() - inicio)
+
+    if [codec.decodificar(valor) for valor in codificados] != documentos:
+        raise AssertionError(f"{nome}: documentos decodificados diferentes dos originais")
+    return {
+        'codificacao_us': tempo_codificacao / len(documentos) * 1e6,
+        'decodificacao_us': tempo_decodificacao / len(documentos) * 1e6,
+        'bytes': sum(len(valor) for valor in codificados) / len(documentos)
+    }
+
+
+def medir_compressoes(documentos: List[Dict[str, Any]], repeticoes: int) -> Dict[str, Dict[str, float]]:
+    """Taxa e tempo de compressão dos documentos grandes (serializados em JSON) para cada compressão instalada."""
+    serializados = [codec.CODIFICADORES['json'][1](documento) for documento in documentos]
+    grandes = [dados for dados in serializados if len(dados) >= codec.REDIS_COMPRESSAO_MIN_BYTES]
+    # O dicionário é treinado em metade dos documentos e medido na outra metade
+    treino, grandes = serializados[::2], grandes[1::2]
+    if not grandes:
+        return {}
+
+    compressoes = {}
+    if codec.zstandard is not None:
+        nivel = codec.REDIS_COMPRESSAO_NIVEL
+        dicionario = codec.zstandard.ZstdCompressionDict(codec.treinar_dicionario(treino, 112640)[1])
+        compressoes['zstd'] = (codec.zstandard.ZstdCompressor(level=nivel).compress,
+                               codec.zstandard.ZstdDecompressor().decompress)
+        compressoes['zstd+dicionário'] = (
+            codec.zstandard.ZstdCompressor(level=nivel, dict_data=dicionario).compress,
+            codec.zstandard.ZstdDecompressor(dict_data=dicionario).decompress
+        )
+    if codec.lz4_frame is not None:
+        compressoes['lz4'] = (codec.lz4_frame.compress, codec.lz4_frame.decompress)
+
+    resultados = {}
+    for nome, (comprimir, descomprimir) in compressoes.items():
+        comprimidos = [comprimir(dados) for dados in grandes]
+        tempo_compressao = tempo_descompressao = float('inf')
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            for dados in grandes:
+                comprimir(dados)
+            tempo_compressao = min(tempo_compressao, time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            for dados in comprimidos:
+                descomprimir(dados)
+            tempo_descompressao = min(tempo_descompressao, time.perf_counter() - inicio)
+        resultados[nome] = {
+            'compressao_us': tempo_compressao / len(grandes) * 1e6,
+            'descompressao_us': tempo_descompressao / len(grandes) * 1e6,
+            'taxa': sum(map(len, comprimidos)) / sum(map(len, grandes))
+        }
+    return resultados
+
+
+def medir_layouts(documentos: List[Dict[str, Any]], repeticoes: int) -> Dict[str, Dict[str, float]]:
+    """
+    Bytes lidos e tempo de decodificação por cliente em cada listagem: o
+    documento inteiro (layout `documento`) ou só as partes usadas (layout `hash`).
+    """
+    inteiros = [codec.codificar(documento) for documento in documentos]
+    resultados = {}
+    for nome, campos in CAMPOS_LISTAGENS.items():
+        partes = [
+            [codec.codificar(documento[campo]) for campo in campos if campo not in CONTADORES_DOCUMENTO]
+            for documento in documentos
+        ]
+        tempo_documento = tempo_hash = float('inf')
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            for valor in inteiros:
+                codec.decodificar(valor)
+            tempo_documento = min(tempo_documento, time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            for valores in partes:
+                for valor in valores:
+                    codec.decodificar(valor)
+            tempo_hash = min(tempo_hash, time.perf_counter() - inicio)
+        resultados[nome] = {
+            'bytes_documento': sum(map(len, inteiros)) / len(documentos),
+            'bytes_hash': (sum(len(valor) for valores in partes for valor in valores) + sum(
+                len(str(len(documento[CONTADORES_DOCUMENTO[campo]])))
+                for documento in documentos for campo in campos if campo in CONTADORES_DOCUMENTO
+            )) / len(documentos),
+            'decodificacao_documento_us': tempo_documento / len(documentos) * 1e6,
+            'decodificacao_hash_us': tempo_hash / len(documentos) * 1e6
+        }
+    return resultados
+
+
+def main():
+    argumentos = [int(valor) for valor in sys.argv[1:]]
+    total_clientes, repeticoes = (argumentos + [10000, 5][len(argumentos):])[:2]
+
+    random.seed(42)
+    print(f"Gerando {total_clientes} documentos de clientes...")
+    documentos = gerar_documentos(total_clientes)
+
+    indisponiveis = [nome for nome in ('orjson', 'msgpack') if nome not in codec.CODIFICADORES]
+    if indisponiveis:
+        print(f"  Não instalados (fora da comparação): {', '.join(indisponiveis)}")
+
+    resultados = {nome: medir(nome, documentos, repeticoes) for nome in codec.CODIFICADORES}
+    referencia = resultados['json']
+    print(f"\n  {'Codificador':12} {'Codificação':>14} {'Decodificação':>14} {'Tamanho médio':>15}")
+    for nome, resultado in resultados.items():
+        print(f"  {nome:12} {resultado['codificacao_us']:11.1f} µs {resultado['decodificacao_us']:11.1f} µs "
+              f"{resultado['bytes']:9.0f} bytes ({resultado['bytes'] / referencia['bytes'] * 100:.0f}%)")
+
+    grandes = sum(1 for documento in documentos
+                  if len(codec.CODIFICADORES['json'][1](documento)) >= codec.REDIS_COMPRESSAO_MIN_BYTES)
+    print(f"\n  Documentos com {codec.REDIS_COMPRESSAO_MIN_BYTES} bytes ou mais (comprimidos): "
+          f"{grandes} de {len(documentos)}")
+    compressoes = medir_compressoes(documentos, repeticoes)
+    if not compressoes:
+        print("  Nenhuma compressão instalada (zstandard, lz4) ou nenhum documento acima do limite")
+    else:
+        print(f"\n  {'Compressão':16} {'Compressão':>14} {'Descompressão':>14} {'Tamanho':>9}")
+        for nome, resultado in compressoes.items():
+            print(f"  {nome:16} {resultado['compressao_us']:11.1f} µs {resultado['descompressao_us']:11.1f} µs "
+                  f"{resultado['taxa'] * 100:8.0f}%")
+
+    print(f"\n  Por cliente, com o codec configurado ({codec.REDIS_CODEC}, compressão {codec.REDIS_COMPRESSAO}):")
+    print(f"  {'Listagem':18} {'Bytes (documento)':>18} {'Bytes (hash)':>13} "
+          f"{'Decodificação (documento)':>26} {'Decodificação (hash)':>21}")
+    for nome, resultado in medir_layouts(documentos, repeticoes).items():
+        print(f"  {nome:18} {resultado['bytes_documento']:18.0f} {resultado['bytes_hash']:13.0f} "
+              f"{resultado['decodificacao_documento_us']:23.1f} µs {resultado['decodificacao_hash_us']:18.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
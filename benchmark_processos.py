@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark da sincronização completa com vários processos (SYNC_PROCESSOS):
+executa a mesma sincronização com cada quantidade de processos sobre os
+mesmos dados e mostra a duração total e a de cada etapa, o tempo de CPU do
+processo principal (o trabalho que não é dividido entre os processos) e o
+ganho sobre um processo. Com 1 processo a consolidação roda no processo
+principal, como no padrão. Os corpos das listagens de cada execução são
+comparados com os da primeira.
+
+Backends:
+- memoria (padrão): dados sintéticos do benchmark.gerador em um
+  repositorios.ArmazenamentoMemoria, gravado em um arquivo temporário que
+  cada processo abre (`app.usar_fontes_em_processos`), e um Redis do
+  fakeredis servido por TCP em outro processo;
+- bancos: os bancos e o Redis configurados, já carregados (ex.: com
+  `python -m benchmark --carregar`).
+
+O ganho depende de haver um núcleo livre para cada processo (e para o
+Redis): o script mostra quantos núcleos estão disponíveis.
+
+Uso: python benchmark_processos.py [--processos 1,2,4] [--clientes 10000] [--backend memoria|bancos]
+"""
+
+import os
+import sys
+# Garantir que o encoding padrão é UTF-8
+if sys.platform == 'win32':
+    os.environ['PYTHONIOENCODING'] = 'utf-8'
+    # Configurar stdout/stderr para UTF-8
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    if hasattr(sys.stderr, 'reconfigure'):
+        sys.stderr.reconfigure(encoding='utf-8')
+
+import argparse
+import hashlib
+import multiprocessing
+import multiprocessing.forkserver
+import socket
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+import redis
+
+import app
+from benchmark.gerador import PARAMETROS_PADRAO, carregar_memoria, gerar_dados, resumo_dados
+from repositorios import ArmazenamentoMemoria, FontesDados
+
+
+def _servir_redis(porta: int):
+    """Processo do Redis simulado (fakeredis) do backend em memória."""
+    from fakeredis import TcpFakeServer
+    TcpFakeServer(('127.0.0.1', porta), server_type='redis').serve_forever()
+
+
+def _porta_livre() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def fontes_em_memoria(argumentos) -> Iterator[FontesDados]:
+    """
+    Fontes do backend em memória, também gravadas em arquivo para os
+    processos, com o Redis do fakeredis em outro processo (em REDIS_CONFIG).
+    """
+    parametros = dict(PARAMETROS_PADRAO, clientes=argumentos.clientes, semente=argumentos.semente)
+    print(f"Gerando dados sintéticos: {parametros}")
+    dados = gerar_dados(**parametros)
+    print(f"  {resumo_dados(dados)}")
+    armazenamento = ArmazenamentoMemoria()
+    carregar_memoria(dados, armazenamento)
+
+    porta = _porta_livre()
+    servidor = multiprocessing.get_context('spawn').Process(target=_servir_redis, args=(porta,), daemon=True)
+    servidor.start()
+    with tempfile.TemporaryDirectory() as diretorio:
+        try:
+            caminho = os.path.join(diretorio, 'fontes.sqlite')
+            armazenamento.salvar(caminho)
+            app.usar_fontes_em_processos(caminho)
+            app.REDIS_CONFIG = {'host': '127.0.0.1', 'port': porta, 'decode_responses': False}
+            for _ in range(100):
+                try:
+                    redis.Redis(**app.REDIS_CONFIG).ping()
+                    break
+                except redis.ConnectionError:
+                    time.sleep(0.1)
+            yield armazenamento.fontes()
+        finally:
+            app.usar_fontes_em_processos(None)
+            app.encerrar_pools()
+            servidor.kill()
+            servidor.join()
+
+
+@contextmanager
+def fontes_bancos(argumentos) -> Iterator[FontesDados]:
+    with app.abrir_fontes() as fontes:
+        yield fontes
+
+
+def resumo_listagens(redis_client) -> str:
+    """
+    Resumo (sha256) dos corpos das listagens da geração publicada, lidos em
+    partes (o servidor TCP do fakeredis não envia respostas de vários MB).
+    """
+    geracao = app.obter_geracao_atual(redis_client)
+    resumo = hashlib.sha256()
+    for nome in app.LISTAGENS:
+        chave = app.chave_listagem(geracao, nome)
+        tamanho = redis_client.strlen(chave)
+        for inicio in range(0, tamanho, 65536):
+            resumo.update(redis_client.getrange(chave, inicio, inicio + 65535))
+    return resumo.hexdigest()
+
+
+def sincronizar(fontes: FontesDados, processos: int) -> Dict[str, Any]:
+    """Uma sincronização completa com `processos` processos, medida."""
+    app.SYNC_PROCESSOS = processos
+    progresso = app.ProgressoSync()
+    redis_client = app.get_redis_client()
+    try:
+        cpu_inicio = time.process_time()
+        inicio = time.perf_counter()
+        app.sincronizar_completo(fontes, redis_client, progresso)
+        duracao = time.perf_counter() - inicio
+        cpu_principal = time.process_time() - cpu_inicio
+        progresso.finalizar('concluido')
+        listagens = resumo_listagens(redis_client)
+    finally:
+        redis_client.close()
+    # Gerações anteriores apagadas fora da medição
+    app.coletar_geracoes()
+    return {
+        'duracao_ms': duracao * 1000,
+        'cpu_principal_ms': cpu_principal * 1000,
+        'etapas_ms': {etapa['nome']: etapa['duracao_ms'] for etapa in progresso.job['etapas']},
+        'listagens': listagens
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--processos', default='1,2,4', help='quantidades de processos, separadas por vírgula')
+    parser.add_argument('--backend', choices=('memoria', 'bancos'), default='memoria')
+    parser.add_argument('--clientes', type=int, default=PARAMETROS_PADRAO['clientes'], help='só no backend memoria')
+    parser.add_argument('--semente', type=int, default=PARAMETROS_PADRAO['semente'])
+    argumentos = parser.parse_args()
+    quantidades: List[int] = [int(valor) for valor in argumentos.processos.split(',') if valor.strip()]
+
+    nucleos = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    print(f"Núcleos disponíveis: {nucleos}")
+    if nucleos and max(quantidades) > nucleos:
+        print(f"  Aviso: mais processos que núcleos; acima de {nucleos} processo(s) não há ganho a medir")
+
+    if max(quantidades) > 1 and app.contexto_processos().get_start_method() == 'forkserver':
+        # Na API o servidor de processos é iniciado (importando a aplicação)
+        # uma vez e atende todas as sincronizações: fica fora da medição
+        multiprocessing.forkserver.ensure_running()
+
+    abrir = fontes_em_memoria if argumentos.backend == 'memoria' else fontes_bancos
+    resultados = {}
+    with abrir(argumentos) as fontes:
+        for processos in quantidades:
+            print(f"\n[{processos} processo(s)]")
+            resultados[processos] = sincronizar(fontes, processos)
+
+    base = resultados[quantidades[0]]
+    print(f"\n{'processos':>9} {'total ms':>10} {'consolidação ms':>16} {'listagens ms':>13} "
+          f"{'CPU principal ms':>17} {'ganho':>6}  listagens iguais")
+    for processos, resultado in resultados.items():
+        etapas = resultado['etapas_ms']
+        print(f"{processos:>9} {resultado['duracao_ms']:>10.0f} {etapas.get('consolidacao', 0):>16.0f} "
+              f"{etapas.get('listagens', 0):>13.0f} {resultado['cpu_principal_ms']:>17.0f} "
+              f"{base['duracao_ms'] / resultado['duracao_ms']:>5.2f}x  "
+              f"{'sim' if resultado['listagens'] == base['listagens'] else 'NÃO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do motor de recomendações: compara a implementação em Python puro
+(um cliente por vez) com a versão vetorizada (matriz esparsa, todos os
+clientes de uma vez) sobre dados sintéticos, conferindo que os resultados
+são iguais. Nas duas, as recomendações de cada cliente são lidas uma por
+vez, como na sincronização.
+
+Uso: python benchmark_recomendacoes.py [clientes] [amigos_por_cliente] [compras_por_cliente] [produtos]
+"""
+
+import os
+import sys
+# Garantir que o encoding padrão é UTF-8
+if sys.platform == 'win32':
+    os.environ['PYTHONIOENCODING'] = 'utf-8'
+    # Configurar stdout/stderr para UTF-8
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    if hasattr(sys.stderr, 'reconfigure'):
+        sys.stderr.reconfigure(encoding='utf-8')
+
+import random
+import time
+from typing import List, Dict, Any, Tuple
+
+import recomendacao
+from recomendacao import gerar_recomendacoes, calcular_recomendacoes
+
+
+def gerar_dados(total_clientes: int, media_amigos: int, media_compras: int,
+                total_produtos: int) -> Tuple[Dict[int, List[Dict[str, Any]]], Dict[int, List[Dict[str, Any]]]]:
+    """Amizades e compras sintéticas no mesmo formato extraído pela sincronização."""
+    random.seed(42)
+    produtos = list(range(1, total_produtos + 1))
+    # Poucos produtos muito populares, como em um catálogo real
+    pesos = [1 / i for i in range(1, total_produtos + 1)]
+
+    compras_por_cliente = {}
+    for cliente_id in range(1, total_clientes + 1):
+        quantidade = random.randint(0, 2 * media_compras)
+        if quantidade:
+            compras_por_cliente[cliente_id] = [
+                {'id': cliente_id * 100 + i, 'data': None, 'produto_id': produto_id}
+                for i, produto_id in enumerate(random.choices(produtos, weights=pesos, k=quantidade))
+            ]
+
+    amigos_por_cliente = {}
+    for cliente_id in range(1, total_clientes + 1):
+        amigos = random.sample(range(1, total_clientes + 1), min(total_clientes, random.randint(0, 2 * media_amigos)))
+        amigos_por_cliente[cliente_id] = sorted(
+            ({'id': amigo_id, 'nome': f"Pessoa {amigo_id}", 'cpf': f"{amigo_id:011d}"}
+             for amigo_id in amigos if amigo_id != cliente_id),
+            key=lambda amigo: amigo['nome']
+        )
+    return amigos_por_cliente, compras_por_cliente
+
+
+def main():
+    argumentos = [int(valor) for valor in sys.argv[1:]]
+    total_clientes, media_amigos, media_compras, total_produtos = (argumentos + [100000, 8, 5, 500][len(argumentos):])[:4]
+
+    print(f"Gerando {total_clientes} clientes (~{media_amigos} amigos e ~{media_compras} compras cada, "
+          f"{total_produtos} produtos)...")
+    amigos_por_cliente, compras_por_cliente = gerar_dados(total_clientes, media_amigos, media_compras, total_produtos)
+    clientes = list(range(1, total_clientes + 1))
+
+    # Como na sincronização, as recomendações de cada cliente são lidas uma
+    # por vez e descartadas depois de usadas
+    inicio = time.perf_counter()
+    for cliente_id in clientes:
+        gerar_recomendacoes(cliente_id, amigos_por_cliente, compras_por_cliente)
+    duracao_python = time.perf_counter() - inicio
+    print(f"  Python puro:  {duracao_python:8.2f} s")
+
+    if recomendacao.np is None:
+        print("  numpy não está instalado: a versão vetorizada não está disponível")
+        return
+
+    inicio = time.perf_counter()
+    obtido = calcular_recomendacoes(clientes, amigos_por_cliente, compras_por_cliente)
+    for cliente_id in clientes:
+        obtido[cliente_id]
+    duracao_vetorizada = time.perf_counter() - inicio
+    print(f"  Vetorizada:   {duracao_vetorizada:8.2f} s")
+
+    print(f"  Ganho:        {duracao_python / duracao_vetorizada:8.1f}x")
+    iguais = all(
+        obtido[cliente_id] == gerar_recomendacoes(cliente_id, amigos_por_cliente, compras_por_cliente)
+        for cliente_id in clientes
+    )
+    print(f"  Resultados iguais: {'sim' if iguais else 'NÃO'}")
+
+if __name__ == "__main__":
+    main()
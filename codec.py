@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Codificação dos valores gravados no Redis (documentos dos clientes e itens
+dos catálogos de produtos e pessoas).
+
+O codificador é escolhido pela variável REDIS_CODEC:
+- `json` (padrão): módulo json da biblioteca padrão;
+- `orjson`: mesmo formato JSON, gerado e lido pelo orjson (bem mais rápido);
+- `msgpack`: formato binário MessagePack, menor e mais rápido de ler.
+
+Valores com pelo menos REDIS_COMPRESSAO_MIN_BYTES bytes são comprimidos com
+REDIS_COMPRESSAO (`zstd`, `lz4` ou `nenhuma`). Com zstd, um dicionário
+treinado sobre documentos de exemplo (treinar_dicionario_zstd.py) pode ser
+ativado com `ativar_dicionario`; o id do dicionário vai no próprio quadro
+zstd e os dicionários desconhecidos são pedidos à função registrada em
+`configurar_busca_dicionarios`.
+
+Cada valor começa com um cabeçalho de 3 bytes (b'\\x00', formato, versão),
+em que os 4 bits altos do byte de formato indicam a compressão. Valores de
+formatos e compressões diferentes convivem no Redis durante uma troca de
+configuração: a leitura sempre usa o que está indicado no próprio valor.
+Valores sem cabeçalho (JSON gravado antes desta camada) continuam legíveis.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack é opcional
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard é opcional
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # lz4 é opcional
+    lz4_frame = None
+
+# Primeiro byte dos valores com cabeçalho (um JSON nunca começa com ele)
+MARCADOR = b'\x00'
+# Formatos (4 bits baixos do segundo byte do cabeçalho)
+FORMATO_JSON = 1
+FORMATO_MSGPACK = 2
+# Compressões (4 bits altos do segundo byte do cabeçalho)
+COMPRESSAO_NENHUMA = 0
+COMPRESSAO_ZSTD = 1
+COMPRESSAO_LZ4 = 2
+# Versão da codificação (terceiro byte do cabeçalho)
+VERSAO = 1
+
+# Compressão dos valores grandes: tamanho mínimo (bytes já codificados) e nível do zstd
+REDIS_COMPRESSAO_MIN_BYTES = int(os.getenv('REDIS_COMPRESSAO_MIN_BYTES', '1024'))
+REDIS_COMPRESSAO_NIVEL = int(os.getenv('REDIS_COMPRESSAO_NIVEL', '3'))
+
+
+def _codificar_json(valor: Any) -> bytes:
+    return json.dumps(valor, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _decodificar_json(dados: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(dados)
+    return json.loads(bytes(dados) if isinstance(dados, memoryview) else dados)
+
+
+# Codificadores disponíveis: nome -> (formato gravado no cabeçalho, função)
+CODIFICADORES = {'json': (FORMATO_JSON, _codificar_json)}
+if orjson is not None:
+    CODIFICADORES['orjson'] = (FORMATO_JSON, orjson.dumps)
+if msgpack is not None:
+    CODIFICADORES['msgpack'] = (FORMATO_MSGPACK, lambda valor: msgpack.packb(valor, use_bin_type=True))
+
+# Decodificadores por formato
+DECODIFICADORES = {FORMATO_JSON: _decodificar_json}
+if msgpack is not None:
+    DECODIFICADORES[FORMATO_MSGPACK] = lambda dados: msgpack.unpackb(dados, raw=False)
+
+
+def escolher_codificador(nome: str):
+    """Formato e função do codificador `nome` (json se ele não estiver instalado)."""
+    if nome not in CODIFICADORES:
+        print(f"Aviso: codificador '{nome}' indisponível (biblioteca não instalada?), usando json")
+        nome = 'json'
+    return nome, CODIFICADORES[nome]
+
+
+REDIS_CODEC, (_FORMATO_ATUAL, _CODIFICAR_ATUAL) = escolher_codificador(os.getenv('REDIS_CODEC', 'json'))
+_CABECALHO_ATUAL = MARCADOR + bytes([_FORMATO_ATUAL, VERSAO])
+
+
+# Compressão com zstd. Compressores e descompressores não podem ser usados
+# por duas threads ao mesmo tempo: cada thread guarda os seus, por dicionário
+_locais = threading.local()
+# Dicionários conhecidos (id -> dicionário) e o usado na compressão
+_dicionarios: Dict[int, Any] = {}
+_dicionario_ativo = None
+# Função que busca um dicionário desconhecido pelo id (configurada pela API)
+_buscar_dicionario: Optional[Callable[[int], Optional[bytes]]] = None
+
+
+def _por_thread(nome: str, dict_id: int, criar):
+    objetos = getattr(_locais, nome, None)
+    if objetos is None:
+        objetos = {}
+        setattr(_locais, nome, objetos)
+    objeto = objetos.get(dict_id)
+    if objeto is None:
+        objeto = objetos[dict_id] = criar()
+    return objeto
+
+
+def _comprimir_zstd(dados: bytes) -> bytes:
+    dicionario = _dicionario_ativo
+    dict_id = dicionario.dict_id() if dicionario is not None else 0
+    compressor = _por_thread('compressores', dict_id, lambda: zstandard.ZstdCompressor(
+        level=REDIS_COMPRESSAO_NIVEL, dict_data=dicionario
+    ))
+    return compressor.compress(dados)
+
+
+def _obter_dicionario(dict_id: int):
+    dicionario = _dicionarios.get(dict_id)
+    if dicionario is None and _buscar_dicionario is not None:
+        dados = _buscar_dicionario(dict_id)
+        if dados is not None:
+            dicionario = registrar_dicionario(dados)
+    if dicionario is None:
+        raise ValueError(f"Dicionário zstd {dict_id} desconhecido")
+    return dicionario
+
+
+def _descomprimir_zstd(dados) -> bytes:
+    dict_id = zstandard.get_frame_parameters(dados).dict_id
+    dicionario = _obter_dicionario(dict_id) if dict_id else None
+    descompressor = _por_thread('descompressores', dict_id, lambda: zstandard.ZstdDecompressor(
+        dict_data=dicionario
+    ))
+    return descompressor.decompress(dados)
+
+
+# Compressões disponíveis: nome -> (id gravado no cabeçalho, função)
+COMPRESSORES = {}
+DESCOMPRESSORES = {}
+if zstandard is not None:
+    COMPRESSORES['zstd'] = (COMPRESSAO_ZSTD, _comprimir_zstd)
+    DESCOMPRESSORES[COMPRESSAO_ZSTD] = _descomprimir_zstd
+if lz4_frame is not None:
+    COMPRESSORES['lz4'] = (COMPRESSAO_LZ4, lz4_frame.compress)
+    DESCOMPRESSORES[COMPRESSAO_LZ4] = lz4_frame.decompress
+
+
+def escolher_compressao(nome: str):
+    """Id e função da compressão `nome` (None se `nenhuma` ou se ela não estiver instalada)."""
+    if nome == 'nenhuma':
+        return nome, None
+    if nome not in COMPRESSORES:
+        print(f"Aviso: compressão '{nome}' indisponível (biblioteca não instalada?), valores sem compressão")
+        return 'nenhuma', None
+    return nome, COMPRESSORES[nome]
+
+
+REDIS_COMPRESSAO, _COMPRESSAO_ATUAL = escolher_compressao(os.getenv('REDIS_COMPRESSAO', 'zstd'))
+
+
+def registrar_dicionario(dados: bytes):
+    """Torna conhecido um dicionário zstd (bytes gerados por `treinar_dicionario`) e o retorna."""
+    dicionario = zstandard.ZstdCompressionDict(dados)
+    _dicionarios[dicionario.dict_id()] = dicionario
+    return dicionario
+
+
+def ativar_dicionario(dados: Optional[bytes]) -> Optional[int]:
+    """Passa a comprimir com o dicionário informado (ou sem dicionário, com None). Retorna o id dele."""
+    global _dicionario_ativo
+    if dados is None or zstandard is None:
+        _dicionario_ativo = None
+        return None
+    _dicionario_ativo = registrar_dicionario(dados)
+    return _dicionario_ativo.dict_id()
+
+
+def configurar_busca_dicionarios(funcao: Callable[[int], Optional[bytes]]):
+    """Registra a função que busca (pelo id) os dicionários ainda não carregados neste processo."""
+    global _buscar_dicionario
+    _buscar_dicionario = funcao
+
+
+def treinar_dicionario(amostras: List[bytes], tamanho: int) -> Tuple[int, bytes]:
+    """Treina um dicionário zstd de até `tamanho` bytes sobre valores serializados. Retorna (id, bytes)."""
+    if zstandard is None:
+        raise RuntimeError("zstandard não está instalado")
+    dicionario = zstandard.train_dictionary(tamanho, amostras, level=REDIS_COMPRESSAO_NIVEL)
+    return dicionario.dict_id(), dicionario.as_bytes()
+
+
+def serializar(valor: Any) -> bytes:
+    """Valor no formato do codificador configurado, sem cabeçalho nem compressão (amostras de treino)."""
+    return _CODIFICAR_ATUAL(valor)
+
+
+def codificar(valor: Any) -> bytes:
+    """Codifica um valor com o codificador configurado, precedido do cabeçalho (comprimido se for grande)."""
+    dados = _CODIFICAR_ATUAL(valor)
+    if _COMPRESSAO_ATUAL is not None and len(dados) >= REDIS_COMPRESSAO_MIN_BYTES:
+        compressao, comprimir = _COMPRESSAO_ATUAL
+        comprimidos = comprimir(dados)
+        if len(comprimidos) < len(dados):
+            return MARCADOR + bytes([_FORMATO_ATUAL | compressao << 4, VERSAO]) + comprimidos
+    return _CABECALHO_ATUAL + dados
+
+
+def decodificar(dados: bytes) -> Any:
+    """Decodifica um valor gravado por `codificar` (de qualquer formato) ou um JSON sem cabeçalho."""
+    if dados[:1] != MARCADOR:
+        return _decodificar_json(dados)
+    formato, compressao, versao = dados[1] & 0x0F, dados[1] >> 4, dados[2]
+    if versao != VERSAO or formato not in DECODIFICADORES or \
+            (compressao != COMPRESSAO_NENHUMA and compressao not in DESCOMPRESSORES):
+        raise ValueError(f"Valor do Redis em formato desconhecido "
+                         f"(formato {formato}, compressão {compressao}, versão {versao})")
+    corpo = memoryview(dados)[3:]
+    if compressao != COMPRESSAO_NENHUMA:
+        corpo = DESCOMPRESSORES[compressao](corpo)
+    return DECODIFICADORES[formato](corpo)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compressão das respostas HTTP (gzip e, se a biblioteca estiver instalada,
+brotli), negociada pelo cabeçalho Accept-Encoding da requisição.
+
+`CompressaoMiddleware` comprime as respostas da API a partir de um tamanho
+mínimo. Respostas que terminam antes do mínimo vão sem compressão; as
+demais são comprimidas inteiras (corpo enviado de uma vez) ou parte a parte
+(streaming), sem esperar o fim do corpo. Toda resposta de um tipo
+comprimível leva `Vary: Accept-Encoding`, comprimida ou não (pequena, ou
+para um cliente que não aceita nenhuma codificação), para que um cache
+não entregue a versão de um cliente a outro. Respostas que já vêm
+comprimidas (arquivos estáticos pré-comprimidos) passam sem alteração.
+"""
+
+import gzip
+import zlib
+from typing import Iterable, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional
+    brotli = None
+
+# Codificações na ordem de preferência do servidor
+CODIFICACOES = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Tipos de conteúdo que valem a pena comprimir (imagens e afins já são comprimidos)
+TIPOS_COMPRIMIVEIS = ('application/json', 'application/x-ndjson', 'application/javascript', 'text/')
+
+
+def escolher_codificacao(accept_encoding: str, disponiveis: Iterable[str] = CODIFICACOES) -> Optional[str]:
+    """Codificação preferida entre as `disponiveis` aceitas pelo cliente (None se nenhuma)."""
+    aceitas = set()
+    for item in accept_encoding.split(','):
+        nome, _, parametros = item.partition(';')
+        parametros = parametros.replace(' ', '')
+        try:
+            peso = float(parametros[2:]) if parametros.startswith('q=') else 1.0
+        except ValueError:
+            peso = 1.0
+        if peso > 0:
+            aceitas.add(nome.strip().lower())
+    for codificacao in disponiveis:
+        if codificacao in aceitas or '*' in aceitas:
+            return codificacao
+    return None
+
+
+def comprimir(dados: bytes, codificacao: str, nivel: Optional[int] = None) -> bytes:
+    """Comprime um corpo inteiro (nível None: o padrão rápido usado nas respostas da API)."""
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=4 if nivel is None else nivel)
+    return gzip.compress(dados, compresslevel=6 if nivel is None else nivel, mtime=0)
+
+
+class _CompressorIncremental:
+    """Compressão parte a parte: cada parte sai comprimida assim que chega (flush a cada parte)."""
+
+    def __init__(self, codificacao: str):
+        self.codificacao = codificacao
+        if codificacao == 'br':
+            self._compressor = brotli.Compressor(quality=4)
+        else:
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def parte(self, dados: bytes) -> bytes:
+        if self.codificacao == 'br':
+            return self._compressor.process(dados) + self._compressor.flush()
+        return self._compressor.compress(dados) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def fim(self) -> bytes:
+        if self.codificacao == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class CompressaoMiddleware:
+    """Middleware ASGI que comprime respostas de pelo menos `minimo` bytes."""
+
+    def __init__(self, app, minimo: int = 1024):
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        cabecalhos = dict(scope['headers'])
+        codificacao = escolher_codificacao(cabecalhos.get(b'accept-encoding', b'').decode('latin-1'))
+
+        estado = {'inicio': None, 'pendente': b'', 'compressor': None, 'repassar': False}
+
+        async def enviar(mensagem):
+            if mensagem['type'] == 'http.response.start':
+                estado['inicio'] = mensagem
+                tipo = dict(mensagem['headers']).get(b'content-type', b'').decode('latin-1')
+                ja_comprimida = any(nome.lower() == b'content-encoding' for nome, _ in mensagem['headers'])
+                estado['repassar'] = ja_comprimida or not tipo.startswith(TIPOS_COMPRIMIVEIS)
+                if estado['repassar']:
+                    await send(mensagem)
+                elif codificacao is None:
+                    # Nenhuma codificação aceita: vai sem compressão, mas só para este Accept-Encoding
+                    estado['repassar'] = True
+                    await send({**mensagem, 'headers': self._com_vary(mensagem['headers'])})
+                return
+            if mensagem['type'] != 'http.response.body' or estado['repassar']:
+                await send(mensagem)
+                return
+
+            corpo = mensagem.get('body', b'')
+            mais = mensagem.get('more_body', False)
+            if estado['compressor'] is None:
+                # Acumula o início do corpo até saber se ele passa do tamanho mínimo
+                corpo = estado['pendente'] + corpo
+                if mais and len(corpo) < self.minimo:
+                    estado['pendente'] = corpo
+                    return
+                inicio = estado['inicio']
+                if not mais and len(corpo) < self.minimo:
+                    # Resposta pequena: vai sem compressão
+                    await send({**inicio, 'headers': self._com_vary(inicio['headers'])})
+                    await send({'type': 'http.response.body', 'body': corpo, 'more_body': False})
+                    return
+                if not mais:
+                    corpo = comprimir(corpo, codificacao)
+                    await send({**inicio, 'headers': self._cabecalhos(inicio['headers'], codificacao, len(corpo))})
+                    await send({'type': 'http.response.body', 'body': corpo, 'more_body': False})
+                    return
+                estado['compressor'] = _CompressorIncremental(codificacao)
+                await send({**inicio, 'headers': self._cabecalhos(inicio['headers'], codificacao, None)})
+
+            compressor = estado['compressor']
+            corpo = compressor.parte(corpo) if mais else compressor.parte(corpo) + compressor.fim()
+            await send({'type': 'http.response.body', 'body': corpo, 'more_body': mais})
+
+        await self.app(scope, receive, enviar)
+
+    @staticmethod
+    def _com_vary(cabecalhos):
+        """Cabeçalhos com Accept-Encoding no Vary (somado ao Vary que a resposta já tiver)."""
+        novos, vary = [], []
+        for nome, valor in cabecalhos:
+            if nome.lower() == b'vary':
+                vary.append(valor)
+            else:
+                novos.append((nome, valor))
+        campos = {campo.strip().lower() for valor in vary for campo in valor.split(b',')}
+        if b'accept-encoding' not in campos and b'*' not in campos:
+            vary.append(b'Accept-Encoding')
+        novos.append((b'vary', b', '.join(vary)))
+        return novos
+
+    @classmethod
+    def _cabecalhos(cls, cabecalhos, codificacao: str, tamanho: Optional[int]):
+        """Cabeçalhos da resposta comprimida: Content-Encoding, Vary, tamanho novo e ETag fraco."""
+        novos = []
+        for nome, valor in cls._com_vary(cabecalhos):
+            nome_minusculo = nome.lower()
+            if nome_minusculo == b'content-length':
+                continue
+            if nome_minusculo == b'etag' and not valor.startswith(b'W/'):
+                # A representação comprimida não é idêntica byte a byte à original
+                valor = b'W/' + valor
+            novos.append((nome, valor))
+        novos.append((b'content-encoding', codificacao.encode('latin-1')))
+        if tamanho is not None:
+            novos.append((b'content-length', str(tamanho).encode('latin-1')))
+        return novos
@@ -19,10 +19,9 @@ if sys.platform == 'win32':
 import psycopg2
 from pymongo import MongoClient
 from neo4j import GraphDatabase
-import redis
-import json
 import requests
 import time
+from datetime import datetime
 import random
 from typing import Dict, List
 
@@ -49,12 +48,6 @@ NEO4J_CONFIG = {
     'password': 'neo4j123'
 }
 
-REDIS_CONFIG = {
-    'host': 'localhost',
-    'port': 6379,
-    'decode_responses': True
-}
-
 API_BASE_URL = 'http://localhost:8000'
 
 
@@ -76,13 +69,14 @@ def print_subsection(titulo: str):
 
 
 def ler_dados_redis(cliente_id: int) -> Dict:
-    """Lê dados de um cliente do Redis."""
-    r = redis.Redis(**REDIS_CONFIG)
-    key = f"cliente:{cliente_id}"
-    data = r.get(key)
-    r.close()
-    if data:
-        return json.loads(data)
+    """Lê os dados consolidados de um cliente no Redis (via GET /api/clientes/{id})."""
+    try:
+        response = requests.get(f"{API_BASE_URL}/api/clientes/{cliente_id}", timeout=10)
+    except requests.exceptions.ConnectionError:
+        print(f"  [ERRO] API não está rodando em {API_BASE_URL}")
+        return None
+    if response.status_code == 200:
+        return response.json()['cliente']
     return None
 
 
@@ -212,7 +206,7 @@ def alterar_dados_mongodb(cliente_id: int):
         {'id_cliente': cliente_id},
         {'$set': {
             'interesses': interesses_atualizados,
-            'data_atualizacao': time.strftime('%Y-%m-%dT%H:%M:%S')
+            'data_atualizacao': datetime.now().isoformat(timespec='microseconds')
         }}
     )
     
@@ -291,8 +285,10 @@ def alterar_dados_neo4j(cliente_id: int):
                 session.run("""
                     MATCH (p1:Pessoa {id: $id1})
                     MATCH (p2:Pessoa {id: $id2})
-                    MERGE (p1)-[:AMIGO_DE]->(p2)
-                    MERGE (p2)-[:AMIGO_DE]->(p1)
+                    MERGE (p1)-[r1:AMIGO_DE]->(p2)
+                    ON CREATE SET r1.atualizado_em = timestamp()
+                    MERGE (p2)-[r2:AMIGO_DE]->(p1)
+                    ON CREATE SET r2.atualizado_em = timestamp()
                 """, id1=cliente_id, id2=novo_amigo_id)
                 
                 novos_amigos.append(novo_amigo_nome)
@@ -329,17 +325,32 @@ def sincronizar_via_api():
     print(f"\n  Chamando POST {API_BASE_URL}/api/sync_data...")
     
     try:
-        response = requests.post(f"{API_BASE_URL}/api/sync_data", timeout=60)
+        response = requests.post(f"{API_BASE_URL}/api/sync_data", timeout=10)
         
-        if response.status_code == 200:
-            data = response.json()
+        if response.status_code != 202:
+            print(f"\n  [ERRO] Erro na sincronização: {response.status_code}")
+            print(f"     {response.text}")
+            return False
+        
+        # A sincronização roda em segundo plano: acompanhar o job até terminar
+        job = response.json()['job']
+        print(f"  Job {job['id']} iniciado")
+        etapa_exibida = None
+        while job['status'] not in ('concluido', 'erro'):
+            time.sleep(1)
+            job = requests.get(f"{API_BASE_URL}/api/sync_jobs/{job['id']}", timeout=10).json()
+            if job.get('etapa') and job['etapa'] != etapa_exibida:
+                etapa_exibida = job['etapa']
+                print(f"     Etapa: {etapa_exibida}")
+        
+        if job['status'] == 'concluido':
+            data = job['resultado']
             print(f"\n  [OK] Sincronização concluída!")
             print(f"     Clientes processados: {data.get('clientes_processados', 0)}")
             print(f"     Timestamp: {data.get('timestamp', 'N/A')}")
             return True
         else:
-            print(f"\n  [ERRO] Erro na sincronização: {response.status_code}")
-            print(f"     {response.text}")
+            print(f"\n  [ERRO] Erro na sincronização: {job.get('erro')}")
             return False
             
     except requests.exceptions.ConnectionError:
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Métricas da API no formato do Prometheus, expostas na rota /metrics.
+
+- sincronização: duração de cada etapa (extração de cada fonte,
+  recomendações, serialização e carga no Redis), linhas e chaves
+  processadas por etapa e duração total por modo;
+- rotas `/api/*`: latência e tamanho da resposta (já comprimida) por rota;
+- idas e voltas a cada banco (Redis, PostgreSQL, MongoDB e Neo4j).
+
+Usa o pacote prometheus_client. Sem ele as métricas não fazem nada e a
+rota /metrics responde 503. Os valores são do processo da API: com
+SYNC_PROCESSOS > 1 os tempos de cada etapa incluem os dos processos de
+consolidação (somados), mas as idas e voltas deles ao Redis não entram.
+"""
+
+import time
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    import prometheus_client
+except ImportError:  # prometheus_client é opcional
+    prometheus_client = None
+
+DISPONIVEL = prometheus_client is not None
+TIPO_CONTEUDO = prometheus_client.CONTENT_TYPE_LATEST if DISPONIVEL else 'text/plain; charset=utf-8'
+
+# Limites (segundos) dos histogramas de duração da sincronização e das requisições
+BUCKETS_SYNC = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BUCKETS_HTTP = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Limites (bytes) do histograma de tamanho das respostas
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+class _MetricaNula:
+    """Substitui as métricas quando o prometheus_client não está instalado."""
+
+    def labels(self, *valores, **rotulos):
+        return self
+
+    def observe(self, valor: float):
+        pass
+
+    def inc(self, valor: float = 1):
+        pass
+
+
+def _histograma(nome: str, descricao: str, rotulos: Iterable[str], buckets: Iterable[float]):
+    if not DISPONIVEL:
+        return _MetricaNula()
+    return prometheus_client.Histogram(nome, descricao, list(rotulos), buckets=tuple(buckets))
+
+
+def _contador(nome: str, descricao: str, rotulos: Iterable[str]):
+    if not DISPONIVEL:
+        return _MetricaNula()
+    return prometheus_client.Counter(nome, descricao, list(rotulos))
+
+
+SYNC_DURACAO = _histograma(
+    'sync_duracao_segundos', 'Duração total de cada sincronização', ('modo', 'status'), BUCKETS_SYNC
+)
+SYNC_DURACAO_ETAPA = _histograma(
+    'sync_etapa_duracao_segundos', 'Duração de cada etapa de uma sincronização', ('modo', 'etapa'), BUCKETS_SYNC
+)
+SYNC_LINHAS = _contador('sync_linhas', 'Linhas (registros) processadas por etapa da sincronização', ('etapa',))
+SYNC_CHAVES = _contador('sync_chaves', 'Chaves gravadas no Redis por etapa da sincronização', ('etapa',))
+HTTP_DURACAO = _histograma(
+    'http_requisicao_duracao_segundos', 'Latência das rotas /api/*', ('metodo', 'rota', 'status'), BUCKETS_HTTP
+)
+HTTP_TAMANHO = _histograma(
+    'http_resposta_bytes', 'Tamanho do corpo das respostas das rotas /api/* (como enviado)',
+    ('metodo', 'rota'), BUCKETS_BYTES
+)
+ROUND_TRIPS = _contador('round_trips', 'Idas e voltas a cada banco (comandos ou lotes enviados)', ('banco',))
+
+
+def contar_round_trip(banco: str, quantidade: int = 1):
+    ROUND_TRIPS.labels(banco).inc(quantidade)
+
+
+def registrar_sync(modo: str, status: str, duracao_s: float,
+                   medidas: Optional[Dict[str, Dict[str, Any]]] = None):
+    """
+    Registra uma sincronização encerrada: a duração total e, para cada etapa
+    em `medidas` (etapa -> {'segundos', 'linhas', 'chaves'}), a duração e as
+    contagens acumuladas nela.
+    """
+    SYNC_DURACAO.labels(modo, status).observe(duracao_s)
+    for etapa, medida in (medidas or {}).items():
+        SYNC_DURACAO_ETAPA.labels(modo, etapa).observe(medida['segundos'])
+        if medida['linhas']:
+            SYNC_LINHAS.labels(etapa).inc(medida['linhas'])
+        if medida['chaves']:
+            SYNC_CHAVES.labels(etapa).inc(medida['chaves'])
+
+
+def gerar() -> bytes:
+    """Métricas de todo o processo no formato de exposição em texto do Prometheus."""
+    return prometheus_client.generate_latest()
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI que mede a latência (até o último byte enviado) e o
+    tamanho do corpo das respostas das rotas com o prefixo informado. A rota
+    é registrada pelo caminho declarado (ex.: /api/clientes/{cliente_id}),
+    para que cada id não vire uma série nova.
+    """
+
+    def __init__(self, app, prefixo: str = '/api/'):
+        self.app = app
+        self.prefixo = prefixo
+
+    async def __call__(self, scope, receive, send):
+        if not DISPONIVEL or scope['type'] != 'http' or not scope['path'].startswith(self.prefixo):
+            await self.app(scope, receive, send)
+            return
+
+        estado = {'status': 500, 'bytes': 0}
+
+        async def enviar(mensagem):
+            if mensagem['type'] == 'http.response.start':
+                estado['status'] = mensagem['status']
+            elif mensagem['type'] == 'http.response.body':
+                estado['bytes'] += len(mensagem.get('body', b''))
+            await send(mensagem)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            rota = getattr(scope.get('route'), 'path', None) or 'desconhecida'
+            metodo = scope['method']
+            HTTP_DURACAO.labels(metodo, rota, str(estado['status'])).observe(time.perf_counter() - inicio)
+            HTTP_TAMANHO.labels(metodo, rota).observe(estado['bytes'])
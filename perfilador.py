@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perfis de desempenho da API em execução, sem reiniciá-la.
+
+- `AmostradorPilhas`: por uma janela de tempo, uma thread lê a pilha Python
+  de todas as threads (`sys._current_frames`) a intervalos fixos e conta
+  cada pilha. O relatório sai no formato "collapsed" (uma pilha por linha,
+  quadros separados por `;`, seguida da contagem), aceito pelo
+  flamegraph.pl, speedscope e afins.
+- `PerfilRequisicaoMiddleware`: com `?profile=1`, a requisição é executada
+  sob o cProfile e a resposta é trocada pelas estatísticas dela. O perfil
+  acompanha a requisição pelas threads do pool (funções de rota síncronas e
+  corpos em streaming) por uma ContextVar; as rotas e os geradores entram
+  no perfil com `perfilar_rotas` e `perfilar_iterador`.
+
+Fora de uma janela de amostragem ou de uma requisição com `?profile=1` nada
+é medido: não há thread de amostragem nem função de perfil instalada, só a
+leitura de uma ContextVar por chamada de rota.
+"""
+
+import asyncio
+import cProfile
+import functools
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from urllib.parse import parse_qs
+
+# Quadros em que uma thread só espera trabalho (a pilha inteira é omitida do relatório sem `ociosas`)
+QUADROS_OCIOSOS = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('queue.py', 'get'),
+}
+# Linhas das estatísticas do cProfile devolvidas com `?profile=1`
+LINHAS_ESTATISTICAS = 60
+
+# Perfil (cProfile) da requisição em andamento no contexto atual
+_perfil_requisicao: ContextVar[Optional[cProfile.Profile]] = ContextVar('perfil_requisicao', default=None)
+
+
+def token_valido(token_configurado: str, recebido: Optional[str]) -> bool:
+    """Compara o token recebido com o configurado (vazio: perfis desativados)."""
+    if not token_configurado or not recebido:
+        return False
+    return hmac.compare_digest(token_configurado.encode('utf-8'), recebido.encode('utf-8'))
+
+
+def _nome_quadro(quadro) -> str:
+    codigo = quadro.f_code
+    nome = getattr(codigo, 'co_qualname', codigo.co_name)
+    return f"{nome} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+class AmostradorPilhas:
+    """Amostra a pilha de todas as threads a cada `intervalo_s` segundos enquanto estiver ativo."""
+
+    def __init__(self, intervalo_s: float = 0.01, ociosas: bool = False):
+        self.intervalo_s = intervalo_s
+        self.ociosas = ociosas
+        self.pilhas: Counter = Counter()
+        self.amostras = 0
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._amostrar, name='perfilador', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+    def _amostrar(self):
+        proprio = threading.get_ident()
+        while not self._parar.wait(self.intervalo_s):
+            nomes = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, quadro in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                if not self.ociosas and (os.path.basename(quadro.f_code.co_filename),
+                                         quadro.f_code.co_name) in QUADROS_OCIOSOS:
+                    continue
+                quadros = []
+                while quadro is not None:
+                    quadros.append(_nome_quadro(quadro))
+                    quadro = quadro.f_back
+                quadros.append(f"thread {nomes.get(ident, ident)}")
+                self.pilhas[';'.join(reversed(quadros))] += 1
+            self.amostras += 1
+
+    def relatorio(self) -> str:
+        """Pilhas no formato collapsed, das mais amostradas para as menos."""
+        return ''.join(f"{pilha} {contagem}\n" for pilha, contagem in self.pilhas.most_common())
+
+
+_amostragem_lock = threading.Lock()
+
+
+async def amostrar(segundos: float, intervalo_s: float, ociosas: bool = False) -> Optional[AmostradorPilhas]:
+    """
+    Amostra as pilhas por `segundos` sem bloquear o loop de eventos (que
+    continua atendendo, e sendo amostrado). Retorna None se outra amostragem
+    já estiver em andamento.
+    """
+    if not _amostragem_lock.acquire(blocking=False):
+        return None
+    try:
+        amostrador = AmostradorPilhas(intervalo_s, ociosas)
+        amostrador.iniciar()
+        try:
+            await asyncio.sleep(segundos)
+        finally:
+            amostrador.parar()
+        return amostrador
+    finally:
+        _amostragem_lock.release()
+
+
+@contextmanager
+def perfilando():
+    """Liga o perfil da requisição atual (se houver) na thread atual durante o bloco."""
+    perfil = _perfil_requisicao.get()
+    if perfil is None:
+        yield
+        return
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+
+
+def perfilar(funcao: Callable) -> Callable:
+    """Envolve uma função síncrona para que ela entre no perfil da requisição com `?profile=1`."""
+    @functools.wraps(funcao)
+    def executar(*args, **kwargs):
+        if _perfil_requisicao.get() is None:
+            return funcao(*args, **kwargs)
+        with perfilando():
+            return funcao(*args, **kwargs)
+    return executar
+
+
+# Marca de fim de um iterador em `perfilar_iterador`
+_FIM = object()
+
+
+def perfilar_iterador(iterador: Iterable) -> Iterator:
+    """Gerador que produz cada item de `iterador` dentro do perfil da requisição (corpos em streaming)."""
+    iterador = iter(iterador)
+    while True:
+        with perfilando():
+            item = next(iterador, _FIM)
+        if item is _FIM:
+            return
+        yield item
+
+
+def perfilar_rotas(app):
+    """
+    Envolve com `perfilar` as funções de rota síncronas da aplicação (as
+    assíncronas rodam no loop de eventos, compartilhado com as demais
+    requisições, e ficam de fora). Chamar depois de declarar as rotas.
+    """
+    for rota in app.router.routes:
+        dependant = getattr(rota, 'dependant', None)
+        if dependant is None or asyncio.iscoroutinefunction(dependant.call):
+            continue
+        dependant.call = perfilar(dependant.call)
+
+
+def estatisticas(perfil: cProfile.Profile, ordem: str = 'cumulative', linhas: int = LINHAS_ESTATISTICAS) -> str:
+    saida = io.StringIO()
+    pstats.Stats(perfil, stream=saida).sort_stats(ordem).print_stats(linhas)
+    return saida.getvalue()
+
+
+class PerfilRequisicaoMiddleware:
+    """
+    Middleware ASGI que responde às requisições com `?profile=1` (e o token
+    em `X-Debug-Token`) com as estatísticas do cProfile da execução delas, em
+    texto. O status e a duração da resposta original seguem nos cabeçalhos
+    `X-Profile-Status` e `X-Profile-Duracao-Ms`; `?profile_ordem=` escolhe a
+    ordenação do pstats (padrão `cumulative`). Uma requisição perfilada por vez.
+    """
+
+    def __init__(self, app, token: str):
+        self.app = app
+        self.token = token
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or b'profile=' not in scope['query_string']:
+            await self.app(scope, receive, send)
+            return
+        parametros = parse_qs(scope['query_string'].decode('latin-1'))
+        if parametros.get('profile', ['0'])[0] not in ('1', 'true'):
+            await self.app(scope, receive, send)
+            return
+
+        cabecalhos = {nome.decode('latin-1'): valor.decode('latin-1') for nome, valor in scope['headers']}
+        if not token_valido(self.token, cabecalhos.get('x-debug-token')):
+            await self._responder(send, 403, b'{"detail":"Token de perfil ausente ou invalido"}', 'application/json')
+            return
+        if not self._lock.acquire(blocking=False):
+            await self._responder(send, 409, b'{"detail":"Outra requisicao ja esta sendo perfilada"}',
+                                  'application/json')
+            return
+
+        try:
+            ordem = parametros.get('profile_ordem', ['cumulative'])[0]
+            perfil = cProfile.Profile()
+            original = {'status': None}
+
+            async def descartar(mensagem):
+                # A resposta original é consumida (para perfilar o corpo inteiro) e descartada
+                if mensagem['type'] == 'http.response.start':
+                    original['status'] = mensagem['status']
+
+            token = _perfil_requisicao.set(perfil)
+            inicio = time.perf_counter()
+            try:
+                await self.app(scope, receive, descartar)
+            finally:
+                _perfil_requisicao.reset(token)
+            duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+            try:
+                corpo = estatisticas(perfil, ordem)
+            except KeyError:
+                corpo = estatisticas(perfil)
+        finally:
+            self._lock.release()
+        await self._responder(send, 200, corpo.encode('utf-8'), 'text/plain; charset=utf-8', {
+            'x-profile-status': str(original['status']),
+            'x-profile-duracao-ms': str(duracao_ms)
+        })
+
+    @staticmethod
+    async def _responder(send, status: int, corpo: bytes, tipo: str, extras: Optional[Dict[str, str]] = None):
+        cabecalhos = [(b'content-type', tipo.encode('latin-1')), (b'content-length', str(len(corpo)).encode('latin-1')),
+                      (b'cache-control', b'no-store')]
+        cabecalhos.extend((nome.encode('latin-1'), valor.encode('latin-1')) for nome, valor in (extras or {}).items())
+        await send({'type': 'http.response.start', 'status': status, 'headers': cabecalhos})
+        await send({'type': 'http.response.body', 'body': corpo})
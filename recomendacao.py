@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de recomendações: produtos comprados pelos amigos que o cliente ainda
+não comprou, ordenados pela quantidade de compras feitas pelos amigos.
+
+Produtos são identificados por `produto_id` (produtos.id) e amigos por id:
+cada recomendação é `{'produto_id', 'amigos_que_compraram': [ids]}`, e os
+dados do produto e os nomes dos amigos são preenchidos na leitura a partir
+dos catálogos compartilhados do Redis.
+
+A versão vetorizada monta, uma vez por sincronização, a matriz esparsa
+pessoa × produto das compras e, para cada lote de clientes, as arestas
+cliente × amigo. O produto das duas (contagem de compras dos amigos por
+produto) é calculado de uma vez com numpy, os produtos que o cliente já tem
+são mascarados e os 10 melhores de cada cliente são escolhidos por
+ordenação agrupada. O resultado fica em vetores e a lista de cada cliente
+só é montada quando lida. Sem numpy instalado, é usada a implementação em
+Python puro (`gerar_recomendacoes`), que define o resultado esperado.
+"""
+
+import os
+from itertools import chain
+from operator import itemgetter
+from typing import List, Dict, Any, Iterable, Iterator, Mapping
+
+try:
+    import numpy as np
+except ImportError:  # numpy é opcional
+    np = None
+
+# Quantidade de recomendações por cliente
+TOP_RECOMENDACOES = 10
+# Clientes processados por vez na versão vetorizada (limita o tamanho dos
+# vetores intermediários, proporcional às compras dos amigos do lote)
+RECOMENDACAO_LOTE_CLIENTES = int(os.getenv('RECOMENDACAO_LOTE_CLIENTES', '20000'))
+
+
+def gerar_recomendacoes(cliente_id: int,
+                        amigos_por_cliente: Dict[int, List[Dict[str, Any]]],
+                        compras_por_cliente: Dict[int, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Gera recomendações baseadas nas compras dos amigos."""
+    recomendacoes = []
+    amigos = amigos_por_cliente.get(cliente_id, [])
+
+    # Produtos que o cliente já comprou
+    produtos_cliente = set()
+    for compra in compras_por_cliente.get(cliente_id, []):
+        produtos_cliente.add(compra['produto_id'])
+
+    # Contar produtos comprados pelos amigos
+    produtos_amigos = {}
+    for amigo in amigos:
+        amigo_id = amigo['id']
+        for compra in compras_por_cliente.get(amigo_id, []):
+            produto = compra['produto_id']
+            if produto not in produtos_cliente:  # Apenas produtos que o cliente não tem
+                if produto not in produtos_amigos:
+                    produtos_amigos[produto] = {
+                        'produto_id': produto,
+                        'amigos_que_compraram': []
+                    }
+                produtos_amigos[produto]['amigos_que_compraram'].append(amigo_id)
+
+    # Converter para lista e ordenar por número de amigos que compraram
+    recomendacoes = list(produtos_amigos.values())
+    recomendacoes.sort(key=lambda x: len(x['amigos_que_compraram']), reverse=True)
+
+    return recomendacoes[:TOP_RECOMENDACOES]  # Top 10 recomendações
+
+
+class MatrizCompras:
+    """
+    Matriz esparsa (CSR) pessoa × produto das compras. Para cada par guarda
+    a quantidade de compras e a posição da primeira compra na lista da pessoa.
+    """
+
+    def __init__(self, compras_por_cliente: Dict[int, List[Dict[str, Any]]]):
+        listas = compras_por_cliente.values()
+        tamanhos = np.fromiter((len(compras) for compras in listas), dtype=np.int64, count=len(compras_por_cliente))
+        total = int(tamanhos.sum())
+        produtos = np.fromiter(map(itemgetter('produto_id'), chain.from_iterable(listas)),
+                               dtype=np.int64, count=total)
+        pessoas = np.fromiter(compras_por_cliente, dtype=np.int64, count=len(compras_por_cliente))
+
+        # Linha de cada pessoa: tabela indexada pelo id quando os ids são
+        # inteiros pequenos (ids sequenciais dos bancos), senão busca binária
+        # nos ids ordenados
+        self.tabela_linhas = None
+        if len(pessoas) and pessoas.min() >= 0 and pessoas.max() < 4 * len(pessoas) + 1024:
+            self.tabela_linhas = np.full(int(pessoas.max()) + 1, -1, dtype=np.int64)
+            self.tabela_linhas[pessoas] = np.arange(len(pessoas))
+        self.ordem_pessoas = np.argsort(pessoas, kind='stable')
+        self.pessoas_ordenadas = pessoas[self.ordem_pessoas]
+
+        # Uma entrada por (pessoa, produto): quantidade e posição da primeira compra
+        self.produtos, colunas = np.unique(produtos, return_inverse=True)
+        linhas = np.repeat(np.arange(len(pessoas)), tamanhos)
+        posicoes = np.arange(total) - np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+        pares = linhas * max(len(self.produtos), 1) + colunas
+        ordem = np.argsort(pares, kind='stable')
+        pares = pares[ordem]
+        inicios = np.flatnonzero(np.r_[True, pares[1:] != pares[:-1]]) if total else np.zeros(0, dtype=np.int64)
+
+        self.colunas = colunas[ordem][inicios]
+        self.quantidades = np.diff(np.r_[inicios, total])
+        self.posicoes = posicoes[ordem][inicios]
+        self.ponteiros = np.r_[0, np.cumsum(np.bincount(linhas[ordem][inicios], minlength=len(pessoas)))]
+        # Maior posição possível + 1: chave de desempate = ordem do amigo * base + posição
+        self.base_posicao = int(self.posicoes.max()) + 1 if total else 1
+
+    def linhas(self, ids: 'np.ndarray') -> 'np.ndarray':
+        """Linha de cada id informado (-1 para quem não tem compras)."""
+        if self.tabela_linhas is not None:
+            linhas = np.full(len(ids), -1, dtype=np.int64)
+            dentro = (ids >= 0) & (ids < len(self.tabela_linhas))
+            linhas[dentro] = self.tabela_linhas[ids[dentro]]
+            return linhas
+        posicao = np.minimum(np.searchsorted(self.pessoas_ordenadas, ids), max(len(self.pessoas_ordenadas) - 1, 0))
+        if len(self.pessoas_ordenadas) == 0:
+            return np.full(len(ids), -1, dtype=np.int64)
+        return np.where(self.pessoas_ordenadas[posicao] == ids, self.ordem_pessoas[posicao], -1)
+
+    def expandir(self, linhas: 'np.ndarray') -> 'tuple':
+        """Para cada linha informada, os índices (na CSR) das suas entradas e a linha de origem."""
+        inicios = self.ponteiros[linhas]
+        tamanhos = self.ponteiros[linhas + 1] - inicios
+        return _faixas(inicios, tamanhos), np.repeat(np.arange(len(linhas)), tamanhos)
+
+
+def _faixas(inicios: 'np.ndarray', tamanhos: 'np.ndarray') -> 'np.ndarray':
+    """Concatenação das faixas [inicio, inicio + tamanho) informadas."""
+    deslocamento = np.arange(int(tamanhos.sum())) - np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+    return np.repeat(inicios, tamanhos) + deslocamento
+
+
+def _ordenar(*chaves: 'np.ndarray') -> 'np.ndarray':
+    """
+    Índices que ordenam pelas chaves (inteiros não negativos, da principal
+    para a secundária), como np.lexsort. Quando cabem em int64, as chaves são
+    combinadas em uma só, bem mais rápida de ordenar. Espera combinações
+    únicas (a ordenação combinada não é estável).
+    """
+    combinada = np.zeros(len(chaves[0]), dtype=np.int64)
+    limite = 1
+    for chave in chaves:
+        base = int(chave.max()) + 1 if len(chave) else 1
+        limite *= base
+        if limite >= 2 ** 62:
+            return np.lexsort(chaves[::-1])
+        combinada = combinada * base + chave
+    return np.argsort(combinada)
+
+
+def _calcular_lote(clientes: List[int], matriz: MatrizCompras,
+                   amigos_por_cliente: Dict[int, List[Dict[str, Any]]]) -> tuple:
+    """
+    Recomendações de um lote de clientes a partir da matriz de compras, em
+    vetores: a quantidade de itens de cada cliente (na ordem de `clientes`),
+    o produto e a quantidade de ids de amigos de cada item (na ordem dos
+    clientes e das recomendações) e os ids dos amigos de todos os itens.
+    """
+    vazio = np.zeros(0, dtype=np.int64)
+    sem_itens = (np.zeros(len(clientes), dtype=np.int64), vazio, vazio, vazio)
+    total_produtos = len(matriz.produtos)
+
+    # Arestas cliente × amigo, na ordem da lista de amigos (só amigos com compras contribuem)
+    listas = [amigos_por_cliente.get(cliente_id, ()) for cliente_id in clientes]
+    tamanhos = np.fromiter(map(len, listas), dtype=np.int64, count=len(listas))
+    total_arestas = int(tamanhos.sum())
+    if total_arestas == 0 or total_produtos == 0:
+        return sem_itens
+    amigos_ids = np.fromiter(map(itemgetter('id'), chain.from_iterable(listas)),
+                             dtype=np.int64, count=total_arestas)
+    arestas_cliente = np.repeat(np.arange(len(clientes)), tamanhos)
+    arestas_ordem = np.arange(total_arestas) - np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+    arestas_linha = matriz.linhas(amigos_ids)
+    com_compras = arestas_linha >= 0
+    arestas_cliente, arestas_ordem = arestas_cliente[com_compras], arestas_ordem[com_compras]
+    arestas_linha, amigos_ids = arestas_linha[com_compras], amigos_ids[com_compras]
+
+    # Multiplicação esparsa (amizades × compras) expandida em pares
+    # (aresta, produto), cada um com a quantidade de compras do amigo
+    entradas, aresta = matriz.expandir(arestas_linha)
+    par = arestas_cliente[aresta] * total_produtos + matriz.colunas[entradas]
+    if len(par) == 0:
+        return sem_itens
+
+    # Chave de desempate: ordem em que o produto aparece percorrendo os amigos
+    # (na ordem da lista) e as compras de cada amigo (na ordem da compra)
+    chave = arestas_ordem[aresta] * matriz.base_posicao + matriz.posicoes[entradas]
+    ordem = _ordenar(par, chave)
+    entradas, aresta, par, chave = entradas[ordem], aresta[ordem], par[ordem], chave[ordem]
+
+    # Soma por (cliente, produto): contagem de compras dos amigos e primeira ocorrência
+    inicios = np.flatnonzero(np.r_[True, par[1:] != par[:-1]])
+    tamanhos_grupos = np.diff(np.r_[inicios, len(par)])
+    quantidades = matriz.quantidades[entradas]
+    contagens = np.add.reduceat(quantidades, inicios)
+    pares_grupos = par[inicios]
+
+    # Fora os produtos que o próprio cliente já comprou (busca dos pares do
+    # cliente entre os pares dos grupos, já ordenados)
+    linhas_clientes = matriz.linhas(np.array(clientes, dtype=np.int64))
+    tem_compras = np.flatnonzero(linhas_clientes >= 0)
+    proprias, origem = matriz.expandir(linhas_clientes[tem_compras])
+    pares_proprios = tem_compras[origem] * total_produtos + matriz.colunas[proprias]
+    posicao = np.searchsorted(pares_grupos, pares_proprios)
+    encontrados = posicao < len(pares_grupos)
+    posicao, pares_proprios = posicao[encontrados], pares_proprios[encontrados]
+    manter = np.ones(len(inicios), dtype=bool)
+    manter[posicao[pares_grupos[posicao] == pares_proprios]] = False
+    inicios, tamanhos_grupos, contagens = inicios[manter], tamanhos_grupos[manter], contagens[manter]
+    if len(inicios) == 0:
+        return sem_itens
+    cliente_do_grupo = pares_grupos[manter] // total_produtos
+
+    # Top N por cliente: maior contagem; empate pela primeira ocorrência
+    ordem_grupos = _ordenar(cliente_do_grupo, contagens.max() - contagens, chave[inicios])
+    clientes_ordenados = cliente_do_grupo[ordem_grupos]
+    inicio_cliente = np.flatnonzero(np.r_[True, clientes_ordenados[1:] != clientes_ordenados[:-1]])
+    posicao_no_cliente = np.arange(len(ordem_grupos)) - np.repeat(
+        inicio_cliente, np.diff(np.r_[inicio_cliente, len(ordem_grupos)])
+    )
+    selecionados = ordem_grupos[posicao_no_cliente < TOP_RECOMENDACOES]
+
+    # Ids dos amigos de cada item escolhido, na ordem dos amigos e repetidos
+    # uma vez por compra (como na implementação em Python puro)
+    linhas_escolhidas = _faixas(inicios[selecionados], tamanhos_grupos[selecionados])
+    return (
+        np.bincount(cliente_do_grupo[selecionados], minlength=len(clientes)),
+        matriz.produtos[matriz.colunas[entradas[inicios[selecionados]]]],
+        contagens[selecionados],
+        np.repeat(amigos_ids[aresta[linhas_escolhidas]], quantidades[linhas_escolhidas])
+    )
+
+
+class RecomendacoesCalculadas(Mapping):
+    """
+    Resultado de `calcular_recomendacoes` (cliente_id -> recomendações). Os
+    itens de todos os clientes ficam em listas planas de inteiros e a lista
+    de cada cliente é montada quando lida: os milhões de dicionários das
+    recomendações não ficam todos em memória ao mesmo tempo (nem são
+    percorridos a cada coleta do gc), pois a sincronização lê um cliente por
+    vez e descarta os documentos a cada lote.
+    """
+
+    def __init__(self, clientes: List[int], itens_por_cliente: 'np.ndarray', produtos: 'np.ndarray',
+                 amigos_por_item: 'np.ndarray', amigos: 'np.ndarray'):
+        self._indices = {cliente_id: indice for indice, cliente_id in enumerate(clientes)}
+        self._limites_itens = np.r_[0, np.cumsum(itens_por_cliente)].tolist()
+        self._limites_amigos = np.r_[0, np.cumsum(amigos_por_item)].tolist()
+        self._produtos = produtos.tolist()
+        self._amigos = amigos.tolist()
+
+    def __getitem__(self, cliente_id: int) -> List[Dict[str, Any]]:
+        indice = self._indices[cliente_id]
+        produtos, amigos, limites = self._produtos, self._amigos, self._limites_amigos
+        return [
+            {'produto_id': produtos[item], 'amigos_que_compraram': amigos[limites[item]:limites[item + 1]]}
+            for item in range(self._limites_itens[indice], self._limites_itens[indice + 1])
+        ]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._indices)
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+
+def calcular_recomendacoes(clientes: Iterable[int],
+                           amigos_por_cliente: Dict[int, List[Dict[str, Any]]],
+                           compras_por_cliente: Dict[int, List[Dict[str, Any]]]) -> Mapping[int, List[Dict[str, Any]]]:
+    """
+    Calcula as recomendações de todos os `clientes` de uma vez. O resultado
+    de cada cliente é igual ao de `gerar_recomendacoes`.
+    """
+    clientes = list(clientes)
+    if np is None:
+        return {cliente_id: gerar_recomendacoes(cliente_id, amigos_por_cliente, compras_por_cliente)
+                for cliente_id in clientes}
+
+    matriz = MatrizCompras(compras_por_cliente)
+    lotes = [
+        _calcular_lote(clientes[inicio:inicio + RECOMENDACAO_LOTE_CLIENTES], matriz, amigos_por_cliente)
+        for inicio in range(0, len(clientes), RECOMENDACAO_LOTE_CLIENTES)
+    ]
+    if not lotes:
+        lotes = [_calcular_lote([], matriz, amigos_por_cliente)]
+    return RecomendacoesCalculadas(clientes, *(np.concatenate(partes) for partes in zip(*lotes)))
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Relatório de memória do Redis: compara o layout normalizado (documentos com
+ids + catálogos `g{n}:produtos` e `g{n}:pessoas`) com o layout anterior, em
+que cada documento repetia os dados dos produtos e dos amigos.
+
+O layout anterior é reconstruído a partir da geração publicada: cada
+documento é hidratado, gravado em uma chave temporária para medir o
+MEMORY USAGE e apagado em seguida. Os documentos atuais são medidos como
+estão gravados (codec de REDIS_CODEC, layout de REDIS_LAYOUT); os do layout
+anterior, em JSON.
+
+Uso: python relatorio_memoria_redis.py [quantidade_de_clientes]
+     (sem argumento, mede todos os clientes da geração publicada)
+"""
+
+import os
+import sys
+# Garantir que o encoding padrão é UTF-8
+if sys.platform == 'win32':
+    os.environ['PYTHONIOENCODING'] = 'utf-8'
+    # Configurar stdout/stderr para UTF-8
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    if hasattr(sys.stderr, 'reconfigure'):
+        sys.stderr.reconfigure(encoding='utf-8')
+
+import json
+from typing import List, Dict, Any
+
+import redis
+
+from app import (
+    REDIS_CONFIG, REDIS_LOTE_LEITURA, REDIS_LAYOUT, obter_geracao_atual, chave_indice, chave_cliente,
+    chave_produtos, chave_pessoas, hidratar_documentos, ler_documentos
+)
+
+# Prefixo das chaves temporárias usadas para medir o layout anterior
+PREFIXO_TEMPORARIO = 'relatorio_memoria:tmp'
+
+
+def formato_anterior(cliente_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Documento hidratado no formato gravado antes da normalização (recomendações sem produto_id)."""
+    return {
+        **cliente_data,
+        'recomendacoes': [
+            {campo: valor for campo, valor in recomendacao.items() if campo != 'produto_id'}
+            for recomendacao in cliente_data['recomendacoes']
+        ]
+    }
+
+
+def medir_lote(r, geracao: int, ids: List[str]) -> Dict[str, int]:
+    """Memória e bytes gravados de um lote de clientes nos dois layouts."""
+    ids = [int(cliente_id) for cliente_id in ids]
+    documentos = [cliente_data for cliente_data in ler_documentos(r, geracao, ids) if cliente_data is not None]
+    chaves = [chave_cliente(geracao, cliente_data['dados_pessoais']['id']) for cliente_data in documentos]
+
+    # Bytes gravados: o valor (layout `documento`) ou a soma dos campos (layout `hash`)
+    with r.pipeline(transaction=False) as pipe:
+        for chave in chaves:
+            pipe.memory_usage(chave, samples=0)
+            if REDIS_LAYOUT == 'hash':
+                pipe.hvals(chave)
+            else:
+                pipe.strlen(chave)
+        respostas = pipe.execute()
+    memoria_atual = sum(respostas[0::2])
+    bytes_atual = sum(sum(map(len, valor)) if REDIS_LAYOUT == 'hash' else valor for valor in respostas[1::2])
+
+    anteriores = [
+        json.dumps(formato_anterior(cliente_data), ensure_ascii=False).encode('utf-8')
+        for cliente_data in hidratar_documentos(r, geracao, documentos)
+    ]
+    temporarias = [f"{PREFIXO_TEMPORARIO}:{indice}" for indice in range(len(anteriores))]
+    with r.pipeline(transaction=False) as pipe:
+        for chave, valor in zip(temporarias, anteriores):
+            pipe.set(chave, valor)
+        for chave in temporarias:
+            pipe.memory_usage(chave, samples=0)
+        if temporarias:
+            pipe.unlink(*temporarias)
+        respostas = pipe.execute()
+    memoria_anterior = sum(respostas[len(temporarias):2 * len(temporarias)])
+
+    return {
+        'clientes': len(documentos),
+        'memoria_atual': memoria_atual,
+        'bytes_atual': bytes_atual,
+        'memoria_anterior': memoria_anterior,
+        'bytes_anterior': sum(len(valor) for valor in anteriores)
+    }
+
+
+def medir_catalogos(r, geracao: int) -> Dict[str, int]:
+    """Memória e bytes gravados dos dois catálogos compartilhados da geração."""
+    memoria, gravados = 0, 0
+    for chave in (chave_produtos(geracao), chave_pessoas(geracao)):
+        memoria += r.memory_usage(chave, samples=0) or 0
+        for _, valor in r.hscan_iter(chave, count=1000):
+            gravados += len(valor)
+    return {'memoria': memoria, 'bytes': gravados}
+
+
+def formatar(valor: float) -> str:
+    for unidade in ('B', 'KB', 'MB', 'GB'):
+        if valor < 1024 or unidade == 'GB':
+            return f"{valor:.1f} {unidade}"
+        valor /= 1024
+
+
+def main():
+    limite = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    r = redis.Redis(**REDIS_CONFIG)
+    geracao = obter_geracao_atual(r)
+    if geracao is None:
+        print("Nenhuma geração publicada. Execute uma sincronização antes (POST /api/sync_data).")
+        return
+
+    ids = r.zrange(chave_indice(geracao, 'id'), 0, -1 if limite is None else limite - 1)
+    print(f"Medindo {len(ids)} clientes da geração g{geracao}...")
+
+    total = {'clientes': 0, 'memoria_atual': 0, 'bytes_atual': 0, 'memoria_anterior': 0, 'bytes_anterior': 0}
+    for inicio in range(0, len(ids), REDIS_LOTE_LEITURA):
+        for campo, valor in medir_lote(r, geracao, ids[inicio:inicio + REDIS_LOTE_LEITURA]).items():
+            total[campo] += valor
+    catalogos = medir_catalogos(r, geracao)
+    r.close()
+
+    if limite is not None:
+        print("  (os catálogos são medidos inteiros, mesmo com amostra de clientes)")
+
+    memoria_normalizada = total['memoria_atual'] + catalogos['memoria']
+    bytes_normalizados = total['bytes_atual'] + catalogos['bytes']
+    linhas = [
+        ('Memória (MEMORY USAGE)', total['memoria_anterior'], memoria_normalizada),
+        ('Bytes gravados por sincronização', total['bytes_anterior'], bytes_normalizados),
+    ]
+    print(f"\n  {'':34} {'Anterior':>12} {'Normalizado':>12} {'Redução':>9}")
+    for titulo, anterior, normalizado in linhas:
+        reducao = (1 - normalizado / anterior) * 100 if anterior else 0
+        print(f"  {titulo:34} {formatar(anterior):>12} {formatar(normalizado):>12} {reducao:8.1f}%")
+    print(f"\n  Documentos: {formatar(total['memoria_atual'])} | Catálogos (produtos + pessoas): "
+          f"{formatar(catalogos['memoria'])}")
+
+
+if __name__ == "__main__":
+    main()
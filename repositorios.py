@@ -0,0 +1,945 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Repositórios das fontes de dados e do armazenamento consolidado usados pela
+sincronização e pelas rotas da API.
+
+Cada fonte tem uma interface (`RepositorioClientes` para clientes, compras e
+produtos; `RepositorioInteresses`; `RepositorioAmizades`) e o destino dos
+documentos consolidados tem outra (`ArmazemConsolidado`, que entrega
+clientes compatíveis com o redis-py). Há duas implementações:
+
+- bancos reais: PostgreSQL, MongoDB, Neo4j e Redis (padrão da API);
+- em processo (`ArmazenamentoMemoria`): SQLite em memória, dicionários e
+  fakeredis, para rodar a sincronização e os benchmarks em escala sem os
+  containers (CI, notebooks), de forma determinística.
+
+As marcas d'água seguem o formato de cada banco real em todas as
+implementações: data ISO (clientes), maior `data_atualizacao` (interesses)
+e milissegundos desde a época (amizades).
+"""
+
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import psycopg2.extensions
+import redis
+from pymongo import monitoring
+
+from metricas import contar_round_trip
+
+try:
+    import fakeredis
+except ImportError:  # fakeredis é opcional (só o armazenamento em memória usa)
+    fakeredis = None
+
+# Registros trazidos por lote do servidor Neo4j ao consumir um resultado
+NEO4J_FETCH_SIZE = int(os.getenv('NEO4J_FETCH_SIZE', '2000'))
+# Quantidade de ids por consulta UNWIND quando os amigos são buscados por lista de ids
+NEO4J_LOTE_IDS = int(os.getenv('NEO4J_LOTE_IDS', '5000'))
+# Documentos trazidos por lote do servidor MongoDB ao ler os interesses
+MONGODB_BATCH_SIZE = int(os.getenv('MONGODB_BATCH_SIZE', '1000'))
+
+# Registro das remoções de clientes e compras (o id do cliente vem da coluna
+# passada ao trigger), lido pela sincronização incremental
+SQL_REMOCOES = (
+    """
+    CREATE TABLE IF NOT EXISTS sync_remocoes (
+        id_cliente INTEGER NOT NULL,
+        removido_em TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_sync_remocoes_removido_em ON sync_remocoes (removido_em)",
+    """
+    CREATE OR REPLACE FUNCTION registrar_remocao() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO sync_remocoes (id_cliente) VALUES ((to_jsonb(OLD) ->> TG_ARGV[0])::integer);
+        RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trg_clientes_remocao
+    AFTER DELETE ON clientes
+    FOR EACH ROW EXECUTE FUNCTION registrar_remocao('id')
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trg_compras_remocao
+    AFTER DELETE ON compras
+    FOR EACH ROW EXECUTE FUNCTION registrar_remocao('id_cliente')
+    """,
+)
+
+
+# Interfaces
+class RepositorioClientes(ABC):
+    """Clientes, compras e produtos (PostgreSQL)."""
+
+    @abstractmethod
+    def preparar(self):
+        """Garante o esquema usado pela sincronização (marcas d'água, índices)."""
+
+    @abstractmethod
+    def marca_dagua(self) -> str:
+        """"Agora" da fonte (data ISO), lido antes da extração."""
+
+    @abstractmethod
+    def clientes(self, ids: Optional[List[int]] = None) -> List[tuple]:
+        """(id, cpf, nome, endereco, cidade, uf, email) de todos os clientes ou dos `ids`, em ordem de id."""
+
+    @abstractmethod
+    def contar_clientes(self) -> int:
+        """Quantidade de clientes."""
+
+    @abstractmethod
+    def blocos_clientes(self, tamanho: int) -> Iterator[List[tuple]]:
+        """Todos os clientes, em ordem de id, em blocos de até `tamanho` (sem carregar todos de uma vez)."""
+
+    @abstractmethod
+    def inicios_faixas(self, quantidade: int) -> List[int]:
+        """
+        Primeiro id de cada uma de até `quantidade` faixas contíguas de ids,
+        com a mesma quantidade de clientes (a menos de um), em ordem.
+        """
+
+    @abstractmethod
+    def clientes_da_faixa(self, inicio: int, fim: Optional[int] = None) -> List[tuple]:
+        """Clientes com `inicio` <= id < `fim` (sem limite se `fim` for None), em ordem de id."""
+
+    @abstractmethod
+    def compras(self, ids: Optional[List[int]] = None) -> Dict[int, List[Dict[str, Any]]]:
+        """Compras (id, data, produto_id) de todos os clientes ou dos `ids`, por cliente, em ordem de data."""
+
+    @abstractmethod
+    def produtos(self, ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, Any]]:
+        """Catálogo de produtos (todos ou os `ids`), por id."""
+
+    @abstractmethod
+    def alterados_desde(self, desde: datetime) -> Tuple[Set[int], Set[int]]:
+        """
+        Clientes alterados desde `desde` e clientes cujas compras (ou produtos
+        comprados) mudaram, ou que foram removidos ou perderam compras.
+        """
+
+    @abstractmethod
+    def descartar_remocoes(self, ate: datetime):
+        """Descarta o registro das remoções até `ate` (já refletidas por uma sincronização completa)."""
+
+
+class RepositorioInteresses(ABC):
+    """Interesses dos clientes (MongoDB)."""
+
+    @abstractmethod
+    def preparar(self):
+        """Garante os índices usados pela sincronização."""
+
+    @abstractmethod
+    def marca_dagua(self) -> str:
+        """Maior `data_atualizacao` existente ('' se não houver)."""
+
+    @abstractmethod
+    def interesses(self, ids: Optional[List[int]] = None) -> Dict[int, List[str]]:
+        """Interesses de todos os clientes ou dos `ids`, por cliente."""
+
+    @abstractmethod
+    def alterados_desde(self, marca: str) -> Set[int]:
+        """Clientes com `data_atualizacao` maior que `marca`."""
+
+
+class RepositorioAmizades(ABC):
+    """Pessoas e amizades (Neo4j)."""
+
+    @abstractmethod
+    def preparar(self):
+        """Garante os índices usados pela sincronização."""
+
+    @abstractmethod
+    def marca_dagua(self) -> str:
+        """"Agora" da fonte (milissegundos desde a época)."""
+
+    @abstractmethod
+    def amigos(self, ids: Optional[List[int]] = None) -> Dict[int, List[Dict[str, Any]]]:
+        """Amigos (id, nome, cpf) de todos os clientes ou dos `ids`, por cliente, em ordem de nome."""
+
+    @abstractmethod
+    def alterados_desde(self, desde: int) -> Tuple[Set[int], Set[int]]:
+        """Clientes com amizades criadas/alteradas desde `desde` (ms) e pessoas alteradas desde então."""
+
+    @abstractmethod
+    def contar_arestas_ate(self, marca: int) -> int:
+        """
+        Arestas AMIGO_DE com `atualizado_em` até `marca` (ms). As arestas não
+        mudam depois de criadas, então a contagem para uma mesma marca só
+        diminui quando alguma amizade (ou pessoa) é removida.
+        """
+
+
+class ArmazemConsolidado(ABC):
+    """Destino dos documentos consolidados: entrega clientes compatíveis com o redis-py."""
+
+    @abstractmethod
+    def cliente(self):
+        """Cliente Redis; close() nele apenas devolve a conexão."""
+
+    def estado(self) -> Dict[str, Any]:
+        """Ocupação das conexões, para a rota de prontidão."""
+        return {}
+
+    def fechar(self):
+        """Fecha as conexões abertas."""
+
+
+class FontesDados(NamedTuple):
+    """Os três repositórios de origem usados por uma sincronização."""
+    clientes: RepositorioClientes
+    interesses: RepositorioInteresses
+    amizades: RepositorioAmizades
+
+
+# Contagem das idas e voltas a cada banco (métrica round_trips_total)
+class CursorPostgresContado(psycopg2.extensions.cursor):
+    """
+    Cursor do PostgreSQL que conta cada comando enviado e, nos cursores
+    nomeados (do lado do servidor), cada lote buscado com FETCH.
+    """
+
+    def execute(self, query, vars=None):
+        contar_round_trip('postgres')
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        contar_round_trip('postgres', len(vars_list))
+        return super().executemany(query, vars_list)
+
+    def fetchone(self):
+        if self.name is not None:
+            contar_round_trip('postgres')
+        return super().fetchone()
+
+    def fetchmany(self, size=None):
+        if self.name is not None:
+            contar_round_trip('postgres')
+        return super().fetchmany(self.arraysize if size is None else size)
+
+    def fetchall(self):
+        if self.name is not None:
+            contar_round_trip('postgres')
+        return super().fetchall()
+
+
+class OuvinteComandosMongoDB(monitoring.CommandListener):
+    """Conta cada comando enviado ao MongoDB (inclusive os getMore de cada lote de um find)."""
+
+    def started(self, event):
+        contar_round_trip('mongodb')
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class ConexaoRedisContada(redis.Connection):
+    """Conexão Redis que conta cada envio: um comando avulso ou um pipeline inteiro."""
+
+    def send_packed_command(self, command, check_health=True):
+        contar_round_trip('redis')
+        return super().send_packed_command(command, check_health)
+
+
+# Implementação sobre os bancos reais
+class RepositorioClientesPostgres(RepositorioClientes):
+    """
+    Clientes, compras e produtos em uma conexão do PostgreSQL. Todas as
+    leituras usam a mesma conexão, e portanto a mesma transação das marcas
+    d'água, até ela ser encerrada por quem emprestou a conexão.
+    """
+
+    def __init__(self, pg_conn):
+        self.pg_conn = pg_conn
+
+    def _consultar(self, sql: str, parametros: Optional[tuple] = None) -> List[tuple]:
+        cursor = self.pg_conn.cursor()
+        try:
+            cursor.execute(sql, parametros)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def preparar(self):
+        """
+        Garante a coluna `atualizado_em` (e o trigger que a mantém) nas tabelas
+        do PostgreSQL, usada como marca d'água da sincronização incremental, e
+        a tabela `sync_remocoes`, em que triggers registram os clientes de
+        clientes e compras removidos. Bancos criados por versões antigas do
+        seed_databases.py são migrados aqui.
+        """
+        cursor = self.pg_conn.cursor()
+        cursor.execute("""
+            SELECT count(*) FROM information_schema.columns
+            WHERE table_name IN ('clientes', 'produtos', 'compras')
+              AND column_name = 'atualizado_em'
+        """)
+        colunas = cursor.fetchone()[0]
+        cursor.execute("SELECT to_regclass('sync_remocoes') IS NOT NULL")
+        if colunas == 3 and cursor.fetchone()[0]:
+            cursor.close()
+            return
+
+        print("Migrando esquema do PostgreSQL para sincronização incremental...")
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION marcar_atualizado_em() RETURNS trigger AS $$
+            BEGIN
+                NEW.atualizado_em = now();
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        for tabela in ('clientes', 'produtos', 'compras'):
+            cursor.execute(f"""
+                ALTER TABLE {tabela}
+                ADD COLUMN IF NOT EXISTS atualizado_em TIMESTAMPTZ NOT NULL DEFAULT now()
+            """)
+            cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_{tabela}_atualizado_em ON {tabela} (atualizado_em)
+            """)
+            cursor.execute(f"""
+                CREATE OR REPLACE TRIGGER trg_{tabela}_atualizado_em
+                BEFORE UPDATE ON {tabela}
+                FOR EACH ROW EXECUTE FUNCTION marcar_atualizado_em()
+            """)
+        for comando in SQL_REMOCOES:
+            cursor.execute(comando)
+        self.pg_conn.commit()
+        cursor.close()
+
+    def marca_dagua(self) -> str:
+        return self._consultar("SELECT now()")[0][0].isoformat()
+
+    def clientes(self, ids: Optional[List[int]] = None) -> List[tuple]:
+        if ids is None:
+            return self._consultar("""
+                SELECT id, cpf, nome, endereco, cidade, uf, email
+                FROM clientes
+                ORDER BY id
+            """)
+        return self._consultar("""
+            SELECT id, cpf, nome, endereco, cidade, uf, email
+            FROM clientes
+            WHERE id = ANY(%s)
+            ORDER BY id
+        """, (list(ids),))
+
+    def contar_clientes(self) -> int:
+        return self._consultar("SELECT count(*) FROM clientes")[0][0]
+
+    def blocos_clientes(self, tamanho: int) -> Iterator[List[tuple]]:
+        # Cursor nomeado: o PostgreSQL entrega os clientes aos poucos
+        cursor = self.pg_conn.cursor(name='sync_clientes_blocos')
+        cursor.itersize = tamanho
+        try:
+            cursor.execute("""
+                SELECT id, cpf, nome, endereco, cidade, uf, email
+                FROM clientes
+                ORDER BY id
+            """)
+            while True:
+                bloco = cursor.fetchmany(tamanho)
+                if not bloco:
+                    return
+                yield bloco
+        finally:
+            cursor.close()
+
+    def inicios_faixas(self, quantidade: int) -> List[int]:
+        # Os ids vêm do índice da chave primária; nenhum cliente sai do banco
+        return [linha[0] for linha in self._consultar("""
+            SELECT min(id)
+            FROM (SELECT id, ntile(%s) OVER (ORDER BY id) AS faixa FROM clientes) faixas
+            GROUP BY faixa
+            ORDER BY 1
+        """, (quantidade,))]
+
+    def clientes_da_faixa(self, inicio: int, fim: Optional[int] = None) -> List[tuple]:
+        if fim is None:
+            return self._consultar("""
+                SELECT id, cpf, nome, endereco, cidade, uf, email
+                FROM clientes
+                WHERE id >= %s
+                ORDER BY id
+            """, (inicio,))
+        return self._consultar("""
+            SELECT id, cpf, nome, endereco, cidade, uf, email
+            FROM clientes
+            WHERE id >= %s AND id < %s
+            ORDER BY id
+        """, (inicio, fim))
+
+    def compras(self, ids: Optional[List[int]] = None) -> Dict[int, List[Dict[str, Any]]]:
+        # Cada compra referencia o produto pelo id; os dados do produto ficam no catálogo
+        if ids is None:
+            compras_pg = self._consultar("""
+                SELECT c.id_cliente, c.id, c.data, c.id_produto
+                FROM compras c
+                ORDER BY c.id_cliente, c.data
+            """)
+        else:
+            compras_pg = self._consultar("""
+                SELECT c.id_cliente, c.id, c.data, c.id_produto
+                FROM compras c
+                WHERE c.id_cliente = ANY(%s)
+                ORDER BY c.id_cliente, c.data
+            """, (list(ids),))
+        return agrupar_compras((compra[0], compra[1], compra[2].isoformat() if compra[2] else None, compra[3])
+                               for compra in compras_pg)
+
+    def produtos(self, ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, Any]]:
+        if ids is None:
+            linhas = self._consultar("SELECT id, produto, valor, tipo FROM produtos")
+        else:
+            linhas = self._consultar("SELECT id, produto, valor, tipo FROM produtos WHERE id = ANY(%s)",
+                                     (list(ids),))
+        return montar_produtos(linhas)
+
+    def alterados_desde(self, desde: datetime) -> Tuple[Set[int], Set[int]]:
+        alterados = {linha[0] for linha in self._consultar(
+            "SELECT id FROM clientes WHERE atualizado_em > %s", (desde,)
+        )}
+        compras_alteradas = {linha[0] for linha in self._consultar("""
+            SELECT DISTINCT c.id_cliente
+            FROM compras c
+            JOIN produtos p ON c.id_produto = p.id
+            WHERE c.atualizado_em > %s OR p.atualizado_em > %s
+            UNION
+            SELECT id_cliente FROM sync_remocoes WHERE removido_em > %s
+        """, (desde, desde, desde))}
+        return alterados, compras_alteradas
+
+    def descartar_remocoes(self, ate: datetime):
+        cursor = self.pg_conn.cursor()
+        try:
+            cursor.execute("DELETE FROM sync_remocoes WHERE removido_em <= %s", (ate,))
+            self.pg_conn.commit()
+        finally:
+            cursor.close()
+
+
+class RepositorioInteressesMongoDB(RepositorioInteresses):
+    """Interesses na coleção `clientes_interesses` do MongoDB."""
+
+    def __init__(self, mongo_collection):
+        self.colecao = mongo_collection
+
+    def preparar(self):
+        self.colecao.create_index('id_cliente')
+        self.colecao.create_index('data_atualizacao')
+
+    def marca_dagua(self) -> str:
+        # A data é gravada pelos próprios clientes (string ISO), então a
+        # marca é a maior data_atualizacao existente
+        ultimo_doc = self.colecao.find_one(
+            {'data_atualizacao': {'$type': 'string'}},
+            projection={'data_atualizacao': 1},
+            sort=[('data_atualizacao', -1)]
+        )
+        return ultimo_doc['data_atualizacao'] if ultimo_doc else ''
+
+    def interesses(self, ids: Optional[List[int]] = None) -> Dict[int, List[str]]:
+        filtro = {} if ids is None else {'id_cliente': {'$in': list(ids)}}
+        interesses_por_cliente = {}
+        documentos = self.colecao.find(
+            filtro, projection={'id_cliente': 1, 'interesses': 1}, batch_size=MONGODB_BATCH_SIZE
+        )
+        for doc in documentos:
+            cliente_id = doc.get('id_cliente')
+            if cliente_id:
+                interesses_por_cliente[cliente_id] = doc.get('interesses', [])
+        return interesses_por_cliente
+
+    def alterados_desde(self, marca: str) -> Set[int]:
+        return {
+            doc['id_cliente']
+            for doc in self.colecao.find({'data_atualizacao': {'$gt': marca}}, projection={'id_cliente': 1})
+            if doc.get('id_cliente')
+        }
+
+
+class RepositorioAmizadesNeo4j(RepositorioAmizades):
+    """Pessoas e arestas AMIGO_DE do Neo4j (uma sessão por leitura, do pool do driver)."""
+
+    def __init__(self, neo4j_driver):
+        self.driver = neo4j_driver
+
+    @staticmethod
+    def _executar(session, consulta: str, **parametros):
+        # Conta uma ida e volta por consulta (os lotes seguintes de um
+        # resultado grande, de NEO4J_FETCH_SIZE registros, não entram)
+        contar_round_trip('neo4j')
+        return session.run(consulta, **parametros)
+
+    def preparar(self):
+        with self.driver.session() as session:
+            self._executar(session, "CREATE INDEX pessoa_id IF NOT EXISTS FOR (p:Pessoa) ON (p.id)").consume()
+            self._executar(
+                session, "CREATE INDEX pessoa_atualizado_em IF NOT EXISTS FOR (p:Pessoa) ON (p.atualizado_em)"
+            ).consume()
+            self._executar(
+                session, "CREATE INDEX amigo_de_atualizado_em IF NOT EXISTS FOR ()-[r:AMIGO_DE]-() ON (r.atualizado_em)"
+            ).consume()
+
+    def marca_dagua(self) -> str:
+        with self.driver.session() as session:
+            return str(self._executar(session, "RETURN timestamp() as agora").single()['agora'])
+
+    def amigos(self, ids: Optional[List[int]] = None) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Sem `ids`, toda a lista de arestas é lida em uma única consulta, consumida
+        em streaming (o tamanho de cada lote é o NEO4J_FETCH_SIZE da sessão).
+        Com `ids`, a busca é feita em consultas UNWIND de NEO4J_LOTE_IDS ids cada.
+        """
+        amigos_por_cliente = {}
+
+        def acumular(result):
+            for record in result:
+                amigos_por_cliente.setdefault(record['cliente_id'], []).append({
+                    'id': record['id'],
+                    'nome': record['nome'],
+                    'cpf': record['cpf']
+                })
+
+        with self.driver.session(fetch_size=NEO4J_FETCH_SIZE) as session:
+            if ids is None:
+                acumular(self._executar(session, """
+                    MATCH (p:Pessoa)-[:AMIGO_DE]->(amigo:Pessoa)
+                    RETURN p.id as cliente_id, amigo.id as id, amigo.nome as nome, amigo.cpf as cpf
+                """))
+            else:
+                ids = list(ids)
+                for inicio in range(0, len(ids), NEO4J_LOTE_IDS):
+                    acumular(self._executar(session, """
+                        UNWIND $ids AS cliente_id
+                        MATCH (p:Pessoa {id: cliente_id})-[:AMIGO_DE]->(amigo:Pessoa)
+                        RETURN p.id as cliente_id, amigo.id as id, amigo.nome as nome, amigo.cpf as cpf
+                    """, ids=ids[inicio:inicio + NEO4J_LOTE_IDS]))
+
+        ordenar_amigos(amigos_por_cliente)
+        return amigos_por_cliente
+
+    def alterados_desde(self, desde: int) -> Tuple[Set[int], Set[int]]:
+        afetados, pessoas_alteradas = set(), set()
+        with self.driver.session(fetch_size=NEO4J_FETCH_SIZE) as session:
+            result = self._executar(session, """
+                MATCH (p:Pessoa) WHERE p.atualizado_em > $desde
+                RETURN p.id as id
+            """, desde=desde)
+            pessoas_alteradas.update(record['id'] for record in result)
+
+            result = self._executar(session, """
+                MATCH (p1:Pessoa)-[r:AMIGO_DE]->(p2:Pessoa) WHERE r.atualizado_em > $desde
+                RETURN p1.id as id1, p2.id as id2
+            """, desde=desde)
+            for record in result:
+                afetados.add(record['id1'])
+                afetados.add(record['id2'])
+        return afetados, pessoas_alteradas
+
+    def contar_arestas_ate(self, marca: int) -> int:
+        with self.driver.session() as session:
+            return self._executar(session, """
+                MATCH ()-[r:AMIGO_DE]->() WHERE r.atualizado_em <= $marca
+                RETURN count(r) as total
+            """, marca=marca).single()['total']
+
+
+class ArmazemRedis(ArmazemConsolidado):
+    """Redis real, com um pool de conexões compartilhado por todos os clientes entregues."""
+
+    def __init__(self, config: Dict[str, Any], max_conexoes: int):
+        self.pool = redis.ConnectionPool(max_connections=max_conexoes, connection_class=ConexaoRedisContada,
+                                         **config)
+
+    def cliente(self):
+        return redis.Redis(connection_pool=self.pool)
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            'em_uso': len(self.pool._in_use_connections),
+            'livres': len(self.pool._available_connections),
+            'maximo': self.pool.max_connections
+        }
+
+    def fechar(self):
+        self.pool.disconnect()
+
+
+# Funções comuns às implementações
+def agrupar_compras(linhas: Iterable[tuple]) -> Dict[int, List[Dict[str, Any]]]:
+    """Compras (id_cliente, id, data ISO, id_produto), já ordenadas, organizadas por cliente."""
+    compras_por_cliente = {}
+    for cliente_id, compra_id, data, produto_id in linhas:
+        if cliente_id not in compras_por_cliente:
+            compras_por_cliente[cliente_id] = []
+        compras_por_cliente[cliente_id].append({'id': compra_id, 'data': data, 'produto_id': produto_id})
+    return compras_por_cliente
+
+
+def montar_produtos(linhas: Iterable[tuple]) -> Dict[int, Dict[str, Any]]:
+    """Catálogo por id a partir das linhas (id, produto, valor, tipo)."""
+    return {
+        produto[0]: {'produto': produto[1], 'valor': float(produto[2]), 'tipo': produto[3]}
+        for produto in linhas
+    }
+
+
+def ordenar_amigos(amigos_por_cliente: Dict[int, List[Dict[str, Any]]]):
+    """Ordena os amigos de cada cliente por nome, nulos por último (ordem das listagens)."""
+    for amigos in amigos_por_cliente.values():
+        amigos.sort(key=lambda amigo: (amigo['nome'] is None, amigo['nome'] or ''))
+
+
+# Implementação em processo
+class RepositorioClientesSQLite(RepositorioClientes):
+    """
+    Clientes, compras e produtos em um SQLite (em memória por padrão), com o
+    mesmo esquema do PostgreSQL. `atualizado_em` guarda segundos desde a
+    época, mantidos por triggers como no PostgreSQL.
+    """
+
+    def __init__(self, caminho: str = ':memory:'):
+        # As extrações rodam em threads: a conexão é compartilhada sob uma trava
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._trava = threading.Lock()
+        agora = "((julianday('now') - 2440587.5) * 86400.0)"
+        with self._trava:
+            self.conexao.executescript(f"""
+                CREATE TABLE IF NOT EXISTS clientes (
+                    id INTEGER PRIMARY KEY, cpf TEXT UNIQUE NOT NULL, nome TEXT NOT NULL,
+                    endereco TEXT, cidade TEXT, uf TEXT, email TEXT,
+                    atualizado_em REAL NOT NULL DEFAULT {agora}
+                );
+                CREATE TABLE IF NOT EXISTS produtos (
+                    id INTEGER PRIMARY KEY, produto TEXT NOT NULL, valor REAL NOT NULL,
+                    quantidade INTEGER NOT NULL, tipo TEXT NOT NULL,
+                    atualizado_em REAL NOT NULL DEFAULT {agora}
+                );
+                CREATE TABLE IF NOT EXISTS compras (
+                    id INTEGER PRIMARY KEY, id_produto INTEGER NOT NULL REFERENCES produtos(id),
+                    data TEXT NOT NULL, id_cliente INTEGER NOT NULL REFERENCES clientes(id),
+                    atualizado_em REAL NOT NULL DEFAULT {agora}
+                );
+                CREATE INDEX IF NOT EXISTS idx_compras_cliente ON compras (id_cliente, data);
+                CREATE TABLE IF NOT EXISTS sync_remocoes (
+                    id_cliente INTEGER NOT NULL, removido_em REAL NOT NULL DEFAULT {agora}
+                );
+                CREATE INDEX IF NOT EXISTS idx_sync_remocoes_removido_em ON sync_remocoes (removido_em);
+                CREATE TRIGGER IF NOT EXISTS trg_clientes_remocao AFTER DELETE ON clientes FOR EACH ROW
+                BEGIN
+                    INSERT INTO sync_remocoes (id_cliente) VALUES (OLD.id);
+                END;
+                CREATE TRIGGER IF NOT EXISTS trg_compras_remocao AFTER DELETE ON compras FOR EACH ROW
+                BEGIN
+                    INSERT INTO sync_remocoes (id_cliente) VALUES (OLD.id_cliente);
+                END;
+            """)
+            for tabela in ('clientes', 'produtos', 'compras'):
+                self.conexao.executescript(f"""
+                    CREATE INDEX IF NOT EXISTS idx_{tabela}_atualizado_em ON {tabela} (atualizado_em);
+                    CREATE TRIGGER IF NOT EXISTS trg_{tabela}_atualizado_em
+                    AFTER UPDATE ON {tabela} FOR EACH ROW WHEN NEW.atualizado_em = OLD.atualizado_em
+                    BEGIN
+                        UPDATE {tabela} SET atualizado_em = {agora} WHERE id = NEW.id;
+                    END;
+                """)
+
+    def _consultar(self, sql: str, parametros: tuple = ()) -> List[tuple]:
+        with self._trava:
+            return self.conexao.execute(sql, parametros).fetchall()
+
+    def executar(self, sql: str, linhas: Iterable[tuple]):
+        """Executa um comando de escrita para cada linha (carga e simulação de alterações)."""
+        with self._trava:
+            self.conexao.executemany(sql, linhas)
+            self.conexao.commit()
+
+    def preparar(self):
+        pass
+
+    def marca_dagua(self) -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    def clientes(self, ids: Optional[List[int]] = None) -> List[tuple]:
+        if ids is None:
+            return self._consultar("SELECT id, cpf, nome, endereco, cidade, uf, email FROM clientes ORDER BY id")
+        return self._consultar("""
+            SELECT id, cpf, nome, endereco, cidade, uf, email
+            FROM clientes
+            WHERE id IN (SELECT value FROM json_each(?))
+            ORDER BY id
+        """, (json.dumps(list(ids)),))
+
+    def contar_clientes(self) -> int:
+        return self._consultar("SELECT count(*) FROM clientes")[0][0]
+
+    def blocos_clientes(self, tamanho: int) -> Iterator[List[tuple]]:
+        ultimo = 0
+        while True:
+            bloco = self._consultar("""
+                SELECT id, cpf, nome, endereco, cidade, uf, email
+                FROM clientes WHERE id > ? ORDER BY id LIMIT ?
+            """, (ultimo, tamanho))
+            if not bloco:
+                return
+            ultimo = bloco[-1][0]
+            yield bloco
+
+    def inicios_faixas(self, quantidade: int) -> List[int]:
+        return [linha[0] for linha in self._consultar("""
+            SELECT min(id)
+            FROM (SELECT id, ntile(?) OVER (ORDER BY id) AS faixa FROM clientes)
+            GROUP BY faixa
+            ORDER BY 1
+        """, (quantidade,))]
+
+    def clientes_da_faixa(self, inicio: int, fim: Optional[int] = None) -> List[tuple]:
+        if fim is None:
+            return self._consultar("""
+                SELECT id, cpf, nome, endereco, cidade, uf, email
+                FROM clientes WHERE id >= ? ORDER BY id
+            """, (inicio,))
+        return self._consultar("""
+            SELECT id, cpf, nome, endereco, cidade, uf, email
+            FROM clientes WHERE id >= ? AND id < ? ORDER BY id
+        """, (inicio, fim))
+
+    def compras(self, ids: Optional[List[int]] = None) -> Dict[int, List[Dict[str, Any]]]:
+        if ids is None:
+            return agrupar_compras(self._consultar(
+                "SELECT id_cliente, id, data, id_produto FROM compras ORDER BY id_cliente, data"
+            ))
+        return agrupar_compras(self._consultar("""
+            SELECT id_cliente, id, data, id_produto
+            FROM compras
+            WHERE id_cliente IN (SELECT value FROM json_each(?))
+            ORDER BY id_cliente, data
+        """, (json.dumps(list(ids)),)))
+
+    def produtos(self, ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, Any]]:
+        if ids is None:
+            return montar_produtos(self._consultar("SELECT id, produto, valor, tipo FROM produtos"))
+        return montar_produtos(self._consultar(
+            "SELECT id, produto, valor, tipo FROM produtos WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(ids)),)
+        ))
+
+    def alterados_desde(self, desde: datetime) -> Tuple[Set[int], Set[int]]:
+        segundos = desde.timestamp()
+        alterados = {linha[0] for linha in self._consultar(
+            "SELECT id FROM clientes WHERE atualizado_em > ?", (segundos,)
+        )}
+        compras_alteradas = {linha[0] for linha in self._consultar("""
+            SELECT DISTINCT c.id_cliente
+            FROM compras c
+            JOIN produtos p ON c.id_produto = p.id
+            WHERE c.atualizado_em > ? OR p.atualizado_em > ?
+            UNION
+            SELECT id_cliente FROM sync_remocoes WHERE removido_em > ?
+        """, (segundos, segundos, segundos))}
+        return alterados, compras_alteradas
+
+    def descartar_remocoes(self, ate: datetime):
+        self.executar("DELETE FROM sync_remocoes WHERE removido_em <= ?", [(ate.timestamp(),)])
+
+
+class RepositorioInteressesMemoria(RepositorioInteresses):
+    """Interesses em um dicionário id_cliente -> documento (mesmos campos da coleção do MongoDB)."""
+
+    def __init__(self):
+        self.documentos: Dict[int, Dict[str, Any]] = {}
+
+    def gravar(self, cliente_id: int, interesses: List[str], data_atualizacao: Optional[str] = None):
+        """Grava (ou substitui) os interesses de um cliente, com a data atual se nenhuma for informada."""
+        self.documentos[cliente_id] = {
+            'id_cliente': cliente_id,
+            'interesses': interesses,
+            'data_atualizacao': data_atualizacao or datetime.now().isoformat(timespec='microseconds')
+        }
+
+    def preparar(self):
+        pass
+
+    def marca_dagua(self) -> str:
+        return max((doc['data_atualizacao'] for doc in self.documentos.values()), default='')
+
+    def interesses(self, ids: Optional[List[int]] = None) -> Dict[int, List[str]]:
+        if ids is None:
+            return {cliente_id: doc['interesses'] for cliente_id, doc in self.documentos.items()}
+        return {cliente_id: self.documentos[cliente_id]['interesses']
+                for cliente_id in ids if cliente_id in self.documentos}
+
+    def alterados_desde(self, marca: str) -> Set[int]:
+        return {cliente_id for cliente_id, doc in self.documentos.items() if doc['data_atualizacao'] > marca}
+
+
+class RepositorioAmizadesMemoria(RepositorioAmizades):
+    """Pessoas e amizades (nos dois sentidos) em dicionários, com `atualizado_em` em ms como no Neo4j."""
+
+    def __init__(self):
+        self.pessoas: Dict[int, Dict[str, Any]] = {}
+        # id -> {id do amigo: atualizado_em da aresta}
+        self.arestas: Dict[int, Dict[int, int]] = {}
+
+    @staticmethod
+    def _agora() -> int:
+        return int(time.time() * 1000)
+
+    def gravar_pessoa(self, pessoa_id: int, cpf: str, nome: str, atualizado_em: Optional[int] = None):
+        self.pessoas[pessoa_id] = {'cpf': cpf, 'nome': nome, 'atualizado_em': atualizado_em or self._agora()}
+
+    def adicionar_amizade(self, id1: int, id2: int, atualizado_em: Optional[int] = None):
+        """Cria a amizade nos dois sentidos (sem efeito se ela já existir, como o MERGE)."""
+        if id1 == id2 or id1 not in self.pessoas or id2 not in self.pessoas:
+            return
+        agora = atualizado_em or self._agora()
+        for origem, destino in ((id1, id2), (id2, id1)):
+            self.arestas.setdefault(origem, {}).setdefault(destino, agora)
+
+    def remover_amizade(self, id1: int, id2: int):
+        """Remove a amizade nos dois sentidos."""
+        for origem, destino in ((id1, id2), (id2, id1)):
+            self.arestas.get(origem, {}).pop(destino, None)
+
+    def preparar(self):
+        pass
+
+    def marca_dagua(self) -> str:
+        return str(self._agora())
+
+    def amigos(self, ids: Optional[List[int]] = None) -> Dict[int, List[Dict[str, Any]]]:
+        amigos_por_cliente = {}
+        for cliente_id in (self.arestas if ids is None else ids):
+            destinos = self.arestas.get(cliente_id)
+            if cliente_id in self.pessoas and destinos:
+                amigos_por_cliente[cliente_id] = [
+                    {'id': amigo_id, 'nome': self.pessoas[amigo_id]['nome'], 'cpf': self.pessoas[amigo_id]['cpf']}
+                    for amigo_id in destinos
+                ]
+        ordenar_amigos(amigos_por_cliente)
+        return amigos_por_cliente
+
+    def alterados_desde(self, desde: int) -> Tuple[Set[int], Set[int]]:
+        afetados = set()
+        for origem, destinos in self.arestas.items():
+            for destino, atualizado_em in destinos.items():
+                if atualizado_em > desde:
+                    afetados.add(origem)
+                    afetados.add(destino)
+        pessoas_alteradas = {pessoa_id for pessoa_id, pessoa in self.pessoas.items()
+                             if pessoa['atualizado_em'] > desde}
+        return afetados, pessoas_alteradas
+
+    def contar_arestas_ate(self, marca: int) -> int:
+        return sum(1 for destinos in self.arestas.values() for atualizado_em in destinos.values()
+                   if atualizado_em <= marca)
+
+
+class ArmazemFakeRedis(ArmazemConsolidado):
+    """Servidor Redis simulado em memória (fakeredis), compartilhado por todos os clientes entregues."""
+
+    def __init__(self):
+        if fakeredis is None:
+            raise RuntimeError("fakeredis não está instalado (pip install fakeredis)")
+        self.servidor = fakeredis.FakeServer()
+
+    def cliente(self):
+        return fakeredis.FakeRedis(server=self.servidor, decode_responses=False)
+
+
+class ArmazenamentoMemoria:
+    """
+    Fontes e armazém consolidado em processo: SQLite em memória (clientes,
+    compras e produtos), dicionários (interesses e amizades) e fakeredis.
+    """
+
+    def __init__(self, caminho: str = ':memory:'):
+        self.clientes = RepositorioClientesSQLite(caminho)
+        self.interesses = RepositorioInteressesMemoria()
+        self.amizades = RepositorioAmizadesMemoria()
+        self.armazem = ArmazemFakeRedis()
+
+    def fontes(self) -> FontesDados:
+        return FontesDados(self.clientes, self.interesses, self.amizades)
+
+    def salvar(self, caminho: str):
+        """
+        Grava as fontes em um arquivo SQLite, para que outros processos as
+        abram com `abrir`: as tabelas dos clientes e, em `fontes_memoria`, os
+        interesses e as amizades. O armazém não é gravado.
+        """
+        destino = sqlite3.connect(caminho)
+        try:
+            with self.clientes._trava:
+                self.clientes.conexao.backup(destino)
+            destino.execute("CREATE TABLE IF NOT EXISTS fontes_memoria (nome TEXT PRIMARY KEY, dados BLOB NOT NULL)")
+            destino.executemany("INSERT OR REPLACE INTO fontes_memoria (nome, dados) VALUES (?, ?)", [
+                ('interesses', pickle.dumps(self.interesses.documentos)),
+                ('pessoas', pickle.dumps(self.amizades.pessoas)),
+                ('arestas', pickle.dumps(self.amizades.arestas)),
+            ])
+            destino.commit()
+        finally:
+            destino.close()
+
+    @classmethod
+    def abrir(cls, caminho: str) -> 'ArmazenamentoMemoria':
+        """Fontes gravadas com `salvar` (os clientes lidos do próprio arquivo), com um armazém vazio."""
+        armazenamento = cls(caminho)
+        dados = dict(armazenamento.clientes._consultar("SELECT nome, dados FROM fontes_memoria"))
+        armazenamento.interesses.documentos = pickle.loads(dados['interesses'])
+        armazenamento.amizades.pessoas = pickle.loads(dados['pessoas'])
+        armazenamento.amizades.arestas = pickle.loads(dados['arestas'])
+        return armazenamento
+
+    def carregar(self, clientes: List[tuple], produtos: List[tuple], compras: List[tuple],
+                 interesses: Dict[int, List[str]], amizades: Iterable[Tuple[int, int]],
+                 atualizado_em: Optional[datetime] = None, datas_interesses: Optional[Dict[int, str]] = None):
+        """
+        Carrega os dados no formato do gerador do benchmark: clientes (id, cpf,
+        nome, endereco, cidade, uf, email), produtos (id, produto, valor,
+        quantidade, tipo), compras (id_produto, data, id_cliente), interesses
+        por cliente e amizades (pares de ids). `atualizado_em` (padrão: agora)
+        é a data de atualização dos clientes, produtos, compras, pessoas e
+        amizades, e `datas_interesses` a `data_atualizacao` de cada documento
+        de interesses (padrão: agora).
+        """
+        atualizado_em = atualizado_em or datetime.now(timezone.utc)
+        segundos = atualizado_em.timestamp()
+        self.clientes.executar(
+            "INSERT INTO clientes (id, cpf, nome, endereco, cidade, uf, email, atualizado_em) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (cliente + (segundos,) for cliente in clientes)
+        )
+        self.clientes.executar(
+            "INSERT INTO produtos (id, produto, valor, quantidade, tipo, atualizado_em) VALUES (?, ?, ?, ?, ?, ?)",
+            (produto + (segundos,) for produto in produtos)
+        )
+        self.clientes.executar(
+            "INSERT INTO compras (id_produto, data, id_cliente, atualizado_em) VALUES (?, ?, ?, ?)",
+            (compra + (segundos,) for compra in compras)
+        )
+        data_atualizacao = datetime.now().isoformat(timespec='microseconds')
+        milissegundos = int(segundos * 1000)
+        for cliente in clientes:
+            self.interesses.gravar(cliente[0], interesses.get(cliente[0], []),
+                                   (datas_interesses or {}).get(cliente[0], data_atualizacao))
+            self.amizades.gravar_pessoa(cliente[0], cliente[1], cliente[2], milissegundos)
+        for id1, id2 in amizades:
+            self.amizades.adicionar_amizade(id1, id2, milissegundos)
@@ -240,6 +240,7 @@ def setup_postgres_schema(conn):
     cursor = conn.cursor()
     
     # Limpar tabelas existentes
+    cursor.execute("DROP TABLE IF EXISTS sync_remocoes;")
     cursor.execute("DROP TABLE IF EXISTS compras CASCADE;")
     cursor.execute("DROP TABLE IF EXISTS produtos CASCADE;")
     cursor.execute("DROP TABLE IF EXISTS clientes CASCADE;")
@@ -253,7 +254,8 @@ def setup_postgres_schema(conn):
             endereco VARCHAR(255),
             cidade VARCHAR(100),
             uf VARCHAR(2),
-            email VARCHAR(255)
+            email VARCHAR(255),
+            atualizado_em TIMESTAMPTZ NOT NULL DEFAULT now()
         );
     """)
     
@@ -264,7 +266,8 @@ def setup_postgres_schema(conn):
             produto VARCHAR(255) NOT NULL,
             valor DECIMAL(10, 2) NOT NULL,
             quantidade INTEGER NOT NULL,
-            tipo VARCHAR(50) NOT NULL
+            tipo VARCHAR(50) NOT NULL,
+            atualizado_em TIMESTAMPTZ NOT NULL DEFAULT now()
         );
     """)
     
@@ -275,11 +278,55 @@ def setup_postgres_schema(conn):
             id_produto INTEGER NOT NULL,
             data DATE NOT NULL,
             id_cliente INTEGER NOT NULL,
+            atualizado_em TIMESTAMPTZ NOT NULL DEFAULT now(),
             FOREIGN KEY (id_produto) REFERENCES produtos(id),
             FOREIGN KEY (id_cliente) REFERENCES clientes(id)
         );
     """)
     
+    # Manter atualizado_em em cada UPDATE (usado pela sincronização incremental da API)
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION marcar_atualizado_em() RETURNS trigger AS $$
+        BEGIN
+            NEW.atualizado_em = now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    for tabela in ('clientes', 'produtos', 'compras'):
+        cursor.execute(f"""
+            CREATE INDEX idx_{tabela}_atualizado_em ON {tabela} (atualizado_em);
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER trg_{tabela}_atualizado_em
+            BEFORE UPDATE ON {tabela}
+            FOR EACH ROW EXECUTE FUNCTION marcar_atualizado_em();
+        """)
+    
+    # Registrar clientes removidos e compras apagadas (a sincronização incremental
+    # não enxerga linhas que deixaram de existir)
+    cursor.execute("""
+        CREATE TABLE sync_remocoes (
+            id_cliente INTEGER NOT NULL,
+            removido_em TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+    cursor.execute("CREATE INDEX idx_sync_remocoes_removido_em ON sync_remocoes (removido_em);")
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION registrar_remocao() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO sync_remocoes (id_cliente) VALUES ((to_jsonb(OLD) ->> TG_ARGV[0])::integer);
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    for tabela, coluna in (('clientes', 'id'), ('compras', 'id_cliente')):
+        cursor.execute(f"""
+            CREATE TRIGGER trg_{tabela}_remocao
+            AFTER DELETE ON {tabela}
+            FOR EACH ROW EXECUTE FUNCTION registrar_remocao('{coluna}');
+        """)
+    
     conn.commit()
     cursor.close()
     print("[OK] Esquema criado com sucesso")
@@ -397,7 +444,8 @@ def populate_mongodb(clientes_map: Dict[str, int]):
             'cpf': cpf,
             'nome': fake.name(),  # Pode ser diferente do PostgreSQL para simular dados resumidos
             'interesses': interesses_cliente,
-            'data_atualizacao': fake.date_time_between(start_date='-6m', end_date='now').isoformat()
+            'data_atualizacao': fake.date_time_between(start_date='-6m',
+                                                       end_date='now').isoformat(timespec='microseconds')
         }
         documentos.append(documento)
     
@@ -418,6 +466,8 @@ def populate_neo4j(clientes_map: Dict[str, int]):
     # Limpar dados existentes
     with driver.session() as session:
         session.run("MATCH (n) DETACH DELETE n")
+        # Índice em Pessoa.id (usado pelos MATCH por id abaixo e pela API)
+        session.run("CREATE INDEX pessoa_id IF NOT EXISTS FOR (p:Pessoa) ON (p.id)")
     
     # Criar nós (Pessoas)
     with driver.session() as session:
@@ -427,7 +477,8 @@ def populate_neo4j(clientes_map: Dict[str, int]):
                 CREATE (p:Pessoa {
                     id: $id,
                     cpf: $cpf,
-                    nome: $nome
+                    nome: $nome,
+                    atualizado_em: timestamp()
                 })
             """, id=cliente_id, cpf=cpf, nome=fake.name())
         
@@ -451,8 +502,10 @@ def populate_neo4j(clientes_map: Dict[str, int]):
                     session.run("""
                         MATCH (p1:Pessoa {id: $id1})
                         MATCH (p2:Pessoa {id: $id2})
-                        MERGE (p1)-[:AMIGO_DE]->(p2)
-                        MERGE (p2)-[:AMIGO_DE]->(p1)
+                        MERGE (p1)-[r1:AMIGO_DE]->(p2)
+                        ON CREATE SET r1.atualizado_em = timestamp()
+                        MERGE (p2)-[r2:AMIGO_DE]->(p1)
+                        ON CREATE SET r2.atualizado_em = timestamp()
                     """, id1=cliente_id, id2=amigo_id)
                     num_amizades += 2
         
@@ -59,17 +59,22 @@ async function sincronizarDados() {
         });
 
         const data = await response.json();
-
-        if (response.ok) {
-            syncStatus.className = 'status-message success';
-            syncStatus.textContent = `✅ ${data.message} - ${data.clientes_processados} clientes processados.`;
-            
-            // Recarregar todas as abas
-            const abaAtiva = document.querySelector('.tab-content.active').id;
-            carregarDadosAba(abaAtiva);
-        } else {
+        if (!response.ok) {
             throw new Error(data.detail || 'Erro ao sincronizar');
         }
+
+        // A sincronização roda em segundo plano: acompanhar o job até terminar
+        const job = await acompanharJob(data.url, syncStatus);
+        if (job.status === 'erro') {
+            throw new Error(job.erro || 'Erro ao sincronizar');
+        }
+
+        syncStatus.className = 'status-message success';
+        syncStatus.textContent = `✅ ${job.resultado.message} - ${job.resultado.clientes_processados} clientes processados.`;
+        
+        // Recarregar todas as abas
+        const abaAtiva = document.querySelector('.tab-content.active').id;
+        carregarDadosAba(abaAtiva);
     } catch (error) {
         syncStatus.className = 'status-message error';
         syncStatus.textContent = `❌ Erro: ${error.message}`;
@@ -79,67 +84,156 @@ async function sincronizarDados() {
     }
 }
 
+// Intervalo (ms) entre consultas ao progresso de um job de sincronização
+const INTERVALO_PROGRESSO_MS = 1000;
+
+// Nomes exibidos para as etapas da sincronização
+const NOMES_ETAPAS = {
+    deteccao: 'Detectando alterações',
+    extracao: 'Lendo as bases',
+    consolidacao: 'Consolidando clientes',
+    listagens: 'Preparando listagens',
+    publicacao: 'Publicando dados'
+};
+
+// Consulta o job de sincronização até ele terminar, mostrando o progresso
+async function acompanharJob(url, syncStatus) {
+    while (true) {
+        const response = await fetch(`${API_BASE_URL}${url}`);
+        const job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.detail || 'Erro ao acompanhar sincronização');
+        }
+        if (job.status === 'concluido' || job.status === 'erro') {
+            return job;
+        }
+
+        const etapa = NOMES_ETAPAS[job.etapa] || 'Aguardando início';
+        const contagem = job.total ? ` (${job.processados}/${job.total})` : '';
+        syncStatus.textContent = `⏳ ${etapa}${contagem}...`;
+        await new Promise(resolve => setTimeout(resolve, INTERVALO_PROGRESSO_MS));
+    }
+}
+
+// Quantidade de registros pedida por página às rotas de listagem
+const TAMANHO_PAGINA = 50;
+
+// Cursor da próxima página de cada aba (null quando não há mais páginas)
+const proximaPagina = {};
+
+// Função para buscar uma página de uma rota de listagem
+async function buscarPagina(rota, aba, continuar) {
+    const params = new URLSearchParams({ limit: TAMANHO_PAGINA });
+    if (continuar && proximaPagina[aba]) {
+        params.set('cursor', proximaPagina[aba]);
+    }
+
+    const response = await fetch(`${API_BASE_URL}${rota}?${params}`);
+    const data = await response.json();
+    proximaPagina[aba] = data.next_cursor || null;
+    return data;
+}
+
+// Função para atualizar o botão "Carregar mais" de uma aba
+function atualizarBotaoCarregarMais(aba) {
+    const area = document.getElementById(`${aba}Mais`);
+    if (!area) {
+        return;
+    }
+    area.innerHTML = proximaPagina[aba]
+        ? `<button class="load-more-button" onclick="carregarMais('${aba}')">Carregar mais</button>`
+        : '';
+}
+
+// Função para carregar a próxima página da aba
+function carregarMais(aba) {
+    const botao = document.querySelector(`#${aba}Mais button`);
+    if (botao) {
+        botao.disabled = true;
+        botao.textContent = 'Carregando...';
+    }
+
+    switch(aba) {
+        case 'clientes':
+            carregarClientes(true);
+            break;
+        case 'amigos':
+            carregarAmigos(true);
+            break;
+        case 'compras':
+            carregarCompras(true);
+            break;
+        case 'recomendacoes':
+            carregarRecomendacoes(true);
+            break;
+    }
+}
+
+// Função para montar a linha de um cliente
+function htmlCliente(cliente) {
+    return `
+        <tr>
+            <td>${cliente.id}</td>
+            <td><strong>${cliente.nome}</strong></td>
+            <td>${cliente.cpf}</td>
+            <td>${cliente.cidade}/${cliente.uf}</td>
+            <td>${cliente.email}</td>
+            <td><span class="badge badge-info">${cliente.num_compras}</span></td>
+            <td><span class="badge badge-primary">${cliente.num_amigos}</span></td>
+            <td>
+                <div class="interesses-list">
+                    ${cliente.interesses && cliente.interesses.length
+                        ? cliente.interesses.map(interesse => `<span class="badge badge-success">${interesse}</span>`).join(' ')
+                        : '<span style="color: #6c757d;">Nenhum interesse cadastrado</span>'
+                    }
+                </div>
+            </td>
+        </tr>
+    `;
+}
+
 // Função para carregar clientes
-async function carregarClientes() {
+async function carregarClientes(continuar = false) {
     const content = document.getElementById('clientesContent');
-    content.innerHTML = '<p class="loading">Carregando clientes...</p>';
+    if (!continuar) {
+        content.innerHTML = '<p class="loading">Carregando clientes...</p>';
+    }
 
     try {
-        const response = await fetch(`${API_BASE_URL}/api/clientes`);
-        const data = await response.json();
+        const data = await buscarPagina('/api/clientes', 'clientes', continuar);
 
         if (data.status === 'success') {
-            let html = `
-                <div class="stats">
-                    <div class="stat-card">
-                        <div class="stat-value">${data.total}</div>
-                        <div class="stat-label">Total de Clientes</div>
+            if (!continuar) {
+                content.innerHTML = `
+                    <div class="stats">
+                        <div class="stat-card">
+                            <div class="stat-value">${data.total}</div>
+                            <div class="stat-label">Total de Clientes</div>
+                        </div>
                     </div>
-                </div>
-                <table>
-                    <thead>
-                        <tr>
-                            <th>ID</th>
-                            <th>Nome</th>
-                            <th>CPF</th>
-                            <th>Cidade/UF</th>
-                            <th>Email</th>
-                            <th>Compras</th>
-                            <th>Amigos</th>
-                            <th>Interesses</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-            `;
-
-            data.clientes.forEach(cliente => {
-                html += `
-                    <tr>
-                        <td>${cliente.id}</td>
-                        <td><strong>${cliente.nome}</strong></td>
-                        <td>${cliente.cpf}</td>
-                        <td>${cliente.cidade}/${cliente.uf}</td>
-                        <td>${cliente.email}</td>
-                        <td><span class="badge badge-info">${cliente.num_compras}</span></td>
-                        <td><span class="badge badge-primary">${cliente.num_amigos}</span></td>
-                        <td>
-                            <div class="interesses-list">
-                                ${cliente.interesses && cliente.interesses.length
-                                    ? cliente.interesses.map(interesse => `<span class="badge badge-success">${interesse}</span>`).join(' ')
-                                    : '<span style="color: #6c757d;">Nenhum interesse cadastrado</span>'
-                                }
-                            </div>
-                        </td>
-                    </tr>
+                    <table>
+                        <thead>
+                            <tr>
+                                <th>ID</th>
+                                <th>Nome</th>
+                                <th>CPF</th>
+                                <th>Cidade/UF</th>
+                                <th>Email</th>
+                                <th>Compras</th>
+                                <th>Amigos</th>
+                                <th>Interesses</th>
+                            </tr>
+                        </thead>
+                        <tbody id="clientesLista"></tbody>
+                    </table>
+                    <div id="clientesMais" class="load-more"></div>
                 `;
-            });
-
-            html += `
-                    </tbody>
-                </table>
-            `;
+            }
 
-            content.innerHTML = html;
+            document.getElementById('clientesLista').insertAdjacentHTML(
+                'beforeend', data.clientes.map(htmlCliente).join('')
+            );
+            atualizarBotaoCarregarMais('clientes');
         } else {
             throw new Error('Erro ao carregar clientes');
         }
@@ -148,66 +242,76 @@ async function carregarClientes() {
     }
 }
 
+// Função para montar o card de amigos de um cliente
+function htmlAmigos(item) {
+    let html = `
+        <div class="card">
+            <div class="card-header">
+                👤 ${item.cliente.nome} (ID: ${item.cliente.id})
+            </div>
+            <div class="card-body">
+                <div class="info-row">
+                    <span class="info-label">CPF:</span>
+                    <span class="info-value">${item.cliente.cpf}</span>
+                </div>
+                <div class="info-row">
+                    <span class="info-label">Total de Amigos:</span>
+                    <span class="info-value"><span class="badge badge-primary">${item.total_amigos}</span></span>
+                </div>
+                ${item.amigos.length > 0 ? `
+                    <div style="margin-top: 15px;">
+                        <strong>Amigos:</strong>
+                        <div class="amigos-list">
+                ` : '<p style="margin-top: 15px; color: #6c757d;">Nenhum amigo cadastrado.</p>'}
+    `;
+
+    item.amigos.forEach(amigo => {
+        html += `
+            <div class="amigo-item">
+                ${amigo.nome} (ID: ${amigo.id})
+            </div>
+        `;
+    });
+
+    if (item.amigos.length > 0) {
+        html += `</div></div>`;
+    }
+
+    html += `
+            </div>
+        </div>
+    `;
+    return html;
+}
+
 // Função para carregar amigos
-async function carregarAmigos() {
+async function carregarAmigos(continuar = false) {
     const content = document.getElementById('amigosContent');
-    content.innerHTML = '<p class="loading">Carregando rede de amizades...</p>';
+    if (!continuar) {
+        content.innerHTML = '<p class="loading">Carregando rede de amizades...</p>';
+    }
 
     try {
-        const response = await fetch(`${API_BASE_URL}/api/clientes/amigos`);
-        const data = await response.json();
+        const data = await buscarPagina('/api/clientes/amigos', 'amigos', continuar);
 
         if (data.status === 'success') {
-            let html = `
-                <div class="stats">
-                    <div class="stat-card">
-                        <div class="stat-value">${data.total}</div>
-                        <div class="stat-label">Clientes na Rede</div>
-                    </div>
-                </div>
-            `;
-
-            data.clientes_amigos.forEach(item => {
-                html += `
-                    <div class="card">
-                        <div class="card-header">
-                            👤 ${item.cliente.nome} (ID: ${item.cliente.id})
-                        </div>
-                        <div class="card-body">
-                            <div class="info-row">
-                                <span class="info-label">CPF:</span>
-                                <span class="info-value">${item.cliente.cpf}</span>
-                            </div>
-                            <div class="info-row">
-                                <span class="info-label">Total de Amigos:</span>
-                                <span class="info-value"><span class="badge badge-primary">${item.total_amigos}</span></span>
-                            </div>
-                            ${item.amigos.length > 0 ? `
-                                <div style="margin-top: 15px;">
-                                    <strong>Amigos:</strong>
-                                    <div class="amigos-list">
-                            ` : '<p style="margin-top: 15px; color: #6c757d;">Nenhum amigo cadastrado.</p>'}
-                `;
-
-                item.amigos.forEach(amigo => {
-                    html += `
-                        <div class="amigo-item">
-                            ${amigo.nome} (ID: ${amigo.id})
-                        </div>
-                    `;
-                });
-
-                if (item.amigos.length > 0) {
-                    html += `</div></div>`;
-                }
-
-                html += `
+            if (!continuar) {
+                content.innerHTML = `
+                    <div class="stats">
+                        <div class="stat-card">
+                            <div class="stat-value">${data.total}</div>
+                            <div class="stat-label">Clientes na Rede</div>
                         </div>
                     </div>
+                    <div id="amigosLista"></div>
+                    <div id="amigosMais" class="load-more"></div>
                 `;
-            });
+            }
 
-            content.innerHTML = html;
+            document.getElementById('amigosLista').insertAdjacentHTML(
+                'beforeend', data.clientes_amigos.map(htmlAmigos).join('')
+            );
+            atualizarBotaoCarregarMais('amigos');
         } else {
             throw new Error('Erro ao carregar amigos');
         }
@@ -216,78 +320,88 @@ async function carregarAmigos() {
     }
 }
 
+// Função para montar o card de compras de um cliente
+function htmlCompras(item) {
+    let html = `
+        <div class="card">
+            <div class="card-header">
+                🛒 ${item.cliente.nome} (ID: ${item.cliente.id})
+            </div>
+            <div class="card-body">
+                <div class="info-row">
+                    <span class="info-label">CPF:</span>
+                    <span class="info-value">${item.cliente.cpf}</span>
+                </div>
+                <div class="info-row">
+                    <span class="info-label">Cidade:</span>
+                    <span class="info-value">${item.cliente.cidade}</span>
+                </div>
+                <div class="info-row">
+                    <span class="info-label">Total de Compras:</span>
+                    <span class="info-value"><span class="badge badge-info">${item.total_compras}</span></span>
+                </div>
+                <div class="info-row">
+                    <span class="info-label">Valor Total:</span>
+                    <span class="info-value"><strong style="color: #28a745;">R$ ${item.valor_total.toFixed(2)}</strong></span>
+                </div>
+                ${item.compras.length > 0 ? `
+                    <div class="compras-list">
+                        <strong style="display: block; margin-top: 15px; margin-bottom: 10px;">Histórico de Compras:</strong>
+                ` : '<p style="margin-top: 15px; color: #6c757d;">Nenhuma compra registrada.</p>'}
+    `;
+
+    item.compras.forEach(compra => {
+        html += `
+            <div class="compra-item">
+                <div class="compra-produto">${compra.produto}</div>
+                <div class="compra-detalhes">
+                    💰 R$ ${compra.valor.toFixed(2)} | 
+                    📅 ${new Date(compra.data).toLocaleDateString('pt-BR')} | 
+                    🏷️ ${compra.tipo}
+                </div>
+            </div>
+        `;
+    });
+
+    if (item.compras.length > 0) {
+        html += `</div>`;
+    }
+
+    html += `
+            </div>
+        </div>
+    `;
+    return html;
+}
+
 // Função para carregar compras
-async function carregarCompras() {
+async function carregarCompras(continuar = false) {
     const content = document.getElementById('comprasContent');
-    content.innerHTML = '<p class="loading">Carregando compras...</p>';
+    if (!continuar) {
+        content.innerHTML = '<p class="loading">Carregando compras...</p>';
+    }
 
     try {
-        const response = await fetch(`${API_BASE_URL}/api/clientes/compras`);
-        const data = await response.json();
+        const data = await buscarPagina('/api/clientes/compras', 'compras', continuar);
 
         if (data.status === 'success') {
-            let html = `
-                <div class="stats">
-                    <div class="stat-card">
-                        <div class="stat-value">${data.total}</div>
-                        <div class="stat-label">Clientes com Compras</div>
-                    </div>
-                </div>
-            `;
-
-            data.clientes_compras.forEach(item => {
-                html += `
-                    <div class="card">
-                        <div class="card-header">
-                            🛒 ${item.cliente.nome} (ID: ${item.cliente.id})
-                        </div>
-                        <div class="card-body">
-                            <div class="info-row">
-                                <span class="info-label">CPF:</span>
-                                <span class="info-value">${item.cliente.cpf}</span>
-                            </div>
-                            <div class="info-row">
-                                <span class="info-label">Cidade:</span>
-                                <span class="info-value">${item.cliente.cidade}</span>
-                            </div>
-                            <div class="info-row">
-                                <span class="info-label">Total de Compras:</span>
-                                <span class="info-value"><span class="badge badge-info">${item.total_compras}</span></span>
-                            </div>
-                            <div class="info-row">
-                                <span class="info-label">Valor Total:</span>
-                                <span class="info-value"><strong style="color: #28a745;">R$ ${item.valor_total.toFixed(2)}</strong></span>
-                            </div>
-                            ${item.compras.length > 0 ? `
-                                <div class="compras-list">
-                                    <strong style="display: block; margin-top: 15px; margin-bottom: 10px;">Histórico de Compras:</strong>
-                            ` : '<p style="margin-top: 15px; color: #6c757d;">Nenhuma compra registrada.</p>'}
-                `;
-
-                item.compras.forEach(compra => {
-                    html += `
-                        <div class="compra-item">
-                            <div class="compra-produto">${compra.produto}</div>
-                            <div class="compra-detalhes">
-                                💰 R$ ${compra.valor.toFixed(2)} | 
-                                📅 ${new Date(compra.data).toLocaleDateString('pt-BR')} | 
-                                🏷️ ${compra.tipo}
-                            </div>
-                        </div>
-                    `;
-                });
-
-                if (item.compras.length > 0) {
-                    html += `</div>`;
-                }
-
-                html += `
+            if (!continuar) {
+                content.innerHTML = `
+                    <div class="stats">
+                        <div class="stat-card">
+                            <div class="stat-value">${data.total}</div>
+                            <div class="stat-label">Clientes com Compras</div>
                         </div>
                     </div>
+                    <div id="comprasLista"></div>
+                    <div id="comprasMais" class="load-more"></div>
                 `;
-            });
+            }
 
-            content.innerHTML = html;
+            document.getElementById('comprasLista').insertAdjacentHTML(
+                'beforeend', data.clientes_compras.map(htmlCompras).join('')
+            );
+            atualizarBotaoCarregarMais('compras');
         } else {
             throw new Error('Erro ao carregar compras');
         }
@@ -296,77 +410,91 @@ async function carregarCompras() {
     }
 }
 
+// Função para montar o card de recomendações de um cliente
+function htmlRecomendacao(item) {
+    let html = `
+        <div class="card recomendacao-card">
+            <div class="card-header">
+                ⭐ ${item.cliente_nome} (ID: ${item.cliente_id})
+            </div>
+            <div class="card-body">
+                <div class="info-row">
+                    <span class="info-label">CPF:</span>
+                    <span class="info-value">${item.cliente_cpf}</span>
+                </div>
+                <div class="info-row">
+                    <span class="info-label">Total de Recomendações:</span>
+                    <span class="info-value"><span class="badge badge-success">${item.total_recomendacoes}</span></span>
+                </div>
+                <div style="margin-top: 15px;">
+                    <strong>Produtos Recomendados:</strong>
+    `;
+
+    if (item.recomendacoes.length === 0) {
+        html += '<p style="margin-top: 10px; color: #6c757d;">Nenhuma recomendação disponível para este cliente.</p>';
+    } else {
+        item.recomendacoes.forEach(rec => {
+            const amigosList = rec.amigos_que_compraram.join(', ');
+            html += `
+                <div class="recomendacao-item">
+                    <div class="recomendacao-produto">${rec.produto}</div>
+                    <div class="compra-detalhes">
+                        💰 R$ ${rec.valor.toFixed(2)} | 
+                        🏷️ ${rec.tipo} | 
+                        👥 Recomendado por ${rec.amigos_que_compraram.length} amigo(s)
+                    </div>
+                    <div class="recomendacao-amigos" style="margin-top: 5px;">
+                        Amigos que compraram: ${amigosList}
+                    </div>
+                </div>
+            `;
+        });
+    }
+
+    html += `
+                </div>
+            </div>
+        </div>
+    `;
+    return html;
+}
+
 // Função para carregar recomendações
-async function carregarRecomendacoes() {
+async function carregarRecomendacoes(continuar = false) {
     const content = document.getElementById('recomendacoesContent');
-    content.innerHTML = '<p class="loading">Carregando recomendações...</p>';
+    if (!continuar) {
+        content.innerHTML = '<p class="loading">Carregando recomendações...</p>';
+    }
 
     try {
-        const response = await fetch(`${API_BASE_URL}/api/recomendacoes`);
-        const data = await response.json();
+        const data = await buscarPagina('/api/recomendacoes', 'recomendacoes', continuar);
 
         if (data.status === 'success') {
-            let html = `
-                <div class="stats">
-                    <div class="stat-card">
-                        <div class="stat-value">${data.total}</div>
-                        <div class="stat-label">Clientes com Recomendações</div>
+            if (!continuar) {
+                let html = `
+                    <div class="stats">
+                        <div class="stat-card">
+                            <div class="stat-value">${data.total}</div>
+                            <div class="stat-label">Clientes com Recomendações</div>
+                        </div>
                     </div>
-                </div>
-            `;
+                `;
 
-            if (data.recomendacoes.length === 0) {
-                html += '<div class="error-message">Nenhuma recomendação disponível. Execute a sincronização primeiro.</div>';
-            } else {
-                data.recomendacoes.forEach(item => {
-                    html += `
-                        <div class="card recomendacao-card">
-                            <div class="card-header">
-                                ⭐ ${item.cliente_nome} (ID: ${item.cliente_id})
-                            </div>
-                            <div class="card-body">
-                                <div class="info-row">
-                                    <span class="info-label">CPF:</span>
-                                    <span class="info-value">${item.cliente_cpf}</span>
-                                </div>
-                                <div class="info-row">
-                                    <span class="info-label">Total de Recomendações:</span>
-                                    <span class="info-value"><span class="badge badge-success">${item.total_recomendacoes}</span></span>
-                                </div>
-                                <div style="margin-top: 15px;">
-                                    <strong>Produtos Recomendados:</strong>
-                    `;
-
-                    if (item.recomendacoes.length === 0) {
-                        html += '<p style="margin-top: 10px; color: #6c757d;">Nenhuma recomendação disponível para este cliente.</p>';
-                    } else {
-                        item.recomendacoes.forEach(rec => {
-                            const amigosList = rec.amigos_que_compraram.join(', ');
-                            html += `
-                                <div class="recomendacao-item">
-                                    <div class="recomendacao-produto">${rec.produto}</div>
-                                    <div class="compra-detalhes">
-                                        💰 R$ ${rec.valor.toFixed(2)} | 
-                                        🏷️ ${rec.tipo} | 
-                                        👥 Recomendado por ${rec.amigos_que_compraram.length} amigo(s)
-                                    </div>
-                                    <div class="recomendacao-amigos" style="margin-top: 5px;">
-                                        Amigos que compraram: ${amigosList}
-                                    </div>
-                                </div>
-                            `;
-                        });
-                    }
+                if (data.recomendacoes.length === 0) {
+                    html += '<div class="error-message">Nenhuma recomendação disponível. Execute a sincronização primeiro.</div>';
+                }
 
-                    html += `
-                                </div>
-                            </div>
-                        </div>
-                    `;
-                });
+                html += `
+                    <div id="recomendacoesLista"></div>
+                    <div id="recomendacoesMais" class="load-more"></div>
+                `;
+                content.innerHTML = html;
             }
 
-            content.innerHTML = html;
+            document.getElementById('recomendacoesLista').insertAdjacentHTML(
+                'beforeend', data.recomendacoes.map(htmlRecomendacao).join('')
+            );
+            atualizarBotaoCarregarMais('recomendacoes');
         } else {
             throw new Error('Erro ao carregar recomendações');
         }
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Treina um dicionário zstd sobre uma amostra dos documentos de clientes da
+geração publicada e o ativa no Redis. As sincronizações seguintes passam a
+comprimir os documentos grandes com ele (REDIS_COMPRESSAO=zstd); os valores
+gravados com dicionários anteriores continuam legíveis, pois todos os
+dicionários ficam guardados em `codec:dicionarios`.
+
+Com dicionário, documentos de poucos KB (que sozinhos comprimem mal)
+aproveitam os trechos repetidos entre clientes: nomes de campos, datas,
+estrutura das compras e das recomendações.
+
+Uso: python treinar_dicionario_zstd.py [amostras] [tamanho_do_dicionario_em_bytes]
+"""
+
+import os
+import sys
+# Garantir que o encoding padrão é UTF-8
+if sys.platform == 'win32':
+    os.environ['PYTHONIOENCODING'] = 'utf-8'
+    # Configurar stdout/stderr para UTF-8
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    if hasattr(sys.stderr, 'reconfigure'):
+        sys.stderr.reconfigure(encoding='utf-8')
+
+import random
+
+import redis
+
+import codec
+from app import (
+    REDIS_CONFIG, REDIS_LOTE_LEITURA, REDIS_LAYOUT, CHAVE_DICIONARIOS, CHAVE_DICIONARIO_ATIVO, CAMPOS_DOCUMENTO,
+    obter_geracao_atual, chave_indice, ler_documentos
+)
+
+
+def main():
+    argumentos = [int(valor) for valor in sys.argv[1:]]
+    total_amostras, tamanho = (argumentos + [5000, 112640][len(argumentos):])[:2]
+
+    if codec.zstandard is None:
+        print("zstandard não está instalado (pip install zstandard)")
+        return
+
+    r = redis.Redis(**REDIS_CONFIG)
+    try:
+        geracao = obter_geracao_atual(r)
+        if geracao is None:
+            print("Nenhuma geração publicada. Execute uma sincronização antes (POST /api/sync_data).")
+            return
+
+        ids = r.zrange(chave_indice(geracao, 'id'), 0, -1)
+        ids = random.sample(ids, min(total_amostras, len(ids)))
+        # As amostras são os valores como o codec os comprime: o documento
+        # inteiro ou, no layout `hash`, cada parte do documento
+        amostras = []
+        for inicio in range(0, len(ids), REDIS_LOTE_LEITURA):
+            lote = [int(cliente_id) for cliente_id in ids[inicio:inicio + REDIS_LOTE_LEITURA]]
+            for cliente_data in ler_documentos(r, geracao, lote):
+                if cliente_data is None:
+                    continue
+                if REDIS_LAYOUT == 'hash':
+                    amostras.extend(codec.serializar(cliente_data[campo]) for campo in CAMPOS_DOCUMENTO)
+                else:
+                    amostras.append(codec.serializar(cliente_data))
+        if len(amostras) < 10:
+            print(f"Poucas amostras para treinar um dicionário ({len(amostras)})")
+            return
+
+        print(f"Treinando dicionário de até {tamanho} bytes sobre {len(amostras)} amostras...")
+        dict_id, dados = codec.treinar_dicionario(amostras, tamanho)
+
+        sem_dicionario = codec.zstandard.ZstdCompressor(level=codec.REDIS_COMPRESSAO_NIVEL)
+        com_dicionario = codec.zstandard.ZstdCompressor(
+            level=codec.REDIS_COMPRESSAO_NIVEL, dict_data=codec.zstandard.ZstdCompressionDict(dados)
+        )
+        original = sum(len(amostra) for amostra in amostras)
+        comprimido = sum(len(sem_dicionario.compress(amostra)) for amostra in amostras)
+        comprimido_dicionario = sum(len(com_dicionario.compress(amostra)) for amostra in amostras)
+        print(f"  Amostras: {original} bytes | zstd: {comprimido / original * 100:.0f}% "
+              f"| zstd com dicionário: {comprimido_dicionario / original * 100:.0f}%")
+
+        with r.pipeline(transaction=True) as pipe:
+            pipe.hset(CHAVE_DICIONARIOS, dict_id, dados)
+            pipe.set(CHAVE_DICIONARIO_ATIVO, dict_id)
+            pipe.execute()
+        print(f"Dicionário {dict_id} ({len(dados)} bytes) ativado: vale a partir da próxima sincronização")
+    finally:
+        r.close()
+
+
+if __name__ == "__main__":
+    main()